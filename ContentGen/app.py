@@ -1,13 +1,15 @@
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, Response, abort, jsonify, render_template, request, redirect, url_for, stream_with_context
 import os
 import sys
 
 # Add the parent directory to the sys.path to allow importing modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from ContentGen.text_engine import TextEngine, get_available_ollama_models
-from ContentGen.storage_core import init_db, get_all_content
+from ContentGen.text_engine import TextEngine
+from ContentGen.model_registry import model_registry
+from ContentGen.storage_core import init_db, get_content, get_content_page, search_content, DEFAULT_PAGE_SIZE
 from ContentGen.config import config
+from Shared.sse import SSE_HEADERS, sse_event
 
 app = Flask(__name__)
 
@@ -17,12 +19,15 @@ init_db()
 # Initialize TextEngine
 text_engine = TextEngine()
 
+# Load the Ollama model list in the background; pages render with the cached list
+model_registry.refresh_in_background()
+
 @app.route("/", methods=["GET"])
 def index():
     """
     Renders the main page with the text generation form.
     """
-    available_models = get_available_ollama_models()
+    available_models = model_registry.models()
     return render_template(
         "index.html", 
         prompt_text="", 
@@ -33,18 +38,37 @@ def index():
         language="English" # Default language
     )
 
+def generate_event_stream(prompt: str, language: str, model: str):
+    """
+    Yields the generated text as Server-Sent Events: a "token" event per generated piece, then a
+    "done" event with the final (saved) text, or an "error" event.
+    """
+    pieces = text_engine.stream_text(prompt, language=language, model=model)
+    try:
+        while True:
+            yield sse_event("token", {"token": next(pieces)})
+    except StopIteration as finished:
+        yield sse_event("done", {"response": finished.value})
+    except Exception as e:
+        yield sse_event("error", {"detail": text_engine.error_message(e)})
+
 @app.route("/generate", methods=["POST"])
 def generate():
     """
     Handles text generation requests from the form.
+    If the form includes "stream", the text is streamed back as Server-Sent Events instead.
     """
     user_prompt = request.form["prompt"]
     language = request.form["language"]
     model = request.form["model"]
 
+    if request.form.get("stream"):
+        return Response(stream_with_context(generate_event_stream(user_prompt, language, model)),
+                        mimetype="text/event-stream", headers=SSE_HEADERS)
+
     generated_text = text_engine.generate_text(user_prompt, language=language, model=model)
 
-    available_models = get_available_ollama_models() # Re-fetch models to pass back to template
+    available_models = model_registry.models() # Cached; never waits on Ollama
     if generated_text.startswith("Error:"):
         return render_template(
             "index.html", 
@@ -68,13 +92,105 @@ def generate():
             model=model # Pass back selected model
         )
 
+def _history_page():
+    """
+    Reads the page parameters (cursor, language, limit) of a history request and returns the page.
+    """
+    try:
+        return get_content_page(limit=request.args.get("limit", DEFAULT_PAGE_SIZE, type=int),
+                                cursor=request.args.get("cursor") or None,
+                                language=request.args.get("language") or None)
+    except ValueError:
+        abort(400, description="Invalid cursor.")
+
 @app.route("/history", methods=["GET"])
 def history():
     """
-    Displays the history of generated content.
+    Displays the history of generated content, newest first, one page at a time.
+    Responses are shown as previews; each entry links to its full text.
+    """
+    content_page, next_cursor = _history_page()
+    language = request.args.get("language", "")
+    load_more_url = url_for("history", cursor=next_cursor, language=language or None,
+                            limit=request.args.get("limit")) if next_cursor else None
+    return render_template("history.html", content_history=content_page, load_more_url=load_more_url,
+                           language=language)
+
+def _search_page():
+    """
+    Reads the search parameters (q, page, language, limit) of a request and returns
+    (results, has_more, page).
+    """
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    page = max(1, request.args.get("page", 1, type=int))
+    results, has_more = search_content(request.args.get("q", ""), limit=limit, offset=(page - 1) * limit,
+                                       language=request.args.get("language") or None)
+    return results, has_more, page
+
+@app.route("/history/search", methods=["GET"])
+def history_search():
+    """
+    Full-text search over the history (?q=...), best matches first, one page at a time.
+    Without search terms, shows the regular history listing.
+    """
+    query = request.args.get("q", "").strip()
+    language = request.args.get("language", "")
+    if not query:
+        return redirect(url_for("history", language=language or None))
+    results, has_more, page = _search_page()
+    load_more_url = url_for("history_search", q=query, page=page + 1, language=language or None,
+                            limit=request.args.get("limit")) if has_more else None
+    return render_template("history.html", content_history=results, load_more_url=load_more_url,
+                           language=language, query=query)
+
+@app.route("/api/history/search", methods=["GET"])
+def history_search_api():
+    """
+    JSON version of /history/search: a page of ranked results and whether there are more.
+    """
+    results, has_more, page = _search_page()
+    return jsonify({
+        "items": [{
+            "id": content.id,
+            "timestamp": content.timestamp.isoformat() if content.timestamp else None,
+            "language": content.language,
+            "prompt": content.prompt,
+            "response_preview": content.response_preview,
+            "response_length": content.response_length,
+            "score": -content.score,  # bm25() is lower for better matches
+        } for content in results],
+        "page": page,
+        "has_more": has_more,
+    })
+
+@app.route("/history/<int:content_id>", methods=["GET"])
+def history_entry(content_id: int):
+    """
+    Displays one history entry with its full response.
+    """
+    content = get_content(content_id)
+    if content is None:
+        abort(404)
+    return render_template("history.html", content_history=[content], load_more_url=None, language="")
+
+@app.route("/api/history", methods=["GET"])
+def history_api():
+    """
+    JSON "load more" API for the history: returns a page of entries and the `next_cursor` to
+    pass back as ?cursor= for the following page (null on the last page).
     """
-    all_content = get_all_content()
-    return render_template("history.html", content_history=all_content)
+    content_page, next_cursor = _history_page()
+    return jsonify({
+        "items": [{
+            "id": content.id,
+            "timestamp": content.timestamp.isoformat() if content.timestamp else None,
+            "language": content.language,
+            "prompt": content.prompt,
+            "response_preview": content.response_preview,
+            "response_length": content.response_length,
+        } for content in content_page],
+        "next_cursor": next_cursor,
+    })
 
 if __name__ == "__main__":
     # --- IMPORTANT ---
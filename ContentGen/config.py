@@ -7,6 +7,12 @@ load_dotenv()
 class Config:
     OLLAMA_API_URL: str = os.getenv("OLLAMA_API_URL", "http://localhost:11434/api/generate")
     DEFAULT_OLLAMA_MODEL: str = os.getenv("DEFAULT_OLLAMA_MODEL", "llama2")
+    # Shared Ollama connection pool: response timeout (seconds), requests in flight and retries
+    OLLAMA_TIMEOUT: float = float(os.getenv("OLLAMA_TIMEOUT", "120"))
+    OLLAMA_MAX_CONCURRENCY: int = int(os.getenv("OLLAMA_MAX_CONCURRENCY", "32"))
+    OLLAMA_MAX_RETRIES: int = int(os.getenv("OLLAMA_MAX_RETRIES", "2"))
+    # Seconds the cached Ollama model list is served before it is refreshed in the background
+    OLLAMA_MODELS_TTL: float = float(os.getenv("OLLAMA_MODELS_TTL", "60"))
 
     print(f"Note: Using Ollama API at {OLLAMA_API_URL} with default model {DEFAULT_OLLAMA_MODEL}")
 
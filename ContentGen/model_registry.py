@@ -0,0 +1,133 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from ContentGen.config import config
+from ContentGen.text_engine import ollama_client
+from Shared.ollama_client import OllamaClient
+
+def _format_size(size: Optional[int]) -> Optional[str]:
+    if not size:
+        return None
+    return f"{size / 1024 ** 3:.1f} GB" if size >= 1024 ** 3 else f"{size / 1024 ** 2:.0f} MB"
+
+def _model_info(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Flattens an /api/tags entry into the metadata shown in the UI.
+    """
+    details = entry.get("details") or {}
+    info = {
+        "name": entry["name"],
+        "size": entry.get("size"),
+        "modified_at": entry.get("modified_at"),
+        "family": details.get("family"),
+        "parameter_size": details.get("parameter_size"),
+        "quantization": details.get("quantization_level"),
+    }
+    extras = [value for value in (info["parameter_size"], info["quantization"], _format_size(info["size"])) if value]
+    info["label"] = f"{info['name']} ({', '.join(extras)})" if extras else info["name"]
+    return info
+
+class ModelRegistry:
+    def __init__(self, client: OllamaClient, ttl_seconds: float = 60, error_retry_seconds: float = 10,
+                 refresh_timeout: float = 5.0):
+        """
+        Cached list of the models available in Ollama, so page renders never wait on /api/tags.
+        Reads always return the cached list immediately; once it is older than `ttl_seconds`
+        (or was never loaded) a read starts a refresh in a background thread. If a refresh
+        fails, the previous (stale) list keeps being served and the refresh is retried after
+        `error_retry_seconds`.
+        :param client: The Ollama client to query.
+        :param ttl_seconds: Age after which the list is refreshed.
+        :param error_retry_seconds: Delay before retrying a failed refresh.
+        :param refresh_timeout: Response timeout of the /api/tags request.
+        """
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self.error_retry_seconds = error_retry_seconds
+        self.refresh_timeout = refresh_timeout
+        self.last_error: Optional[str] = None
+        self._models: List[Dict[str, Any]] = []
+        self._loaded_at: Optional[float] = None
+        self._next_refresh = 0.0  # time.monotonic() after which a read triggers a refresh
+        self._lock = threading.Lock()
+        self._refresh_thread: Optional[threading.Thread] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded_at is not None
+
+    @property
+    def age(self) -> Optional[float]:
+        """
+        Seconds since the list was last refreshed successfully, or None if it never was.
+        """
+        return time.monotonic() - self._loaded_at if self._loaded_at is not None else None
+
+    def refresh(self) -> bool:
+        """
+        Queries Ollama and replaces the cached list. Blocks until done; returns whether it succeeded.
+        """
+        try:
+            models = [_model_info(entry) for entry in self.client.list_model_details(timeout=self.refresh_timeout)]
+        except Exception as e:
+            self.last_error = str(e) or type(e).__name__
+            self._next_refresh = time.monotonic() + self.error_retry_seconds
+            print(f"Warning: Could not refresh the Ollama model list from {self.client.tags_url} "
+                  f"({self.last_error}). Serving {'stale' if self.is_loaded else 'no'} model data.")
+            return False
+        self._models = models
+        self._loaded_at = time.monotonic()
+        self._next_refresh = self._loaded_at + self.ttl_seconds
+        self.last_error = None
+        return True
+
+    def refresh_in_background(self):
+        """
+        Starts a refresh in a background thread, unless one is already running.
+        """
+        with self._lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self.refresh, name="ollama-model-registry", daemon=True)
+            self._refresh_thread.start()
+
+    def wait_for_refresh(self, timeout: Optional[float] = None):
+        """
+        Blocks until a background refresh has finished.
+        """
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout)
+
+    def models(self) -> List[Dict[str, Any]]:
+        """
+        Returns the cached models (dicts with name, size, modified_at, family, parameter_size,
+        quantization and a display label), refreshing them in the background if they are due.
+        """
+        if time.monotonic() >= self._next_refresh:
+            self.refresh_in_background()
+        return list(self._models)
+
+    def model_names(self) -> List[str]:
+        """
+        Returns the names of the cached models.
+        """
+        return [model["name"] for model in self.models()]
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns the metadata of a model, or None if it is not in the cached list.
+        """
+        return next((model for model in self.models() if model["name"] == name), None)
+
+# Shared by all requests of the Flask app
+model_registry = ModelRegistry(ollama_client, ttl_seconds=config.OLLAMA_MODELS_TTL)
+
+if __name__ == "__main__":
+    # Example usage (requires Ollama running locally):
+    print(model_registry.models())  # Empty at first: the list is loading in the background
+    model_registry.wait_for_refresh()
+    for model in model_registry.models():
+        print(model["label"])
+    if model_registry.last_error:
+        print(f"Last refresh failed: {model_registry.last_error}")
@@ -1,8 +1,10 @@
 import os
+import re
 from datetime import datetime
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime
+import zhconv
+from sqlalchemy import create_engine, event, text, Column, Integer, String, Text, DateTime, Index, func, tuple_
 from sqlalchemy.orm import sessionmaker, declarative_base
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 # Define the base for declarative models
 Base = declarative_base()
@@ -16,6 +18,12 @@ class GeneratedContent(Base):
     language = Column(String(50), nullable=False)
     timestamp = Column(DateTime, default=datetime.now)
 
+    # Keyset pagination walks these indexes newest first, optionally within one language
+    __table_args__ = (
+        Index("ix_generated_content_timestamp_id", "timestamp", "id"),
+        Index("ix_generated_content_language_timestamp_id", "language", "timestamp", "id"),
+    )
+
     def __repr__(self):
         return f"<GeneratedContent(id={self.id}, language='{self.language}', timestamp='{self.timestamp}')>"
 
@@ -23,17 +31,114 @@ class GeneratedContent(Base):
 DATABASE_FILE = "ai_writing.db"
 DATABASE_URL = f"sqlite:///{DATABASE_FILE}"
 
+# History pages
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+PREVIEW_CHARS = 200
+
+# Full-text search: an FTS5 table with the prompt and response of every entry, rowid = entry id
+SEARCH_TABLE = "generated_content_fts"
+SEARCH_WEIGHTS = (2.0, 1.0)  # bm25 weights of the prompt and response columns
+# Han, kana and Hangul; runs of these are indexed as overlapping character bigrams
+CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_SEARCH_TOKEN_RE = re.compile(f"([{CJK_CHARS}]+)|([^\\W{CJK_CHARS}]+)")
+
 # Engine and Session
 engine = create_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+def _search_tokens(text_to_index: str) -> List[List[str]]:
+    """
+    Splits text into search tokens, grouped by run. The text is converted to Simplified Chinese
+    (zhconv) and lower-cased, so both scripts match each other. Other words are kept whole;
+    FTS5's unicode61 tokenizer would treat a whole CJK run as one word, so each run becomes its
+    overlapping bigrams followed by its last character ("机器学习" -> 机器 器学 学习 习): any
+    substring of two or more characters is then a phrase of consecutive bigrams, and every
+    single character starts some token.
+    """
+    runs = []
+    for cjk, word in _SEARCH_TOKEN_RE.findall(zhconv.convert(text_to_index, 'zh-hans').lower()):
+        if cjk:
+            runs.append([cjk[i:i + 2] for i in range(len(cjk) - 1)] + [cjk[-1]])
+        else:
+            runs.append([word])
+    return runs
+
+def segment_for_search(text_to_index: str) -> str:
+    """
+    Returns the text as stored in the full-text index (space-separated search tokens).
+    """
+    return " ".join(token for run in _search_tokens(text_to_index) for token in run)
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turns a user query into an FTS5 MATCH expression requiring every term. A CJK term matches
+    as a substring, a single CJK character as a token prefix. Tokens are quoted, so FTS5 query
+    syntax in the input is never interpreted. Returns None if the query has no searchable text.
+    """
+    terms = []
+    for run in _search_tokens(query):
+        if len(run) == 1 and len(run[0]) == 1 and re.match(f"[{CJK_CHARS}]", run[0]):
+            terms.append(f'"{run[0]}"*')
+        else:
+            # A CJK run's trailing single character is already covered by its last bigram
+            tokens = run[:-1] if len(run) > 1 else run
+            terms.append('"' + " ".join(tokens) + '"')
+    return " AND ".join(terms) if terms else None
+
+def _search_row(content: "GeneratedContent") -> Dict[str, Any]:
+    return {"id": content.id, "prompt": segment_for_search(content.prompt),
+            "response": segment_for_search(content.response)}
+
+def rebuild_search_index(connection=None):
+    """
+    Re-indexes every entry. Needed only for rows written without the ORM (e.g. bulk SQL).
+    """
+    if connection is None:
+        with engine.begin() as connection:
+            return rebuild_search_index(connection)
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE}"))
+    rows = connection.execute(text("SELECT id, prompt, response FROM generated_content"))
+    while True:
+        batch = rows.fetchmany(1000)
+        if not batch:
+            break
+        connection.execute(text(f"INSERT INTO {SEARCH_TABLE}(rowid, prompt, response) VALUES (:id, :prompt, :response)"),
+                           [_search_row(row) for row in batch])
+
 def init_db():
     """
     Initializes the database and creates tables if they don't exist.
     """
     Base.metadata.create_all(bind=engine)
+    # create_all skips existing tables, so add indexes missing from databases created before them
+    for index in GeneratedContent.__table__.indexes:
+        index.create(bind=engine, checkfirst=True)
+    with engine.begin() as connection:
+        exists = connection.execute(text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                                    {"name": SEARCH_TABLE}).first()
+        if not exists:
+            # Tokens are pre-segmented by segment_for_search; unicode61 splits them on spaces
+            connection.execute(text(f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5("
+                                    "prompt, response, tokenize = 'unicode61 remove_diacritics 2')"))
+            rebuild_search_index(connection)  # Index entries saved before search existed
     print(f"Database initialized at {DATABASE_FILE}")
 
+# Keep the search index in sync with every ORM write, in the same transaction
+@event.listens_for(GeneratedContent, "after_insert")
+def _index_content(mapper, connection, target):
+    connection.execute(text(f"INSERT INTO {SEARCH_TABLE}(rowid, prompt, response) VALUES (:id, :prompt, :response)"),
+                       _search_row(target))
+
+@event.listens_for(GeneratedContent, "after_update")
+def _reindex_content(mapper, connection, target):
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": target.id})
+    _index_content(mapper, connection, target)
+
+@event.listens_for(GeneratedContent, "after_delete")
+def _unindex_content(mapper, connection, target):
+    connection.execute(text(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = :id"), {"id": target.id})
+
 def save_content(prompt: str, response: str, language: str) -> GeneratedContent:
     """
     Saves generated content to the database.
@@ -52,6 +157,7 @@ def save_content(prompt: str, response: str, language: str) -> GeneratedContent:
 def get_all_content() -> List[GeneratedContent]:
     """
     Retrieves all generated content from the database.
+    Loads every row with its full response; use `get_content_page` for listings.
     """
     db = SessionLocal()
     try:
@@ -59,6 +165,110 @@ def get_all_content() -> List[GeneratedContent]:
     finally:
         db.close()
 
+def get_content(content_id: int) -> Optional[GeneratedContent]:
+    """
+    Retrieves one generated content entry, with its full response, or None.
+    """
+    db = SessionLocal()
+    try:
+        return db.get(GeneratedContent, content_id)
+    finally:
+        db.close()
+
+def encode_cursor(timestamp: datetime, content_id: int) -> str:
+    """
+    Returns the opaque cursor of a position in the history: the (timestamp, id) of the last entry shown.
+    """
+    return f"{timestamp.isoformat()}|{content_id}"
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Parses a cursor from `encode_cursor`. Raises ValueError if it is malformed.
+    """
+    timestamp, _, content_id = cursor.rpartition("|")
+    return datetime.fromisoformat(timestamp), int(content_id)
+
+def get_content_page(limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None, language: Optional[str] = None,
+                     preview_chars: int = PREVIEW_CHARS) -> Tuple[List[Any], Optional[str]]:
+    """
+    Retrieves one page of the history, newest first, using keyset pagination: the page starts
+    right after the `cursor` position through the (timestamp, id) index, so every page costs
+    the same regardless of the size of the table or how far back it is. No total is counted.
+    Only the columns of the list view are loaded; the response is cut to a preview in SQL.
+    :param limit: Entries per page (at most MAX_PAGE_SIZE).
+    :param cursor: The `next_cursor` of the previous page, or None for the first page.
+    :param language: Only list entries in this language.
+    :param preview_chars: Characters of the response to include as `response_preview`.
+    :return: The entries (rows with id, timestamp, language, prompt, response_preview and
+             response_length) and the cursor of the next page, or None on the last page.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    db = SessionLocal()
+    try:
+        query = db.query(
+            GeneratedContent.id,
+            GeneratedContent.timestamp,
+            GeneratedContent.language,
+            GeneratedContent.prompt,
+            func.substr(GeneratedContent.response, 1, preview_chars).label("response_preview"),
+            func.length(GeneratedContent.response).label("response_length"),
+        )
+        if language:
+            query = query.filter(GeneratedContent.language == language)
+        if cursor:
+            timestamp, content_id = decode_cursor(cursor)
+            query = query.filter(tuple_(GeneratedContent.timestamp, GeneratedContent.id) < tuple_(timestamp, content_id))
+        rows = query.order_by(GeneratedContent.timestamp.desc(), GeneratedContent.id.desc()).limit(limit + 1).all()
+    finally:
+        db.close()
+
+    # One extra row tells whether there is a next page without counting
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1].timestamp, rows[-1].id)
+
+def search_content(query: str, limit: int = DEFAULT_PAGE_SIZE, offset: int = 0, language: Optional[str] = None,
+                   preview_chars: int = PREVIEW_CHARS) -> Tuple[List[Any], bool]:
+    """
+    Full-text search over prompts and responses, best matches first (bm25, prompt matches
+    weighted higher). Matches Latin words, and Chinese text in either script.
+    :param query: The user's search terms; all of them must match.
+    :param limit: Results per page (at most MAX_PAGE_SIZE).
+    :param offset: Results to skip (limit * page number).
+    :param language: Only return entries in this language.
+    :param preview_chars: Characters of the response to include as `response_preview`.
+    :return: The results (rows with id, timestamp, language, prompt, response_preview,
+             response_length and score) and whether there are more.
+    """
+    match_query = build_match_query(query)
+    if match_query is None:
+        return [], False
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    language_join = (f"JOIN generated_content AS f ON f.id = {SEARCH_TABLE}.rowid AND f.language = :language"
+                     if language else "")
+    # Rank and cut the page in the full-text index first, so only the rows of the page are read
+    statement = text(f"""
+        SELECT c.id, c.timestamp, c.language, c.prompt,
+               substr(c.response, 1, :preview_chars) AS response_preview,
+               length(c.response) AS response_length,
+               ranked.score
+        FROM (
+            SELECT {SEARCH_TABLE}.rowid AS id,
+                   bm25({SEARCH_TABLE}, {SEARCH_WEIGHTS[0]}, {SEARCH_WEIGHTS[1]}) AS score
+            FROM {SEARCH_TABLE} {language_join}
+            WHERE {SEARCH_TABLE} MATCH :query
+            ORDER BY score
+            LIMIT :limit OFFSET :offset
+        ) AS ranked
+        JOIN generated_content AS c ON c.id = ranked.id
+        ORDER BY ranked.score
+    """).columns(timestamp=DateTime)
+    with engine.connect() as connection:
+        rows = connection.execute(statement, {"query": match_query, "language": language, "limit": limit + 1,
+                                              "offset": max(0, offset), "preview_chars": preview_chars}).all()
+    return rows[:limit], len(rows) > limit
+
 if __name__ == "__main__":
     # Clean up previous db for fresh start
     if os.path.exists(DATABASE_FILE):
@@ -83,3 +293,19 @@ if __name__ == "__main__":
     all_content = get_all_content()
     for content in all_content:
         print(f"ID: {content.id}, Lang: {content.language}, Prompt: {content.prompt[:50]}..., Response: {content.response[:50]}...")
+
+    # Page through the history one entry at a time
+    print("\nHistory pages:")
+    cursor = None
+    while True:
+        page, cursor = get_content_page(limit=1, cursor=cursor, preview_chars=20)
+        for content in page:
+            print(f"ID: {content.id}, Preview: {content.response_preview}... ({content.response_length} chars)")
+        if cursor is None:
+            break
+
+    # Full-text search matches either Chinese script
+    print("\nSearch results for '高山':")
+    results, has_more = search_content("高山")
+    for content in results:
+        print(f"ID: {content.id}, Score: {content.score:.3f}, Prompt: {content.prompt}")
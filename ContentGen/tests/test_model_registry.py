@@ -0,0 +1,127 @@
+import unittest
+import os
+import sys
+import threading
+from unittest.mock import patch
+
+import httpx
+
+# Add the project root to the sys.path to allow importing the ContentGen modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from ContentGen.model_registry import ModelRegistry
+from Shared.ollama_client import OllamaClient
+
+API_URL = "http://ollama.test/api/generate"
+
+def tags_response(*names):
+    return httpx.Response(200, json={"models": [
+        {"name": name, "size": 3825819519, "modified_at": "2024-05-01T10:00:00Z",
+         "details": {"family": "llama", "parameter_size": "7B", "quantization_level": "Q4_0"}}
+        for name in names]})
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        # The registry reads a fake clock, so TTLs expire without sleeping
+        self.now = 1000.0
+        patcher = patch("ContentGen.model_registry.time")
+        mock_time = patcher.start()
+        mock_time.monotonic.side_effect = lambda: self.now
+        self.addCleanup(patcher.stop)
+        self.requests = []
+        self.responses = []
+        self.reading = threading.Event()  # Ollama answers once it is cleared
+
+    def handler(self, request):
+        while self.reading.is_set():
+            self.reading.wait(0.01)
+        self.requests.append(request)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    def make_registry(self, **kwargs):
+        client = OllamaClient(API_URL, transport=httpx.MockTransport(self.handler), max_retries=0)
+        self.addCleanup(client.close)
+        return ModelRegistry(client, **kwargs)
+
+    def read(self, registry):
+        """
+        Reads the list, then waits for the background refresh the read may have started.
+        Ollama only answers after the read returned, so the read never sees the refreshed list.
+        """
+        self.reading.set()
+        models = registry.models()
+        self.reading.clear()
+        registry.wait_for_refresh()
+        return models
+
+    def test_loads_in_background(self):
+        self.responses = [tags_response("llama2")]
+        registry = self.make_registry(ttl_seconds=60)
+
+        # The first read does not wait for Ollama
+        self.assertEqual(self.read(registry), [])
+        self.assertTrue(registry.is_loaded)
+        self.assertEqual(self.requests[0].url.path, "/api/tags")
+        self.assertEqual(registry.get("llama2"), {
+            "name": "llama2", "size": 3825819519, "modified_at": "2024-05-01T10:00:00Z", "family": "llama",
+            "parameter_size": "7B", "quantization": "Q4_0", "label": "llama2 (7B, Q4_0, 3.6 GB)"})
+        self.assertIsNone(registry.get("missing"))
+
+    def test_refreshes_after_ttl(self):
+        self.responses = [tags_response("llama2"), tags_response("llama2", "qwen")]
+        registry = self.make_registry(ttl_seconds=60)
+        self.read(registry)
+
+        # Within the TTL the cached list is served without asking Ollama
+        self.now += 59
+        self.assertEqual(self.read(registry)[0]["name"], "llama2")
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(registry.age, 59)
+
+        # Once expired, the stale list is served while it refreshes
+        self.now += 2
+        self.assertEqual([model["name"] for model in self.read(registry)], ["llama2"])
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(registry.model_names(), ["llama2", "qwen"])
+        self.assertEqual(registry.age, 0)
+
+    def test_unreachable_ollama(self):
+        self.responses = [httpx.ConnectError("Connection refused")]
+        registry = self.make_registry(ttl_seconds=60, error_retry_seconds=10)
+
+        self.assertEqual(self.read(registry), [])
+        self.assertFalse(registry.is_loaded)
+        self.assertIsNone(registry.age)
+        self.assertEqual(registry.last_error, "Connection refused")
+
+        # Failed refreshes are retried after error_retry_seconds, not on every read
+        self.now += 5
+        self.assertEqual(self.read(registry), [])
+        self.assertEqual(len(self.requests), 1)
+        self.responses = [tags_response("llama2")]
+        self.now += 5
+        self.read(registry)
+        self.assertEqual(registry.model_names(), ["llama2"])
+        self.assertIsNone(registry.last_error)
+
+    def test_serves_stale_list_when_refresh_fails(self):
+        self.responses = [tags_response("llama2"), httpx.ConnectError("Connection refused"),
+                          httpx.Response(500, json={"error": "internal error"})]
+        registry = self.make_registry(ttl_seconds=60, error_retry_seconds=10)
+        self.read(registry)
+
+        self.now += 61
+        self.assertFalse(registry.refresh())
+        self.assertEqual(registry.model_names(), ["llama2"])
+        self.assertEqual(registry.age, 61)
+
+        self.now += 10
+        self.assertEqual(self.read(registry)[0]["name"], "llama2")
+        self.assertIn("500", registry.last_error)
+        self.assertEqual(registry.model_names(), ["llama2"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,180 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the project root to the sys.path to allow importing the ContentGen modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from ContentGen import storage_core
+from ContentGen.storage_core import (GeneratedContent, MAX_PAGE_SIZE, build_match_query, decode_cursor,
+                                     encode_cursor, get_content_page, init_db, save_content, search_content,
+                                     segment_for_search)
+
+class TestStorageCore(unittest.TestCase):
+    def setUp(self):
+        # Every test works on its own temporary database
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        database_file = os.path.join(temp_dir, "test.db")
+        engine = create_engine(f"sqlite:///{database_file}")
+        self.addCleanup(engine.dispose)
+        for name, value in (("DATABASE_FILE", database_file), ("engine", engine),
+                            ("SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))):
+            patcher = patch.object(storage_core, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        init_db()
+        self.start = datetime(2024, 1, 1, 12, 0, 0)
+
+    def _add(self, entries):
+        """
+        Inserts (prompt, response, language, timestamp) entries and returns their ids.
+        """
+        db = storage_core.SessionLocal()
+        try:
+            contents = [GeneratedContent(prompt=prompt, response=response, language=language, timestamp=timestamp)
+                        for prompt, response, language, timestamp in entries]
+            db.add_all(contents)
+            db.commit()
+            return [content.id for content in contents]
+        finally:
+            db.close()
+
+    def _all_pages(self, **kwargs):
+        ids, cursor = [], None
+        while True:
+            rows, cursor = get_content_page(cursor=cursor, **kwargs)
+            ids.extend(row.id for row in rows)
+            if cursor is None:
+                return ids
+
+    def test_cursor_round_trip(self):
+        timestamp = datetime(2024, 5, 6, 7, 8, 9, 123456)
+        self.assertEqual(decode_cursor(encode_cursor(timestamp, 42)), (timestamp, 42))
+        with self.assertRaises(ValueError):
+            decode_cursor("not a cursor")
+
+    def test_pages_cover_history_once(self):
+        ids = self._add([(f"prompt {i}", f"response {i}", "English", self.start + timedelta(minutes=i))
+                         for i in range(25)])
+
+        rows, cursor = get_content_page(limit=10)
+        self.assertEqual([row.id for row in rows], ids[::-1][:10])
+        self.assertIsNotNone(cursor)
+        rows, _ = get_content_page(limit=10, cursor=cursor)
+        self.assertEqual([row.id for row in rows], ids[::-1][10:20])
+
+        # Newest first, every entry exactly once
+        self.assertEqual(self._all_pages(limit=7), ids[::-1])
+        # An exactly full last page has no next cursor
+        self.assertEqual(get_content_page(limit=25)[1], None)
+
+    def test_rows_sharing_a_timestamp(self):
+        ids = self._add([(f"prompt {i}", f"response {i}", "English", self.start) for i in range(5)])
+        ids += self._add([("later", "response", "English", self.start + timedelta(seconds=1))])
+
+        # Ties on the timestamp are broken by id, so a page boundary never skips or repeats one
+        for limit in (1, 2, 3):
+            self.assertEqual(self._all_pages(limit=limit), ids[::-1])
+
+    def test_language_filter(self):
+        entries = [(f"prompt {i}", f"response {i}", "Chinese" if i % 3 == 0 else "English",
+                    self.start + timedelta(minutes=i // 2)) for i in range(20)]
+        ids = self._add(entries)
+        chinese_ids = [content_id for content_id, entry in zip(ids, entries) if entry[2] == "Chinese"]
+
+        self.assertEqual(self._all_pages(limit=2, language="Chinese"), chinese_ids[::-1])
+        rows, _ = get_content_page(language="Chinese")
+        self.assertTrue(all(row.language == "Chinese" for row in rows))
+        self.assertEqual(get_content_page(language="French"), ([], None))
+
+    def test_page_size_is_clamped(self):
+        self._add([("prompt", "response", "English", self.start + timedelta(seconds=i))
+                   for i in range(MAX_PAGE_SIZE + 5)])
+
+        rows, cursor = get_content_page(limit=MAX_PAGE_SIZE * 10)
+        self.assertEqual(len(rows), MAX_PAGE_SIZE)
+        self.assertIsNotNone(cursor)
+        rows, _ = get_content_page(limit=0)
+        self.assertEqual(len(rows), 1)
+
+    def test_page_has_response_preview(self):
+        self._add([("prompt", "x" * 500, "English", self.start)])
+        rows, _ = get_content_page(preview_chars=50)
+        self.assertEqual((len(rows[0].response_preview), rows[0].response_length), (50, 500))
+
+    def _search_ids(self, query, **kwargs):
+        return [row.id for row in search_content(query, **kwargs)[0]]
+
+    def test_search_index_follows_writes(self):
+        content_id = save_content("Write a poem about the sea.", "Waves roll under a silver moon.", "English").id
+        self.assertEqual(self._search_ids("moon"), [content_id])
+
+        db = storage_core.SessionLocal()
+        try:
+            content = db.get(GeneratedContent, content_id)
+            content.response = "Stars shine over the quiet harbour."
+            db.commit()
+            self.assertEqual(self._search_ids("moon"), [])
+            self.assertEqual(self._search_ids("harbour"), [content_id])
+
+            db.delete(content)
+            db.commit()
+        finally:
+            db.close()
+        self.assertEqual(self._search_ids("harbour"), [])
+        self.assertEqual(self._search_ids("poem"), [])
+
+    def test_search_ranks_prompt_matches_higher(self):
+        response_match = save_content("Tell a story.", "A lighthouse keeper waits.", "English").id
+        prompt_match = save_content("Describe a lighthouse.", "It stands on the cliff.", "English").id
+        self.assertEqual(self._search_ids("lighthouse"), [prompt_match, response_match])
+        # Every term must match
+        self.assertEqual(self._search_ids("lighthouse cliff"), [prompt_match])
+
+    def test_cjk_bigrams(self):
+        self.assertEqual(segment_for_search("机器学习 AI"), "机器 器学 学习 习 ai")
+        content_id = save_content("介绍机器学习", "机器学习是人工智能的一个分支。", "Chinese").id
+
+        for query in ("机器学习", "学习", "人工智能", "智"):
+            self.assertEqual(self._search_ids(query), [content_id], query)
+        # A substring must appear contiguously, not just as scattered characters
+        self.assertEqual(self._search_ids("机学"), [])
+
+    def test_traditional_and_simplified_match(self):
+        traditional_id = save_content("寫一首關於山的詩。", "高山巍峨，雲霧繚繞。", "Chinese").id
+        simplified_id = save_content("写一首关于海的诗。", "大海辽阔。", "Chinese").id
+
+        self.assertEqual(self._search_ids("关于山"), [traditional_id])
+        self.assertEqual(self._search_ids("云雾"), [traditional_id])
+        self.assertEqual(self._search_ids("關於海"), [simplified_id])
+        self.assertEqual(sorted(self._search_ids("一首")), sorted([traditional_id, simplified_id]))
+
+    def test_query_syntax_is_escaped(self):
+        content_id = save_content('She said "hello" OR left', "NEAR the door AND the window.", "English").id
+
+        self.assertEqual(build_match_query('"hello" OR NEAR(door'), '"hello" AND "or" AND "near" AND "door"')
+        for query in ('"hello', 'hello"', "door)", "NEAR(door window)", "window*", 'said "hello" OR'):
+            self.assertEqual(self._search_ids(query), [content_id], query)
+        self.assertIsNone(build_match_query('"" () *'))
+        self.assertEqual(search_content('""'), ([], False))
+
+    def test_search_language_filter_and_paging(self):
+        english_ids = [save_content(f"Ocean poem {i}", "Waves.", "English").id for i in range(3)]
+        save_content("Ocean", "Waves.", "French")
+
+        self.assertEqual(sorted(self._search_ids("ocean", language="English")), english_ids)
+        first, has_more = search_content("ocean", limit=2)
+        second, more_after = search_content("ocean", limit=2, offset=2)
+        self.assertEqual((len(first), has_more, len(second), more_after), (2, True, 2, False))
+        self.assertEqual(len({row.id for row in first + second}), 4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,17 +1,23 @@
-import requests
-import json
-from typing import Dict, Any, List
+import httpx
+from typing import Dict, Any, Generator, List
 import zhconv # Import zhconv
 import os # Import os module
 import sys # Import sys module
 
 from ContentGen.storage_core import save_content, GeneratedContent
 from ContentGen.config import config
+from Shared.ollama_client import OllamaClient
+
+# One pooled client per process, so Flask's request threads reuse keep-alive connections to Ollama
+ollama_client = OllamaClient(config.OLLAMA_API_URL, timeout=config.OLLAMA_TIMEOUT,
+                             max_concurrency=config.OLLAMA_MAX_CONCURRENCY,
+                             max_retries=config.OLLAMA_MAX_RETRIES)
 
 class TextEngine:
     def __init__(self):
         self.ollama_url = config.OLLAMA_API_URL
         self.default_ollama_model = config.DEFAULT_OLLAMA_MODEL
+        self.ollama_client = ollama_client
         
         # No OpenCC initialization needed with zhconv
 
@@ -26,52 +32,69 @@ class TextEngine:
         """
         model_to_use = model if model else self.default_ollama_model
 
-        payload = {
-            "model": model_to_use,
-            "prompt": prompt,
-            "stream": False
-        }
-        headers = {"Content-Type": "application/json"}
-
         try:
-            response = requests.post(self.ollama_url, headers=headers, data=json.dumps(payload))
-            response.raise_for_status()
-            
-            response_data = response.json()
-            generated_text = response_data.get("response", "").strip()
+            generated_text = self.ollama_client.generate(prompt, model_to_use)
 
             # Convert Chinese text if specified
-            if language == "Simplified Chinese":
-                generated_text = zhconv.convert(generated_text, 'zh-cn')
-            elif language == "Traditional Chinese":
-                generated_text = zhconv.convert(generated_text, 'zh-tw')
+            generated_text = self._convert_script(generated_text, language)
 
             # Save the generated content to the database
             save_content(prompt=prompt, response=generated_text, language=language)
 
             return generated_text
-        except requests.exceptions.ConnectionError:
-            return f"Error: Could not connect to Ollama at {self.ollama_url}. Is Ollama running?"
-        except requests.exceptions.RequestException as e:
-            return f"Error during Ollama API request: {e}"
         except Exception as e:
-            return f"An unexpected error occurred: {e}"
+            return self.error_message(e)
+
+    def stream_text(self, prompt: str, language: str = "English", model: str = None) -> Generator[str, None, str]:
+        """
+        Streaming version of `generate_text`: yields the text piece by piece as Ollama generates
+        it, each piece already converted to the requested Chinese script. Once the generation
+        is complete, the whole text is converted again (phrases may span pieces), saved to the
+        database and returned as the generator's return value.
+        Errors are raised; `error_message` turns them into the messages `generate_text` returns.
+        :param prompt: The user's prompt for text generation.
+        :param language: The target language/script of the generated text.
+        :param model: The Ollama model to use. If None, uses the default from config.
+        :return: The final generated text.
+        """
+        model_to_use = model if model else self.default_ollama_model
+        pieces = []
+        for piece in self.ollama_client.stream_generate(prompt, model_to_use):
+            pieces.append(piece)
+            yield self._convert_script(piece, language)
+
+        generated_text = self._convert_script("".join(pieces).strip(), language)
+        save_content(prompt=prompt, response=generated_text, language=language)
+        return generated_text
+
+    @staticmethod
+    def _convert_script(text: str, language: str) -> str:
+        if language == "Simplified Chinese":
+            return zhconv.convert(text, 'zh-cn')
+        if language == "Traditional Chinese":
+            return zhconv.convert(text, 'zh-tw')
+        return text
+
+    def error_message(self, error: Exception) -> str:
+        """
+        Returns the user-facing message for an error raised while generating text.
+        """
+        if isinstance(error, httpx.ConnectError):
+            return f"Error: Could not connect to Ollama at {self.ollama_url}. Is Ollama running?"
+        if isinstance(error, httpx.HTTPError):
+            return f"Error during Ollama API request: {error}"
+        return f"An unexpected error occurred: {error}"
 
 def get_available_ollama_models() -> List[str]:
     """
     Queries the Ollama API to get a list of available models.
     """
-    ollama_tags_url = config.OLLAMA_API_URL.replace("/api/generate", "/api/tags")
     try:
-        response = requests.get(ollama_tags_url)
-        response.raise_for_status()
-        data = response.json()
-        models = [m['name'] for m in data.get('models', [])]
-        return models
-    except requests.exceptions.ConnectionError:
-        print(f"Warning: Could not connect to Ollama at {ollama_tags_url}. Is Ollama running?")
+        return ollama_client.list_models()
+    except httpx.ConnectError:
+        print(f"Warning: Could not connect to Ollama at {ollama_client.tags_url}. Is Ollama running?")
         return []
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         print(f"Warning: Error during Ollama API tags request: {e}")
         return []
     except Exception as e:
@@ -115,3 +138,11 @@ if __name__ == "__main__":
     chinese_traditional_response = engine.generate_text(chinese_traditional_prompt, language="Traditional Chinese", model="qwen2.5:0.5b") 
     print(f"Prompt: {chinese_traditional_prompt}")
     print(f"Response (Traditional): {chinese_traditional_response}\n")
+
+    print("--- Streaming English text ---")
+    try:
+        for piece in engine.stream_text("Write a haiku about autumn.", language="English"):
+            print(piece, end="", flush=True)
+        print()
+    except Exception as e:
+        print(engine.error_message(e))
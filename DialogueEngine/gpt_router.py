@@ -1,55 +1,156 @@
+import asyncio
 import openai
-import requests
-import json
-from typing import Dict, List, Optional
+import httpx
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from Shared.ollama_client import OllamaClient
 from .config import config
 from .prompt_manager import PromptManager
 
+class LLMResponseError(Exception):
+    """
+    Raised by `GPTRouter.astream_gpt_response` with the same message `get_gpt_response` would return.
+    """
+
 class GPTRouter:
     def __init__(self):
         self.openai_client = openai.OpenAI(api_key=config.OPENAI_API_KEY)
+        self._async_openai_client: Optional[openai.AsyncOpenAI] = None
         self.prompt_manager = PromptManager()
         self.ollama_api_url = config.OLLAMA_API_URL
         self.default_ollama_model = config.DEFAULT_OLLAMA_MODEL
+        # Pooled keep-alive connections to Ollama, shared by all chats of this worker
+        self.ollama_client = OllamaClient(self.ollama_api_url, timeout=config.OLLAMA_TIMEOUT,
+                                          max_concurrency=config.OLLAMA_MAX_CONCURRENCY,
+                                          max_retries=config.OLLAMA_MAX_RETRIES)
+
+    def _ollama_error_message(self, error: Exception) -> str:
+        if isinstance(error, httpx.ConnectError):
+            return f"Error: Could not connect to Ollama at {self.ollama_api_url}. Is Ollama running?"
+        if isinstance(error, httpx.HTTPError):
+            return f"Error during Ollama API request: {error}"
+        return f"An unexpected error occurred with Ollama: {error}"
 
     def _get_ollama_response(self, system_message: str, user_message: str, model: str) -> str:
         """
         Makes a request to the local Ollama API to get a response.
+        Blocks until the response arrives; async code should await `_aget_ollama_response`.
         """
-        payload = {
-            "model": model,
-            "prompt": f"{system_message}\n\n{user_message}", # Ollama often prefers a combined prompt
-            "stream": False
-        }
-        headers = {"Content-Type": "application/json"}
+        try:
+            # Ollama often prefers a combined prompt
+            return self.ollama_client.generate(f"{system_message}\n\n{user_message}", model)
+        except Exception as e:
+            return self._ollama_error_message(e)
 
+    async def _aget_ollama_response(self, system_message: str, user_message: str, model: str) -> str:
+        """
+        Async version of `_get_ollama_response`, which does not block the event loop while
+        Ollama generates.
+        """
         try:
-            response = requests.post(self.ollama_api_url, headers=headers, data=json.dumps(payload))
-            response.raise_for_status()
-            response_data = response.json()
-            return response_data.get("response", "").strip()
-        except requests.exceptions.ConnectionError:
-            return f"Error: Could not connect to Ollama at {self.ollama_api_url}. Is Ollama running?"
-        except requests.exceptions.RequestException as e:
-            return f"Error during Ollama API request: {e}"
+            return await self.ollama_client.agenerate(f"{system_message}\n\n{user_message}", model)
         except Exception as e:
-            return f"An unexpected error occurred with Ollama: {e}"
+            return self._ollama_error_message(e)
 
-    def get_gpt_response(self, course_id: str, user_query: str, llm_provider: Optional[str] = None) -> str:
+    @property
+    def async_openai_client(self) -> openai.AsyncOpenAI:
         """
-        Retrieves an LLM response based on the course ID, user query, and specified LLM provider.
+        OpenAI client for streaming responses, created on first use.
         """
-        provider_to_use = (llm_provider if llm_provider else config.DEFAULT_LLM_PROVIDER).lower()
+        if self._async_openai_client is None:
+            self._async_openai_client = openai.AsyncOpenAI(api_key=config.OPENAI_API_KEY)
+        return self._async_openai_client
+
+    def _openai_error_message(self, error: Exception) -> str:
+        if isinstance(error, openai.APIError):
+            print(f"OpenAI API Error (status_code: {error.status_code}): {error.response}") # More detailed logging
+            return f"Error: An error occurred while communicating with OpenAI. Details: {error.status_code} - {error.response.json().get('error', {}).get('message', 'No message provided')}"
+        print(f"An unexpected error occurred with OpenAI: {error}")
+        return f"Error: An unexpected error occurred. Details: {error}"
+
+    def _get_openai_response(self, system_message: str, user_message: str) -> str:
+        """
+        Makes a request to the OpenAI chat completions API to get a response.
+        """
+        messages: List[Dict[str, str]] = [
+            {"role": "system", "content": system_message},
+            {"role": "user", "content": user_message}
+        ]
+        try:
+            chat_completion = self.openai_client.chat.completions.create(
+                model=config.DEFAULT_GPT_MODEL,
+                messages=messages
+            )
+            return chat_completion.choices[0].message.content
+        except Exception as e:
+            return self._openai_error_message(e)
 
+    def _get_prompt_messages(self, course_id: str, user_query: str) -> Optional[Tuple[str, str]]:
+        """
+        Returns the (system message, user message) for the course, falling back to the default
+        prompt, or None if no prompt is configured.
+        """
         prompt_data = self.prompt_manager.get_prompt(course_id)
         if not prompt_data:
             print(f"Warning: No specific prompt found for course ID '{course_id}'. Using default prompt.")
             prompt_data = self.prompt_manager.get_prompt("default")
             if not prompt_data:
-                return "Error: No default prompt configured."
+                return None
 
         system_message = prompt_data["system_message"]
         user_message = prompt_data["user_message_template"].format(user_query=user_query)
+        return system_message, user_message
+
+    def get_gpt_response(self, course_id: str, user_query: str, llm_provider: Optional[str] = None) -> str:
+        """
+        Retrieves an LLM response based on the course ID, user query, and specified LLM provider.
+        """
+        provider_to_use = (llm_provider if llm_provider else config.DEFAULT_LLM_PROVIDER).lower()
+
+        prompt_messages = self._get_prompt_messages(course_id, user_query)
+        if prompt_messages is None:
+            return "Error: No default prompt configured."
+        system_message, user_message = prompt_messages
+
+        if provider_to_use == "openai":
+            return self._get_openai_response(system_message, user_message)
+        elif provider_to_use == "ollama":
+            return self._get_ollama_response(system_message, user_message, self.default_ollama_model)
+        else:
+            return f"Error: Unknown LLM provider '{provider_to_use}'."
+
+    async def aget_gpt_response(self, course_id: str, user_query: str, llm_provider: Optional[str] = None) -> str:
+        """
+        Async version of `get_gpt_response` for the FastAPI endpoints: Ollama requests are awaited
+        on the shared connection pool and OpenAI requests run in a worker thread, so one worker
+        serves many chats concurrently.
+        """
+        provider_to_use = (llm_provider if llm_provider else config.DEFAULT_LLM_PROVIDER).lower()
+
+        prompt_messages = self._get_prompt_messages(course_id, user_query)
+        if prompt_messages is None:
+            return "Error: No default prompt configured."
+        system_message, user_message = prompt_messages
+
+        if provider_to_use == "openai":
+            return await asyncio.to_thread(self._get_openai_response, system_message, user_message)
+        elif provider_to_use == "ollama":
+            return await self._aget_ollama_response(system_message, user_message, self.default_ollama_model)
+        else:
+            return f"Error: Unknown LLM provider '{provider_to_use}'."
+
+    async def astream_gpt_response(self, course_id: str, user_query: str,
+                                   llm_provider: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Streaming version of `aget_gpt_response`: yields the response piece by piece as the model
+        generates it (Ollama's NDJSON stream or OpenAI's streamed chat completion).
+        Errors are raised as LLMResponseError, possibly after some pieces have been yielded.
+        """
+        provider_to_use = (llm_provider if llm_provider else config.DEFAULT_LLM_PROVIDER).lower()
+
+        prompt_messages = self._get_prompt_messages(course_id, user_query)
+        if prompt_messages is None:
+            raise LLMResponseError("Error: No default prompt configured.")
+        system_message, user_message = prompt_messages
 
         if provider_to_use == "openai":
             messages: List[Dict[str, str]] = [
@@ -57,21 +158,25 @@ class GPTRouter:
                 {"role": "user", "content": user_message}
             ]
             try:
-                chat_completion = self.openai_client.chat.completions.create(
+                stream = await self.async_openai_client.chat.completions.create(
                     model=config.DEFAULT_GPT_MODEL,
-                    messages=messages
+                    messages=messages,
+                    stream=True
                 )
-                return chat_completion.choices[0].message.content
-            except openai.APIError as e:
-                print(f"OpenAI API Error (status_code: {e.status_code}): {e.response}") # More detailed logging
-                return f"Error: An error occurred while communicating with OpenAI. Details: {e.status_code} - {e.response.json().get('error', {}).get('message', 'No message provided')}"
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
             except Exception as e:
-                print(f"An unexpected error occurred with OpenAI: {e}")
-                return f"Error: An unexpected error occurred. Details: {e}"
+                raise LLMResponseError(self._openai_error_message(e)) from e
         elif provider_to_use == "ollama":
-            return self._get_ollama_response(system_message, user_message, self.default_ollama_model)
+            try:
+                async for piece in self.ollama_client.astream_generate(f"{system_message}\n\n{user_message}",
+                                                                       self.default_ollama_model):
+                    yield piece
+            except Exception as e:
+                raise LLMResponseError(self._ollama_error_message(e)) from e
         else:
-            return f"Error: Unknown LLM provider '{provider_to_use}'."
+            raise LLMResponseError(f"Error: Unknown LLM provider '{provider_to_use}'.")
 
 if __name__ == "__main__":
     # Ensure you have OPENAI_API_KEY set in your .env file for OpenAI testing
@@ -96,4 +201,14 @@ if __name__ == "__main__":
 
     print("--- Testing with non-existent course ID ---")
     response_nonexistent_openai = router.get_gpt_response("nonexistent_course", "Hello there.", llm_provider="openai")
-    print(f"Response (nonexistent_course/OpenAI): {response_nonexistent_openai}\n")
\ No newline at end of file
+    print(f"Response (nonexistent_course/OpenAI): {response_nonexistent_openai}\n")
+
+    print("--- Streaming with math101 course ID (Ollama) ---")
+    async def print_stream():
+        async for piece in router.astream_gpt_response("math101", "What is 12 * 12?", llm_provider="ollama"):
+            print(piece, end="", flush=True)
+        print()
+    try:
+        asyncio.run(print_stream())
+    except LLMResponseError as e:
+        print(e)
\ No newline at end of file
@@ -1,15 +1,23 @@
 from fastapi import FastAPI, HTTPException, Depends, Header, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from pydantic import BaseModel
-from typing import Optional, Dict
+from typing import AsyncIterator, Optional, Dict
+from contextlib import asynccontextmanager
 
+from Shared.sse import SSE_HEADERS, sse_event
 from .config import config
-from .gpt_router import GPTRouter
+from .gpt_router import GPTRouter, LLMResponseError
 from .prompt_manager import PromptManager
 
-app = FastAPI()
 gpt_router = GPTRouter()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await gpt_router.ollama_client.aclose() # Close the pooled Ollama connections on shutdown
+
+app = FastAPI(lifespan=lifespan)
 prompt_manager = PromptManager() # Re-initialize to ensure default prompts are loaded
 
 # Initialize Jinja2Templates
@@ -30,6 +38,7 @@ class ChatRequest(BaseModel):
     courseId: str
     message: str
     llm_provider: Optional[str] = None # New field for LLM provider
+    stream: bool = False # Stream the response as Server-Sent Events
 
 class PromptUpdateRequest(BaseModel):
     course_id: str
@@ -49,13 +58,32 @@ async def chat_ui(request: Request):
     """
     return templates.TemplateResponse("chat.html", {"request": request})
 
+async def chat_event_stream(request: ChatRequest) -> AsyncIterator[str]:
+    """
+    Yields the response as Server-Sent Events: a "token" event per generated piece, then a
+    "done" event with the full response, or an "error" event.
+    """
+    pieces = []
+    try:
+        async for piece in gpt_router.astream_gpt_response(request.courseId, request.message,
+                                                           llm_provider=request.llm_provider):
+            pieces.append(piece)
+            yield sse_event("token", {"token": piece})
+    except LLMResponseError as e:
+        yield sse_event("error", {"detail": str(e)})
+        return
+    yield sse_event("done", {"response": "".join(pieces).strip()})
+
 @app.post("/chat")
 async def chat_endpoint(request: ChatRequest):
     """
     Endpoint for student chat interactions.
     Routes the message to the appropriate GPT model based on courseId and llm_provider.
+    With "stream": true, tokens are sent as Server-Sent Events as soon as the model produces them.
     """
-    response_content = gpt_router.get_gpt_response(
+    if request.stream:
+        return StreamingResponse(chat_event_stream(request), media_type="text/event-stream", headers=SSE_HEADERS)
+    response_content = await gpt_router.aget_gpt_response(
         request.courseId, 
         request.message, 
         llm_provider=request.llm_provider
@@ -1,14 +1,16 @@
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
 import openai
 import requests
+import asyncio
+import httpx
 
 # Temporarily add the parent directory to sys.path to allow importing modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from ChatGPT.gpt_router import GPTRouter
+from ChatGPT.gpt_router import GPTRouter, LLMResponseError
 from ChatGPT.config import config
 from ChatGPT.prompt_manager import PromptManager
 
@@ -90,5 +92,60 @@ class TestGPTRouter(unittest.TestCase):
         response = self.router.get_gpt_response("default", "Test query", llm_provider="openai")
         self.assertEqual(response, "Error: No default prompt configured.")
 
+    def test_aget_gpt_response_ollama(self):
+        with patch.object(self.router, '_aget_ollama_response', AsyncMock(return_value="Mocked async Ollama response.")) as mock_aget:
+            response = asyncio.run(self.router.aget_gpt_response("default", "Test query", llm_provider="ollama"))
+        self.assertEqual(response, "Mocked async Ollama response.")
+        mock_aget.assert_awaited_once()
+        self.mock_get_ollama_response.assert_not_called()
+
+    def test_aget_gpt_response_openai(self):
+        self.mock_openai_client.chat.completions.create.return_value = MagicMock(
+            choices=[MagicMock(message=MagicMock(content="Mocked OpenAI response."))]
+        )
+        response = asyncio.run(self.router.aget_gpt_response("default", "Test query", llm_provider="openai"))
+        self.assertEqual(response, "Mocked OpenAI response.")
+        self.mock_openai_client.chat.completions.create.assert_called_once()
+
+    def test_aget_ollama_response_connection_error(self):
+        self.router.ollama_client.agenerate = AsyncMock(side_effect=httpx.ConnectError("refused"))
+        response = asyncio.run(self.router._aget_ollama_response("system", "user", "llama2"))
+        self.assertIn("Error: Could not connect to Ollama", response)
+
+    def collect_stream(self, llm_provider):
+        async def collect():
+            return [piece async for piece in self.router.astream_gpt_response("default", "Test query",
+                                                                              llm_provider=llm_provider)]
+        return asyncio.run(collect())
+
+    def test_astream_gpt_response_ollama(self):
+        async def fake_stream(prompt, model):
+            self.assertIn("Test query", prompt)
+            for piece in ["Hello", ", ", "world"]:
+                yield piece
+        self.router.ollama_client.astream_generate = fake_stream
+        self.assertEqual(self.collect_stream("ollama"), ["Hello", ", ", "world"])
+
+    def test_astream_gpt_response_openai(self):
+        async def fake_completion_stream():
+            for content in ["Streamed", None, " response"]:
+                yield MagicMock(choices=[MagicMock(delta=MagicMock(content=content))])
+        mock_async_client = MagicMock()
+        mock_async_client.chat.completions.create = AsyncMock(return_value=fake_completion_stream())
+        self.router._async_openai_client = mock_async_client
+
+        self.assertEqual(self.collect_stream("openai"), ["Streamed", " response"])
+        self.assertTrue(mock_async_client.chat.completions.create.call_args.kwargs["stream"])
+
+    def test_astream_gpt_response_errors(self):
+        async def failing_stream(prompt, model):
+            yield "partial"
+            raise httpx.ConnectError("refused")
+        self.router.ollama_client.astream_generate = failing_stream
+        with self.assertRaisesRegex(LLMResponseError, "Could not connect to Ollama"):
+            self.collect_stream("ollama")
+        with self.assertRaisesRegex(LLMResponseError, "Unknown LLM provider"):
+            self.collect_stream("unknown_provider")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
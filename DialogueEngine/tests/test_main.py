@@ -1,6 +1,6 @@
 import unittest
 import httpx
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 import sys
 import os
 import asyncio
@@ -31,7 +31,7 @@ class TestMainAPI(unittest.TestCase):
 
     @patch('ChatGPT.main.gpt_router')
     async def test_chat_endpoint_openai_success(self, mock_gpt_router):
-        mock_gpt_router.get_gpt_response.return_value = "Mocked OpenAI chat response."
+        mock_gpt_router.aget_gpt_response = AsyncMock(return_value="Mocked OpenAI chat response.")
         
         response = await self.client.post(
             "/chat", 
@@ -39,11 +39,11 @@ class TestMainAPI(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"response": "Mocked OpenAI chat response."})
-        mock_gpt_router.get_gpt_response.assert_called_once_with("default", "Hello", llm_provider="openai")
+        mock_gpt_router.aget_gpt_response.assert_awaited_once_with("default", "Hello", llm_provider="openai")
 
     @patch('ChatGPT.main.gpt_router')
     async def test_chat_endpoint_ollama_success(self, mock_gpt_router):
-        mock_gpt_router.get_gpt_response.return_value = "Mocked Ollama chat response."
+        mock_gpt_router.aget_gpt_response = AsyncMock(return_value="Mocked Ollama chat response.")
         
         response = await self.client.post(
             "/chat", 
@@ -51,11 +51,11 @@ class TestMainAPI(unittest.TestCase):
         )
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), {"response": "Mocked Ollama chat response."})
-        mock_gpt_router.get_gpt_response.assert_called_once_with("math101", "Solve this", llm_provider="ollama")
+        mock_gpt_router.aget_gpt_response.assert_awaited_once_with("math101", "Solve this", llm_provider="ollama")
 
     @patch('ChatGPT.main.gpt_router')
     async def test_chat_endpoint_error_from_gpt_router(self, mock_gpt_router):
-        mock_gpt_router.get_gpt_response.return_value = "Error: Something went wrong with LLM."
+        mock_gpt_router.aget_gpt_response = AsyncMock(return_value="Error: Something went wrong with LLM.")
         
         response = await self.client.post(
             "/chat", 
@@ -0,0 +1,276 @@
+import json
+import math
+import os
+import re
+import shutil
+import unicodedata
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .text_utils import CJK_CHARS
+
+HEADER_FILENAME = "bm25.json"
+VOCABULARY_FILENAME = "vocabulary.json"
+
+# CJK runs are split into character unigrams and bigrams; everything else into word tokens
+_TOKEN_PATTERN = re.compile(f"([{CJK_CHARS}]+)|([^\\W{CJK_CHARS}]+)")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into BM25 terms. Latin words, numbers and identifiers become lower-cased word tokens
+    (e.g. "CS-101" -> ["cs", "101"]); CJK runs become character unigrams plus bigrams, so
+    multi-character words match without a dictionary-based segmenter.
+    """
+    tokens = []
+    for cjk, word in _TOKEN_PATTERN.findall(unicodedata.normalize("NFKC", text).lower()):
+        if word:
+            tokens.append(word)
+        else:
+            tokens.extend(cjk)
+            tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+    return tokens
+
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Inverted index scoring documents with Okapi BM25, used next to the vector index to find
+        exact identifiers, course codes and error strings that dense embeddings miss.
+        Saved postings are stored in CSR form (one offsets array into flat doc id and term frequency
+        arrays) and memory-mapped on load; documents added afterwards go to in-memory postings that
+        are merged in on the next save.
+        :param k1: Term frequency saturation.
+        :param b: Document length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self.vocabulary: Dict[str, int] = {}  # term -> row of the CSR postings
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._doc_ids = np.zeros(0, dtype=np.int32)
+        self._term_freqs = np.zeros(0, dtype=np.uint16)
+        self._pending: Dict[str, Tuple[array, array]] = {}  # Postings added since the last save/load
+        self._doc_lengths = array("i")  # Token count per doc id; -1 once a deleted doc's postings are dropped
+        self._doc_count = 0
+        self._total_length = 0  # Token count of all live documents
+        self.deleted_ids = set()
+        self._deleted_array = None  # Sorted deleted ids, cached for search
+
+    def __len__(self) -> int:
+        """
+        Number of live (not deleted) documents.
+        """
+        return self._doc_count - len(self.deleted_ids)
+
+    def add(self, doc_ids: Iterable[int], texts: Iterable[str]):
+        """
+        Indexes documents under the given ids (the vector ids returned by `VectorDB.add_vectors`).
+        """
+        for doc_id, text in zip(doc_ids, texts):
+            term_counts = Counter(tokenize(text))
+            length = sum(term_counts.values())
+            if doc_id >= len(self._doc_lengths):
+                self._doc_lengths.extend([0] * (doc_id + 1 - len(self._doc_lengths)))
+            self._doc_lengths[doc_id] = length
+            self._doc_count += 1
+            self._total_length += length
+            for term, count in term_counts.items():
+                postings = self._pending.get(term)
+                if postings is None:
+                    postings = self._pending[term] = (array("i"), array("H"))
+                postings[0].append(doc_id)
+                postings[1].append(min(count, 0xFFFF))
+
+    def delete(self, ids: Iterable[int]):
+        """
+        Excludes documents from search results. Their postings are kept, like the tombstoned
+        vectors of `VectorDB`.
+        """
+        for doc_id in ids:
+            if 0 <= doc_id < len(self._doc_lengths) and self._doc_lengths[doc_id] >= 0 and doc_id not in self.deleted_ids:
+                self.deleted_ids.add(doc_id)
+                self._total_length -= self._doc_lengths[doc_id]
+        self._deleted_array = None
+
+    def _postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        parts_docs, parts_freqs = [], []
+        row = self.vocabulary.get(term)
+        if row is not None:
+            start, end = self._offsets[row], self._offsets[row + 1]
+            parts_docs.append(self._doc_ids[start:end])
+            parts_freqs.append(self._term_freqs[start:end])
+        pending = self._pending.get(term)
+        if pending is not None:
+            parts_docs.append(np.frombuffer(pending[0], dtype=np.int32))
+            parts_freqs.append(np.frombuffer(pending[1], dtype=np.uint16))
+        if len(parts_docs) == 1:
+            return parts_docs[0], parts_freqs[0]
+        if not parts_docs:
+            return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.uint16)
+        return np.concatenate(parts_docs), np.concatenate(parts_freqs)
+
+    def search(self, query: str, k: int = 5, mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Scores documents against a query.
+        :param mask: Optional boolean array indexed by doc id; only documents where it is True
+                     are returned (e.g. `MetadataStore.select` for a metadata filter).
+        :return: Up to k (doc id, BM25 score) pairs, best first. Documents matching no query term
+                 are not returned.
+        """
+        num_docs = len(self)
+        terms = set(tokenize(query))
+        if not terms or num_docs == 0:
+            return []
+        avg_length = max(self._total_length / num_docs, 1e-9)
+        doc_lengths = np.frombuffer(self._doc_lengths, dtype=np.int32)
+
+        matched_docs, contributions = [], []
+        for term in terms:
+            docs, freqs = self._postings(term)
+            if len(docs) == 0:
+                continue
+            document_frequency = len(docs)
+            idf = math.log(1 + (num_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+            freqs = freqs.astype(np.float32)
+            norms = self.k1 * (1 - self.b + self.b * doc_lengths[docs] / avg_length)
+            matched_docs.append(docs)
+            contributions.append(idf * freqs * (self.k1 + 1) / (freqs + norms))
+        if not matched_docs:
+            return []
+
+        doc_ids, inverse = np.unique(np.concatenate(matched_docs), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions))
+        if self.deleted_ids:
+            if self._deleted_array is None:
+                self._deleted_array = np.array(sorted(self.deleted_ids), dtype=np.int32)
+            live = ~np.isin(doc_ids, self._deleted_array, assume_unique=True)
+            doc_ids, scores = doc_ids[live], scores[live]
+        if mask is not None:
+            allowed = doc_ids < len(mask)
+            allowed[allowed] = mask[doc_ids[allowed]]
+            doc_ids, scores = doc_ids[allowed], scores[allowed]
+
+        if len(scores) > k:
+            top = np.argpartition(-scores, k)[:k]
+            doc_ids, scores = doc_ids[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return list(zip(doc_ids[order].tolist(), scores[order].tolist()))
+
+    def _merged_postings(self) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Merges the saved CSR postings with the pending in-memory postings, leaving out the
+        postings of deleted documents.
+        """
+        terms = sorted(set(self.vocabulary) | set(self._pending))
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        doc_parts, freq_parts = [], []
+        for row, term in enumerate(terms):
+            docs, freqs = self._postings(term)
+            doc_parts.append(docs)
+            freq_parts.append(freqs)
+            offsets[row + 1] = offsets[row] + len(docs)
+        doc_ids = np.concatenate(doc_parts).astype(np.int32) if doc_parts else np.zeros(0, dtype=np.int32)
+        term_freqs = np.concatenate(freq_parts).astype(np.uint16) if freq_parts else np.zeros(0, dtype=np.uint16)
+
+        if self.deleted_ids and len(doc_ids):
+            keep = ~np.isin(doc_ids, np.fromiter(self.deleted_ids, dtype=np.int64))
+            kept_per_term = np.add.reduceat(keep.astype(np.int64), offsets[:-1])  # Every term has postings
+            doc_ids, term_freqs = doc_ids[keep], term_freqs[keep]
+            kept_terms = kept_per_term > 0
+            terms = [term for term, kept in zip(terms, kept_terms) if kept]
+            offsets = np.concatenate(([0], np.cumsum(kept_per_term[kept_terms])))
+        return terms, offsets, doc_ids, term_freqs
+
+    def save(self, path: str):
+        """
+        Writes the index to a directory. The directory is replaced as a whole so readers never see
+        a partially written index.
+        """
+        terms, offsets, doc_ids, term_freqs = self._merged_postings()
+        doc_count = self._doc_count - len(self.deleted_ids)  # Deleted documents are not written
+        for doc_id in self.deleted_ids:
+            self._doc_lengths[doc_id] = -1
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        with open(os.path.join(tmp_path, HEADER_FILENAME), "w", encoding="utf-8") as f:
+            json.dump({"k1": self.k1, "b": self.b, "doc_count": doc_count,
+                       "total_length": self._total_length}, f)
+        with open(os.path.join(tmp_path, VOCABULARY_FILENAME), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        arrays = {
+            "offsets": offsets,
+            "doc_ids": doc_ids,
+            "term_freqs": term_freqs,
+            "doc_lengths": np.frombuffer(self._doc_lengths, dtype=np.int32),
+        }
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+
+        old_path = path + ".old"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path, ignore_errors=True)
+
+        # Keep searching the merged postings so the next save does not merge them again
+        self.vocabulary = {term: row for row, term in enumerate(terms)}
+        self._offsets, self._doc_ids, self._term_freqs = offsets, doc_ids, term_freqs
+        self._pending = {}
+        self._doc_count = doc_count
+        self.deleted_ids = set()
+        self._deleted_array = None
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "BM25Index":
+        """
+        Opens an index written with `save`. With mmap=True the postings are memory-mapped.
+        """
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(path, HEADER_FILENAME), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        index = cls(k1=header["k1"], b=header["b"])
+        with open(os.path.join(path, VOCABULARY_FILENAME), "r", encoding="utf-8") as f:
+            index.vocabulary = {term: row for row, term in enumerate(json.load(f))}
+
+        def load_array(name: str, mode: Optional[str] = mmap_mode) -> np.ndarray:
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mode)
+
+        index._offsets = load_array("offsets")
+        index._doc_ids = load_array("doc_ids")
+        index._term_freqs = load_array("term_freqs")
+        index._doc_lengths = array("i", load_array("doc_lengths", None).tobytes())  # Grows on add
+        index._doc_count = header["doc_count"]
+        index._total_length = header["total_length"]
+        return index
+
+def reciprocal_rank_fusion(rankings: List[List[int]], k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuses several rankings of ids by summing 1 / (k + rank) over the rankings an id appears in.
+    Only ranks are used, so scores on different scales (BM25, cosine) can be combined.
+    :return: (id, fused score) pairs, best first.
+    """
+    fused: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda item: item[1], reverse=True)
+
+if __name__ == "__main__":
+    # Example usage:
+    bm25_index = BM25Index()
+    documents = [
+        "CS-101 Introduction to Programming covers variables, loops and functions.",
+        "Error E1234 means the upload exceeded the maximum file size.",
+        "機器學習是人工智慧的一個分支，研究電腦如何從資料中學習。",
+    ]
+    bm25_index.add(range(len(documents)), documents)
+
+    for query in ["cs-101", "E1234 error", "人工智慧"]:
+        print(f"\nSearching for: '{query}'")
+        for doc_id, score in bm25_index.search(query, k=2):
+            print(f"  ({score:.4f}) {documents[doc_id]}")
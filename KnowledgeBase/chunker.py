@@ -0,0 +1,151 @@
+import math
+import re
+from typing import Callable, List, Optional, Tuple
+
+from .embedding_module import Embedder, get_embedder
+from .text_utils import CJK_CHARS
+
+# Used when no tokenizer is available (sentence-transformers' default window is 128 tokens,
+# two of which are the special tokens added around every input)
+DEFAULT_MAX_TOKENS = 126
+
+# A sentence ends after Latin terminators followed by whitespace, or after CJK terminators
+# (which are not followed by spaces); closing quotes and brackets stay with their sentence.
+# Boundaries whose whitespace contains a blank line also end a paragraph.
+_BOUNDARY_PATTERN = re.compile("[.!?]+[\"')\\]]*\\s+|[。！？；…]+[」』）”’]*\\s*|\\n\\s*\\n\\s*")
+# Pieces a sentence that exceeds the budget on its own is cut into: CJK characters and words
+_PIECE_PATTERN = re.compile(f"[{CJK_CHARS}]\\s*|[^\\s{CJK_CHARS}]+\\s*|\\s+")
+# Rough subword count: CJK characters, 4-character word pieces and punctuation marks
+_ESTIMATE_PATTERN = re.compile(f"[{CJK_CHARS}]|[^\\W{CJK_CHARS}]{{1,4}}|[^\\w\\s]")
+
+def split_sentences(text: str) -> List[Tuple[str, bool]]:
+    """
+    Splits text into sentences, keeping the whitespace that follows each one so that joining
+    them gives back the original text.
+    :return: (sentence, ends_paragraph) pairs.
+    """
+    sentences = []
+    start = 0
+    for match in _BOUNDARY_PATTERN.finditer(text):
+        sentences.append((text[start:match.end()], match.group().count("\n") >= 2))
+        start = match.end()
+    if start < len(text):
+        sentences.append((text[start:], True))
+    return sentences
+
+def estimate_tokens(texts: List[str]) -> List[int]:
+    """
+    Approximates the subword token counts of texts without a tokenizer.
+    """
+    return [len(_ESTIMATE_PATTERN.findall(text)) for text in texts]
+
+class Chunker:
+    def __init__(self, max_tokens: Optional[int] = None, overlap_sentences: int = 0,
+                 count_tokens: Optional[Callable[[List[str]], List[int]]] = None,
+                 embedder: Optional[Embedder] = None):
+        """
+        Splits documents into chunks at paragraph and sentence boundaries (including CJK
+        punctuation), packing whole sentences into each chunk up to a token budget, so chunks fit
+        the embedding model's window instead of being truncated by it. Runs in linear time.
+        :param max_tokens: Token budget per chunk. Defaults to the embedder's `max_seq_length`
+                           minus the special tokens its tokenizer adds.
+        :param overlap_sentences: Trailing sentences of a chunk repeated at the start of the next.
+        :param count_tokens: Function returning the token count of each of a list of texts.
+                             Defaults to the embedder's tokenizer, or `estimate_tokens` if it has none.
+        :param embedder: The embedder the chunks are sized for. Defaults to the shared embedder;
+                         it is only consulted on first use, so the model still loads lazily.
+        """
+        self.max_tokens = max_tokens
+        self.overlap_sentences = overlap_sentences
+        self.count_tokens = count_tokens
+        self.embedder = embedder
+
+    def _resolve(self):
+        """
+        Fills in the token budget and counter from the embedder's tokenizer.
+        """
+        if self.count_tokens is not None and self.max_tokens is not None:
+            return
+        model = (self.embedder or get_embedder()).model
+        tokenizer = getattr(model, "tokenizer", None)
+        if self.max_tokens is None:
+            special_tokens = tokenizer.num_special_tokens_to_add() if hasattr(tokenizer, "num_special_tokens_to_add") else 2
+            max_seq_length = getattr(model, "max_seq_length", None)
+            self.max_tokens = max_seq_length - special_tokens if max_seq_length else DEFAULT_MAX_TOKENS
+        if self.count_tokens is None:
+            if tokenizer is None:
+                self.count_tokens = estimate_tokens
+            else:
+                self.count_tokens = lambda texts: [len(ids) for ids in tokenizer(texts, add_special_tokens=False,
+                                                                                 verbose=False)["input_ids"]]
+
+    def _split_long(self, sentence: str, ends_paragraph: bool) -> List[Tuple[str, int, bool]]:
+        """
+        Cuts a sentence longer than the budget into word (or CJK character) pieces packed up to
+        the budget. A single piece over the budget (e.g. a long URL) is cut into equal slices.
+        """
+        pieces = []
+        texts = _PIECE_PATTERN.findall(sentence)
+        for piece, count in zip(texts, self.count_tokens(texts)):
+            if count <= self.max_tokens:
+                pieces.append((piece, count))
+                continue
+            parts = math.ceil(count / self.max_tokens)
+            step = math.ceil(len(piece) / parts)
+            pieces.extend((piece[i:i + step], math.ceil(count / parts)) for i in range(0, len(piece), step))
+        units = self._pack([(piece, count, False) for piece, count in pieces], overlap=0)
+        return [(text, count, ends_paragraph and i == len(units) - 1) for i, (text, count) in enumerate(units)]
+
+    def _pack(self, units: List[Tuple[str, int, bool]], overlap: int) -> List[Tuple[str, int]]:
+        """
+        Greedily packs consecutive units into chunks of at most `max_tokens` tokens. A chunk also
+        ends at a paragraph boundary once it is at least half full.
+        :return: (chunk text, token count) pairs.
+        """
+        chunks = []
+        current: List[Tuple[str, int, bool]] = []
+        current_tokens = 0
+        for text, count, ends_paragraph in units:
+            if current and current_tokens + count > self.max_tokens:
+                chunks.append(("".join(unit[0] for unit in current), current_tokens))
+                current = current[len(current) - overlap:] if overlap else []
+                current_tokens = sum(unit[1] for unit in current)
+                while current and current_tokens + count > self.max_tokens:
+                    current_tokens -= current.pop(0)[1]
+            current.append((text, count, ends_paragraph))
+            current_tokens += count
+            if ends_paragraph and current_tokens >= self.max_tokens // 2:
+                chunks.append(("".join(unit[0] for unit in current), current_tokens))
+                current, current_tokens = [], 0
+        if current:
+            chunks.append(("".join(unit[0] for unit in current), current_tokens))
+        return chunks
+
+    def chunk(self, text: str) -> List[str]:
+        """
+        Splits a document into chunks of at most `max_tokens` tokens.
+        """
+        if not text or text.isspace():
+            return []
+        self._resolve()
+        sentences = split_sentences(text)
+        counts = self.count_tokens([sentence for sentence, _ in sentences])
+        units = []
+        for (sentence, ends_paragraph), count in zip(sentences, counts):
+            if count <= self.max_tokens:
+                units.append((sentence, count, ends_paragraph))
+            else:
+                units.extend(self._split_long(sentence, ends_paragraph))
+        chunks = [chunk.strip() for chunk, _ in self._pack(units, self.overlap_sentences)]
+        return [chunk for chunk in chunks if chunk]
+
+    __call__ = chunk
+
+if __name__ == "__main__":
+    # Example usage:
+    chunker = Chunker(max_tokens=40, count_tokens=estimate_tokens)
+    text = ("Cats are domesticated carnivorous mammals. They are often called house cats when kept as indoor pets. " * 3 +
+            "\n\n" + "貓是一種馴化的肉食性哺乳動物。牠們常被當作室內寵物飼養！" * 3)
+    for i, chunk in enumerate(chunker.chunk(text)):
+        print(f"--- Chunk {i+1} ({estimate_tokens([chunk])[0]} tokens) ---")
+        print(chunk)
@@ -1,36 +1,119 @@
 import argparse
 import os
 import sys
+import threading
 
+from .embedding_cache import EmbeddingCache
+from .embedding_module import configure_embedder
+from .reranker import Reranker
+from .retrieval_cache import RetrievalCache
 from .rag_pipeline import RAGPipeline
 
 def main():
     parser = argparse.ArgumentParser(description="RAG Pipeline CLI for document ingestion and retrieval.")
-    parser.add_argument("--doc_dir", type=str, required=True,
+    parser.add_argument("--doc_dir", type=str,
                         help="Path to the directory containing documents for ingestion.")
+    parser.add_argument("--index_dir", type=str,
+                        help="Directory for the persisted index. Loaded (memory-mapped) if it exists; "
+                             "--doc_dir is then re-ingested incrementally and the index saved back.")
+    parser.add_argument("--embedding_cache", type=str,
+                        help="SQLite file used to cache embeddings of chunks and queries across runs.")
+    parser.add_argument("--index_spec", type=str, default="Flat",
+                        help="FAISS index factory string for new indexes, e.g. 'Flat' (exact), "
+                             "'IVF1024,Flat', 'IVF1024,PQ48' or 'HNSW32'.")
+    parser.add_argument("--metric", type=str, default="cosine", choices=["cosine", "ip", "l2"],
+                        help="Similarity metric for new indexes. Saved indexes keep the metric they were built with.")
+    parser.add_argument("--storage", type=str, default="float32", choices=["float32", "float16", "sq8"],
+                        help="Vector precision for new indexes: 'float16' halves and 'sq8' quarters the index memory.")
+    parser.add_argument("--rescore", action="store_true",
+                        help="With --storage float16/sq8, re-rank the top candidates by exact scores from "
+                             "full-precision vectors kept on disk.")
+    parser.add_argument("--min_score", type=float,
+                        help="Drop results scoring below this similarity (e.g. 0.3 for cosine).")
+    parser.add_argument("--retrieval_mode", type=str, default="hybrid", choices=["hybrid", "dense", "lexical"],
+                        help="'dense' (embeddings), 'lexical' (BM25 keywords) or 'hybrid' (both, fused by rank).")
+    parser.add_argument("--rerank", action="store_true",
+                        help="Re-rank a larger candidate set with a multilingual cross-encoder for more precise top results.")
+    parser.add_argument("--rerank_budget_ms", type=float, default=300,
+                        help="Time budget per query for re-ranking; fewer candidates are re-scored when it is reached.")
+    parser.add_argument("--query_cache", action="store_true",
+                        help="Cache query results, so repeated questions skip embedding and search.")
+    parser.add_argument("--semantic_cache_threshold", type=float,
+                        help="With --query_cache, also reuse the results of a cached query whose embedding has at "
+                             "least this cosine similarity (e.g. 0.95).")
+    parser.add_argument("--nprobe", type=int,
+                        help="Inverted lists visited per query by IVF indexes (higher = more accurate, slower).")
+    parser.add_argument("--ef_search", type=int,
+                        help="Candidate list size per query for HNSW indexes (higher = more accurate, slower).")
+    parser.add_argument("--compact_threshold", type=float, default=0.3,
+                        help="Fraction of deleted chunks at which the index is compacted in the background.")
+    parser.add_argument("--embed_batch_size", type=int,
+                        help="Chunks per embedding batch. Sized automatically per chunk length from free memory if omitted.")
+    parser.add_argument("--embed_workers", type=int, default=1,
+                        help="Processes used to embed chunks on CPU (a sentence-transformers multi-process pool).")
+    parser.add_argument("--device", type=str,
+                        help="Device for the embedding model (e.g. 'cpu' or 'cuda'). Chosen automatically if omitted.")
     
     args = parser.parse_args()
 
-    if not os.path.isdir(args.doc_dir):
+    if args.doc_dir and not os.path.isdir(args.doc_dir):
         print(f"Error: Document directory '{args.doc_dir}' not found or is not a directory.")
         sys.exit(1)
 
-    rag_pipeline = RAGPipeline()
-    rag_pipeline.ingest_documents(args.doc_dir)
+    # Load the embedding model in the background while the index is loaded or documents are read
+    embedder = configure_embedder(device=args.device, batch_size=args.embed_batch_size,
+                                  num_workers=args.embed_workers)
+    threading.Thread(target=embedder.warmup, daemon=True).start()
+
+    embedding_cache = EmbeddingCache(args.embedding_cache) if args.embedding_cache else None
+
+    options = {"embedding_cache": embedding_cache, "compact_threshold": args.compact_threshold}
+    if args.query_cache:
+        options["retrieval_cache"] = RetrievalCache(semantic_threshold=args.semantic_cache_threshold)
+    if args.rerank:
+        options["reranker"] = Reranker(device=args.device, latency_budget_ms=args.rerank_budget_ms)
+
+    if args.index_dir and os.path.isdir(args.index_dir):
+        rag_pipeline = RAGPipeline.load(args.index_dir, **options)
+    elif args.doc_dir:
+        rag_pipeline = RAGPipeline(index_spec=args.index_spec, metric=args.metric, storage=args.storage,
+                                   rescore=args.rescore, **options)
+    else:
+        parser.error("--doc_dir is required when no saved index is available.")
+
+    rag_pipeline.vector_db.nprobe = args.nprobe
+    rag_pipeline.vector_db.ef_search = args.ef_search
+
+    if args.doc_dir:
+        # Only new or modified files are embedded when a saved index was loaded
+        rag_pipeline.ingest_documents(args.doc_dir)
+        embedder.close()  # Queries are embedded one at a time; the worker pool is no longer needed
+        if args.index_dir:
+            rag_pipeline.save(args.index_dir)
 
     print("\nRAG Pipeline is ready. Enter your queries below. Type 'exit' or 'quit' to stop.")
     while True:
         query = input("\nEnter your query: ")
         if query.lower() in ["exit", "quit"]:
+            if embedding_cache:
+                print(f"Embedding cache stats: {embedding_cache.stats()}")
+                embedding_cache.close()
+            if rag_pipeline.retrieval_cache:
+                print(f"Query cache stats: {rag_pipeline.retrieval_cache.stats()}")
             print("Exiting RAG CLI. Goodbye!")
             break
         
-        results = rag_pipeline.retrieve_information(query, k=3) # Retrieve top 3 results 
+        results = rag_pipeline.retrieve_information(query, k=3, min_score=args.min_score,
+                                                    mode=args.retrieval_mode) # Retrieve top 3 results 
         
         if results:
             print("\n--- Retrieved Information ---")
             for i, result in enumerate(results):
-                print(f"Result {i+1} (Distance: {result['distance']:.4f}):")
+                # Cross-encoder scores are not on the retrieval scale; candidates past the re-ranking
+                # budget have none
+                rerank_score = f"{result['rerank_score']:.4f}" if "rerank_score" in result else "n/a"
+                rerank_label = f", Rerank score: {rerank_score}" if rag_pipeline.reranker else ""
+                print(f"Result {i+1} (Score: {result['score']:.4f}{rerank_label}):")
                 print(f"  {result['metadata']['text']}\n")
         else:
             print("No relevant information found.")
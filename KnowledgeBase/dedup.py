@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import shutil
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .text_utils import fold_text
+
+HEADER_FILENAME = "dedup.json"
+KEYS_FILENAME = "keys.npy"
+SIGNATURES_FILENAME = "signatures.npy"
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+
+# (exact hash of the normalized text, MinHash signature)
+Signature = Tuple[str, np.ndarray]
+
+class Deduplicator:
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, bands: int = 16, shingle_size: int = 5,
+                 seed: int = 1):
+        """
+        Finds exact and near-duplicate chunks before they are embedded. Exact copies are found by a
+        hash of the normalized text; near-duplicates (e.g. revisions of the same syllabus, pages of
+        a templated PDF) by MinHash signatures over character shingles, looked up in an LSH index
+        and confirmed by their estimated Jaccard similarity.
+        Entries are keyed by non-negative integers (vector ids); negative keys may be used for
+        entries that have no id yet.
+        :param threshold: Minimum estimated Jaccard similarity of the shingle sets of two texts
+                          for them to count as duplicates.
+        :param num_perm: Number of MinHash permutations (signature length).
+        :param bands: Number of LSH bands; `num_perm / bands` rows each. More bands find pairs of
+                      lower similarity as candidates, at the cost of more comparisons.
+        :param shingle_size: Characters per shingle. Characters work for CJK text as well as Latin.
+        :param seed: Seed of the permutations; signatures are only comparable for equal seeds.
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.shingle_size = shingle_size
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        # Permutations h(x) = (a * x + b) mod p; a, b < 2^31 and x < 2^32 keep a * x + b within 64 bits
+        self._a = rng.integers(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._exact: Dict[str, int] = {}
+        self._signatures: Dict[int, Signature] = {}
+        self._buckets: List[Dict[bytes, List[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def signature(self, text: str) -> Signature:
+        """
+        Computes the signature of a text, usable with `query` and `add`.
+        """
+        normalized = fold_text(text)
+        exact = hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
+        size = self.shingle_size
+        shingles = {normalized[i:i + size] for i in range(max(1, len(normalized) - size + 1))}
+        hashes = np.fromiter((zlib.crc32(shingle.encode("utf-8")) for shingle in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        minhash = ((np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME).min(axis=1)
+        return exact, minhash
+
+    def _band_keys(self, minhash: np.ndarray) -> List[bytes]:
+        return [band.tobytes() for band in np.split(minhash, self.bands)]
+
+    def query(self, signature: Signature, exclude: Optional[Set[int]] = None) -> Optional[int]:
+        """
+        Returns the key of an indexed text that duplicates the one with this signature, or None.
+        Exact copies are preferred; otherwise the most similar near-duplicate is returned.
+        :param exclude: Keys that must not be returned (e.g. entries about to be removed).
+        """
+        exact, minhash = signature
+        exclude = exclude or set()
+        if exact in self._exact and self._exact[exact] not in exclude:
+            return self._exact[exact]
+        candidates = set()
+        for bucket, band_key in zip(self._buckets, self._band_keys(minhash)):
+            candidates.update(bucket.get(band_key, ()))
+        candidates -= exclude
+        best_key, best_similarity = None, self.threshold
+        for key in candidates:
+            similarity = float(np.mean(self._signatures[key][1] == minhash))
+            if similarity >= best_similarity:
+                best_key, best_similarity = key, similarity
+        return best_key
+
+    def add(self, key: int, signature: Signature):
+        """
+        Indexes a text under `key`.
+        """
+        if key in self._signatures:
+            self.remove(key)
+        exact, minhash = signature
+        self._exact.setdefault(exact, key)
+        self._signatures[key] = signature
+        for bucket, band_key in zip(self._buckets, self._band_keys(minhash)):
+            bucket.setdefault(band_key, []).append(key)
+
+    def remove(self, key: int):
+        """
+        Removes an indexed text. Unknown keys are ignored.
+        """
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        exact, minhash = signature
+        if self._exact.get(exact) == key:
+            del self._exact[exact]
+        for bucket, band_key in zip(self._buckets, self._band_keys(minhash)):
+            keys = bucket[band_key]
+            keys.remove(key)
+            if not keys:
+                del bucket[band_key]
+
+    def save(self, path: str):
+        """
+        Saves the signatures to a directory; the LSH buckets are rebuilt on `load`.
+        """
+        tmp_path = path.rstrip("/\\") + ".tmp"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        keys = list(self._signatures)
+        np.save(os.path.join(tmp_path, KEYS_FILENAME), np.array(keys, dtype=np.int64))
+        np.save(os.path.join(tmp_path, SIGNATURES_FILENAME),
+                np.array([self._signatures[key][1] for key in keys], dtype=np.uint64).reshape(len(keys), self.num_perm))
+        with open(os.path.join(tmp_path, HEADER_FILENAME), "w", encoding="utf-8") as f:
+            json.dump({"threshold": self.threshold, "num_perm": self.num_perm, "bands": self.bands,
+                       "shingle_size": self.shingle_size, "seed": self.seed,
+                       "exact": [self._signatures[key][0] for key in keys]}, f)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "Deduplicator":
+        """
+        Loads a deduplication index written with `save`.
+        """
+        with open(os.path.join(path, HEADER_FILENAME), "r", encoding="utf-8") as f:
+            header = json.load(f)
+        deduplicator = cls(threshold=header["threshold"], num_perm=header["num_perm"], bands=header["bands"],
+                           shingle_size=header["shingle_size"], seed=header["seed"])
+        keys = np.load(os.path.join(path, KEYS_FILENAME)).tolist()
+        signatures = np.load(os.path.join(path, SIGNATURES_FILENAME))
+        for key, exact, minhash in zip(keys, header["exact"], signatures):
+            deduplicator.add(key, (exact, minhash))
+        return deduplicator
+
+if __name__ == "__main__":
+    # Example usage:
+    deduplicator = Deduplicator()
+    syllabus = ("Course CS-101 covers variables, loops and functions. Grading: homework 40%, "
+                "midterm 25%, final exam 35%. Office hours are on Tuesdays.")
+    deduplicator.add(0, deduplicator.signature(syllabus))
+    for text in [syllabus.upper(),
+                 syllabus.replace("Tuesdays", "Thursdays"),
+                 "Dogs are loyal companions. They love to play fetch."]:
+        print(f"{text[:40]!r}... duplicates: {deduplicator.query(deduplicator.signature(text))}")
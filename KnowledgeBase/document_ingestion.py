@@ -1,7 +1,17 @@
 import os
-from typing import List
+import re
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 from pypdf import PdfReader, errors
 
+# PDFs larger than this are split into page ranges so a single big file can use several workers
+PDF_SPLIT_MIN_BYTES = 5 * 1024 * 1024
+PDF_PAGES_PER_TASK = 50
+# Ends every PDF page in the loaded text, so chunks can be mapped back to their pages
+PAGE_BREAK = "\f"
+
 def read_text_file(file_path: str) -> str:
     """
     Reads the content of a text file.
@@ -14,12 +24,18 @@ def read_pdf_file(file_path: str) -> str:
     """
     Reads the content of a PDF file.
     """
+    return read_pdf_pages(file_path)
+
+def read_pdf_pages(file_path: str, start_page: int = 0, end_page: Optional[int] = None) -> str:
+    """
+    Reads the content of the pages [start_page, end_page) of a PDF file.
+    Page texts are collected and joined once rather than concatenated one by one; each page
+    ends with a newline and PAGE_BREAK.
+    """
     try:
         reader = PdfReader(file_path)
-        text_content = ""
-        for page in reader.pages:
-            text_content += page.extract_text() + "\n"
-        return text_content
+        pages = reader.pages[start_page:end_page]
+        return "".join([page.extract_text() + "\n" + PAGE_BREAK for page in pages])
     except errors.PdfStreamError as e:
         print(f"Error reading PDF file {file_path}: {e}")
         return ""
@@ -51,29 +67,154 @@ def chunk_text(text: str, chunk_size: int = 500, overlap: int = 50) -> List[str]
             
     return chunks
 
-def load_documents_from_directory(directory_path: str) -> List[str]:
+SUPPORTED_EXTENSIONS = (".txt", ".md", ".pdf")
+
+def list_document_files(directory_path: str) -> List[str]:
     """
-    Loads all text and PDF documents from a specified directory and chunks them.
+    Returns the paths of all supported documents in a directory, in a stable (sorted) order.
     """
-    all_chunks = []
-    for filename in os.listdir(directory_path):
+    file_paths = []
+    for filename in sorted(os.listdir(directory_path)):
         file_path = os.path.join(directory_path, filename)
-        if os.path.isfile(file_path):
-            print(f"Processing file: {filename}")
-            content = ""
-            if filename.endswith(".txt") or filename.endswith(".md"): # Added .md
-                content = read_text_file(file_path)
-            elif filename.endswith(".pdf"):
-                try:
-                    content = read_pdf_file(file_path)
-                except Exception as e:
-                    print(f"Error reading PDF file {filename}: {e}")
-                    continue
-            
-            if content:
-                chunks = chunk_text(content)
-                all_chunks.extend(chunks)
-    return all_chunks
+        if os.path.isfile(file_path) and filename.endswith(SUPPORTED_EXTENSIONS):
+            file_paths.append(file_path)
+    return file_paths
+
+def load_document(file_path: str) -> str:
+    """
+    Reads a single text, Markdown or PDF document. Returns an empty string for unsupported files.
+    """
+    if file_path.endswith(".txt") or file_path.endswith(".md"):
+        return read_text_file(file_path)
+    elif file_path.endswith(".pdf"):
+        return read_pdf_file(file_path)
+    return ""
+
+def _plan_load_tasks(file_path: str) -> List[Tuple[str, int, Optional[int]]]:
+    """
+    Splits a document into (file_path, start_page, end_page) load tasks.
+    Only large PDFs are split; every other file is a single task.
+    """
+    if file_path.endswith(".pdf") and os.path.getsize(file_path) >= PDF_SPLIT_MIN_BYTES:
+        try:
+            num_pages = len(PdfReader(file_path).pages)
+        except Exception:
+            num_pages = 0  # Let the worker report the error when it reads the whole file
+        if num_pages > PDF_PAGES_PER_TASK:
+            return [(file_path, start, min(start + PDF_PAGES_PER_TASK, num_pages))
+                    for start in range(0, num_pages, PDF_PAGES_PER_TASK)]
+    return [(file_path, 0, None)]
+
+def _run_load_task(task: Tuple[str, int, Optional[int]]) -> str:
+    """
+    Loads one task produced by `_plan_load_tasks`. Runs inside worker processes.
+    """
+    file_path, start_page, end_page = task
+    try:
+        if end_page is not None:
+            return read_pdf_pages(file_path, start_page, end_page)
+        return load_document(file_path)
+    except Exception as e:
+        print(f"Error reading file {os.path.basename(file_path)}: {e}")
+        return ""
+
+def _is_single_task(file_paths: List[str]) -> bool:
+    """
+    Returns True if reading file_paths amounts to at most one load task.
+    """
+    return len(file_paths) == 0 or (len(file_paths) == 1 and len(_plan_load_tasks(file_paths[0])) == 1)
+
+def iter_documents(file_paths: Iterable[str], max_workers: Optional[int] = None) -> Iterator[Tuple[str, str]]:
+    """
+    Reads documents lazily, fanning files (and page ranges of large PDFs) out to a process pool.
+    Only a bounded number of tasks is in flight at a time, so memory use does not grow with the
+    number of files.
+    :param file_paths: The documents to read.
+    :param max_workers: Number of worker processes. Defaults to the number of CPUs; 1 reads serially.
+    :return: An iterator of (file_path, text) pairs, in the same order as file_paths.
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    if isinstance(file_paths, list) and _is_single_task(file_paths):
+        max_workers = 1  # Not worth starting a pool for a single task
+
+    if max_workers <= 1:
+        for file_path in file_paths:
+            tasks = _plan_load_tasks(file_path)
+            yield file_path, "".join([_run_load_task(task) for task in tasks])
+        return
+
+    max_in_flight = max_workers * 2
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()  # (file_path, futures of its page ranges), in submission order
+        for file_path in file_paths:
+            in_flight.append((file_path, [executor.submit(_run_load_task, task) for task in _plan_load_tasks(file_path)]))
+            # Results are consumed in submission order, so chunk order stays deterministic
+            while sum(len(futures) for _, futures in in_flight) > max_in_flight:
+                done_path, futures = in_flight.popleft()
+                yield done_path, "".join([future.result() for future in futures])
+        while in_flight:
+            done_path, futures = in_flight.popleft()
+            yield done_path, "".join([future.result() for future in futures])
+
+def load_documents(file_paths: List[str], max_workers: Optional[int] = None) -> List[str]:
+    """
+    Reads several documents in parallel (see `iter_documents`).
+    :return: The text of each document, in the same order as file_paths.
+    """
+    return [content for _, content in iter_documents(file_paths, max_workers=max_workers)]
+
+def _locate_chunks(content: str, chunks: List[str]) -> Iterator[Dict]:
+    """
+    Finds each chunk in the document text and returns its "char_start" and "char_end" offsets
+    and, for documents with page breaks (PDFs), the 1-based "page" it starts on. Chunks are
+    consecutive substrings with increasing start offsets; a chunk that cannot be found (e.g.
+    rewritten by a custom chunker) gets no position.
+    """
+    page_breaks = [match.start() for match in re.finditer(PAGE_BREAK, content)]
+    search_from = 0
+    for chunk in chunks:
+        start = content.find(chunk, search_from)
+        if start == -1:
+            yield {}
+            continue
+        search_from = start + 1
+        position = {"char_start": start, "char_end": start + len(chunk)}
+        if page_breaks:
+            position["page"] = bisect_right(page_breaks, start) + 1
+        yield position
+
+def iter_file_chunks(file_paths: Iterable[str], max_workers: Optional[int] = None,
+                     chunker: Optional[Callable[[str], List[str]]] = None) -> Iterator[Dict]:
+    """
+    Streams the chunks of several documents without holding the whole corpus in memory.
+    :param chunker: Function splitting a document's text into chunks. Defaults to `chunk_text`.
+    :return: An iterator of metadata dictionaries with the chunk "text", its "chunk_id"
+             within the document, the "source" file path, its "char_start"/"char_end" offsets
+             in the document text and, for PDFs, the 1-based "page" it starts on.
+    """
+    chunker = chunker or chunk_text
+    for file_path, content in iter_documents(file_paths, max_workers=max_workers):
+        chunks = chunker(content)
+        for i, (chunk, position) in enumerate(zip(chunks, _locate_chunks(content, chunks))):
+            yield dict({"text": chunk, "chunk_id": i, "source": file_path}, **position)
+
+def iter_chunks(directory_path: str, max_workers: Optional[int] = None) -> Iterator[Dict]:
+    """
+    Streams the chunks of all text and PDF documents in a directory, in sorted file order.
+    """
+    return iter_file_chunks(list_document_files(directory_path), max_workers=max_workers)
+
+def load_documents_from_directory(directory_path: str, max_workers: Optional[int] = None) -> List[str]:
+    """
+    Loads all text and PDF documents from a specified directory and chunks them.
+    Files are read in parallel (see `iter_documents`); chunks keep the sorted file order.
+    """
+    file_paths = list_document_files(directory_path)
+    for file_path in file_paths:
+        print(f"Processing file: {os.path.basename(file_path)}")
+
+    return [chunk["text"] for chunk in iter_file_chunks(file_paths, max_workers=max_workers)]
 
 if __name__ == "__main__":
     # Example usage:
@@ -0,0 +1,130 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .text_utils import normalize_text
+
+def text_hash(text: str) -> bytes:
+    """
+    Returns the content hash used as cache key for a (normalized) text.
+    """
+    return hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=16).digest()
+
+class EmbeddingCache:
+    def __init__(self, path: Optional[str] = None, max_memory_items: int = 10000):
+        """
+        Content-addressed cache of embeddings keyed by (model name, hash of normalized text).
+        Lookups go to an in-process LRU first and then to an optional on-disk SQLite store,
+        so repeated chunks and hot queries never reach the transformer.
+        :param path: Path of the SQLite file. If None, only the in-process LRU is used.
+        :param max_memory_items: Maximum number of embeddings kept in the in-process LRU.
+        """
+        self.path = path
+        self.max_memory_items = max_memory_items
+        self._memory: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._connection = None
+        if path:
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+            self._connection = sqlite3.connect(path, check_same_thread=False)
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, text_hash BLOB NOT NULL, vector BLOB NOT NULL, "
+                "PRIMARY KEY (model, text_hash)) WITHOUT ROWID"
+            )
+            self._connection.commit()
+
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit/miss counters of the cache.
+        """
+        return {
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_items": len(self._memory),
+        }
+
+    def _remember(self, key: Tuple[str, bytes], vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Looks up the embeddings of several texts.
+        :return: One entry per text: the cached embedding, or None on a miss.
+        """
+        results: List[Optional[np.ndarray]] = [None] * len(texts)
+        disk_lookups: Dict[bytes, List[int]] = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                key = (model_name, text_hash(text))
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    disk_lookups.setdefault(key[1], []).append(i)
+
+            if disk_lookups and self._connection is not None:
+                hashes = list(disk_lookups)
+                for start in range(0, len(hashes), 500):  # Stay below SQLite's bound-parameter limit
+                    batch = hashes[start:start + 500]
+                    rows = self._connection.execute(
+                        f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                        f"AND text_hash IN ({','.join('?' * len(batch))})",
+                        [model_name, *batch],
+                    ).fetchall()
+                    for hash_value, blob in rows:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._remember((model_name, hash_value), vector)
+                        for i in disk_lookups.pop(hash_value):
+                            results[i] = vector
+                            self.disk_hits += 1
+
+            self.misses += sum(len(indices) for indices in disk_lookups.values())
+        return results
+
+    def put_many(self, model_name: str, texts: List[str], embeddings: np.ndarray):
+        """
+        Stores the embeddings of several texts.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        rows = []
+        with self._lock:
+            for text, vector in zip(texts, embeddings):
+                key = (model_name, text_hash(text))
+                self._remember(key, vector)
+                rows.append((model_name, key[1], vector.tobytes()))
+            if self._connection is not None and rows:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)", rows
+                )
+                self._connection.commit()
+
+    def close(self):
+        """
+        Closes the on-disk store.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
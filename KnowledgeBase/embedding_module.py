@@ -1,24 +1,229 @@
-from sentence_transformers import SentenceTransformer
-from typing import List, Union
+from typing import List, Optional, Union
 import numpy as np
 import os
 import sys
+import threading
 
 from .document_ingestion import load_documents_from_directory, chunk_text, read_text_file
+from .embedding_cache import EmbeddingCache
 
-# Initialize the SentenceTransformer model
 # Using a common multilingual model for demonstration
 # This model will be downloaded the first time it's used.
-model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
+MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+# Embedding dimensions of known models, so `Embedder.dimension` does not have to load them
+MODEL_DIMENSIONS = {MODEL_NAME: 384}
 
-def get_embeddings(texts: List[str]) -> np.ndarray:
+# Automatic batch sizing: texts are grouped into buckets of similar length (powers of two of their
+# estimated token count) and each bucket gets as many texts per batch as fit a token budget sized
+# to a fraction of the free memory.
+CHARS_PER_TOKEN = 4  # Rough estimate used to bucket texts without tokenizing them
+ACTIVATION_BYTES_PER_TOKEN = 64 * 1024  # Generous upper bound for MiniLM-sized encoders
+MEMORY_FRACTION = 0.25
+DEFAULT_TOKEN_BUDGET = 32 * 128  # sentence-transformers' default batch of 32 full-length texts
+MAX_BATCH_SIZE = 512
+
+def _available_memory(device: str) -> Optional[int]:
+    """
+    Returns the free memory in bytes of the device the model runs on, or None if unknown.
+    """
+    try:
+        if device.startswith("cuda"):
+            import torch
+            return torch.cuda.mem_get_info(torch.device(device))[0]
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError, RuntimeError):
+        return None  # e.g. os.sysconf is not available on Windows
+
+class Embedder:
+    def __init__(self, model_name: str = MODEL_NAME, device: Optional[str] = None,
+                 max_seq_length: Optional[int] = None, batch_size: Optional[int] = None, num_workers: int = 1):
+        """
+        Lazily-initialized SentenceTransformer wrapper.
+        The model (and sentence_transformers/torch themselves) are only loaded on first use,
+        so importing the KnowledgeBase modules stays cheap.
+        :param model_name: The SentenceTransformer model to load.
+        :param device: Device to run on (e.g. "cpu", "cuda"). None lets sentence-transformers choose.
+        :param max_seq_length: Optional override of the model's maximum sequence length in tokens.
+        :param batch_size: Texts per batch. None sizes batches per length bucket from the free memory.
+        :param num_workers: Processes used to encode large inputs on CPU (a sentence-transformers
+                            multi-process pool, started on first use). 1 encodes in this process.
+        """
+        self.model_name = model_name
+        self.device = device
+        self.max_seq_length = max_seq_length
+        self.batch_size = batch_size
+        self.num_workers = num_workers
+        self._model = None
+        self._pool = None
+        self._lock = threading.Lock()
+        self._token_budget: Optional[int] = None
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def model(self):
+        """
+        The underlying SentenceTransformer, loaded on first access (thread-safe).
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import SentenceTransformer
+                    model = SentenceTransformer(self.model_name, device=self.device)
+                    if self.max_seq_length:
+                        model.max_seq_length = self.max_seq_length
+                    self._model = model
+        return self._model
+
+    @property
+    def dimension(self) -> int:
+        if self._model is None and self.model_name in MODEL_DIMENSIONS:
+            return MODEL_DIMENSIONS[self.model_name]
+        return self.model.get_sentence_embedding_dimension()
+
+    def warmup(self) -> "Embedder":
+        """
+        Loads the model ahead of the first request. Calling this in a parent process before
+        forking workers lets them share the loaded weights copy-on-write instead of each
+        loading its own copy.
+        """
+        self.model.encode(["warmup"], convert_to_tensor=False)
+        return self
+
+    def _batch_size(self, bucket_tokens: int) -> int:
+        """
+        Returns the batch size for texts of up to `bucket_tokens` tokens.
+        """
+        if self.batch_size:
+            return self.batch_size
+        if self._token_budget is None:
+            available = _available_memory(str(self.model.device))
+            budget = int(available * MEMORY_FRACTION) // ACTIVATION_BYTES_PER_TOKEN if available else 0
+            self._token_budget = max(DEFAULT_TOKEN_BUDGET, budget)
+        return max(1, min(MAX_BATCH_SIZE, self._token_budget // bucket_tokens))
+
+    def _get_pool(self):
+        """
+        Starts the multi-process pool on first use. Only used on CPU, where a single process
+        leaves cores idle; a GPU is already saturated by one process.
+        """
+        if self.num_workers <= 1 or not str(self.model.device).startswith("cpu"):
+            return None
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self.model.start_multi_process_pool(["cpu"] * self.num_workers)
+        return self._pool
+
+    def close(self):
+        """
+        Stops the multi-process pool, if one was started.
+        """
+        if self._pool is not None:
+            self.model.stop_multi_process_pool(self._pool)
+            self._pool = None
+
+    def encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        """
+        Encodes texts in length buckets so that batches of short texts are not padded to the
+        length of long ones and can be larger. Embeddings are returned in the order of `texts`.
+        """
+        if len(texts) <= 1 or "batch_size" in kwargs:
+            return self.model.encode(texts, convert_to_tensor=False, **kwargs)
+        max_tokens = self.model.max_seq_length or 512
+        lengths = np.fromiter((len(text) for text in texts), dtype=np.int64, count=len(texts))
+        tokens = np.clip(lengths // CHARS_PER_TOKEN + 2, 1, max_tokens)  # +2 special tokens
+        buckets = np.ceil(np.log2(tokens)).astype(np.int64)
+        # Longest bucket first; texts keep their relative order within a bucket
+        order = np.argsort(-buckets, kind="stable")
+        boundaries = np.flatnonzero(np.diff(buckets[order])) + 1
+        pool = self._get_pool()
+
+        embeddings = None
+        for positions in np.split(order, boundaries):
+            bucket_texts = [texts[i] for i in positions.tolist()]
+            batch_size = self._batch_size(int(min(max_tokens, 2 ** buckets[positions[0]])))
+            if pool is not None and len(bucket_texts) >= batch_size * self.num_workers:
+                encoded = self.model.encode(bucket_texts, pool=pool, batch_size=batch_size, **kwargs)
+            else:
+                encoded = self.model.encode(bucket_texts, convert_to_tensor=False, batch_size=batch_size, **kwargs)
+            encoded = np.asarray(encoded)
+            if embeddings is None:
+                embeddings = np.empty((len(texts),) + encoded.shape[1:], dtype=encoded.dtype)
+            embeddings[positions] = encoded
+        return embeddings
+
+_default_embedder: Optional[Embedder] = None
+_default_embedder_lock = threading.Lock()
+
+def configure_embedder(model_name: str = MODEL_NAME, device: Optional[str] = None,
+                       max_seq_length: Optional[int] = None, batch_size: Optional[int] = None,
+                       num_workers: int = 1) -> Embedder:
+    """
+    Replaces the shared embedder returned by `get_embedder`. The model is still loaded lazily.
+    """
+    global _default_embedder
+    with _default_embedder_lock:
+        _default_embedder = Embedder(model_name, device=device, max_seq_length=max_seq_length,
+                                     batch_size=batch_size, num_workers=num_workers)
+        return _default_embedder
+
+def get_embedder() -> Embedder:
+    """
+    Returns the process-wide shared embedder, creating it with the default settings if needed.
+    """
+    global _default_embedder
+    if _default_embedder is None:
+        with _default_embedder_lock:
+            if _default_embedder is None:
+                _default_embedder = Embedder()
+    return _default_embedder
+
+def __getattr__(name: str):
+    # Backwards compatibility: `embedding_module.model` used to be created at import time.
+    if name == "model":
+        return get_embedder().model
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_embeddings(texts: List[str], cache: Optional[EmbeddingCache] = None,
+                   embedder: Optional[Embedder] = None) -> np.ndarray:
     """
     Generates embeddings for a list of text strings.
+    :param texts: The texts to embed.
+    :param cache: Optional embedding cache. Cached texts are not re-encoded, and each distinct
+                  uncached text is encoded only once even if it appears several times.
+    :param embedder: The embedder to use. Defaults to the shared one from `get_embedder`.
     """
+    embedder = embedder or get_embedder()
     if not texts:
-        # Return an empty 2D array with the correct embedding dimension
-        return np.empty((0, model.get_sentence_embedding_dimension()))
-    embeddings = model.encode(texts, convert_to_tensor=False)
+        # Return an empty 2D array with the correct embedding dimension; known models are not loaded
+        return np.empty((0, embedder.dimension), dtype=np.float32)
+    if cache is None:
+        embeddings = embedder.encode(texts)
+        return embeddings
+
+    # The model is only touched (and loaded) if some text is not cached
+    cached_embeddings = cache.get_many(embedder.model_name, texts)
+    missing = {}  # text -> positions that need it
+    for i, (text, cached) in enumerate(zip(texts, cached_embeddings)):
+        if cached is None:
+            missing.setdefault(text, []).append(i)
+
+    new_embeddings = None
+    if missing:
+        missing_texts = list(missing)
+        new_embeddings = embedder.encode(missing_texts)
+        cache.put_many(embedder.model_name, missing_texts, new_embeddings)
+    dimension = new_embeddings.shape[1] if new_embeddings is not None else len(cached_embeddings[0])
+    embeddings = np.empty((len(texts), dimension), dtype=np.float32)
+    for i, cached in enumerate(cached_embeddings):
+        if cached is not None:
+            embeddings[i] = cached
+    if missing:
+        for text, embedding in zip(missing_texts, new_embeddings):
+            embeddings[missing[text]] = embedding
     return embeddings
 
 if __name__ == "__main__":
@@ -0,0 +1,348 @@
+import json
+import os
+import shutil
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+import numpy as np
+
+# Typed columns: metadata keys with integer values are stored in these arrays instead of per-row dicts
+INT_COLUMNS = {"chunk_id": "i", "page": "i", "char_start": "q", "char_end": "q", "ingested_at": "q"}
+MISSING = -1  # Marks an absent value in an integer column
+
+TEXT_FILENAME = "text.bin"
+EXTRA_FILENAME = "extra.bin"
+SOURCES_FILENAME = "sources.json"
+
+def _is_int(value) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+def _filter_int(value) -> int:
+    """
+    Converts a filter bound to the integer stored in a column; datetimes become epoch seconds
+    (the unit of "ingested_at").
+    """
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if not _is_int(value):
+        raise ValueError(f"Expected an integer or datetime filter value, got {value!r}")
+    return int(value)
+
+def _hashable(value):
+    return json.dumps(value, sort_keys=True) if isinstance(value, (dict, list)) else value
+
+class MetadataStore:
+    def __init__(self):
+        """
+        Compact columnar store for chunk metadata, used in place of a list of dictionaries.
+        All chunk texts live in one contiguous UTF-8 buffer addressed by an offsets array;
+        chunk_id, page and character offsets are typed integer columns; source file paths are
+        dictionary-encoded. Keys without a dedicated column are kept as compact JSON in a second
+        buffer. Rows are decoded into dictionaries only when accessed, e.g. for the top-k hits
+        of a search.
+        """
+        self._text = bytearray()
+        self._text_offsets = array("q", [0])
+        self._extra = bytearray()
+        self._extra_offsets = array("q", [0])
+        self._columns = {name: array(code) for name, code in INT_COLUMNS.items()}
+        self._source_codes = array("i")
+        self._deleted = bytearray()
+        self.sources: List[str] = []
+        self._source_lookup: Dict[str, int] = {}
+        self._read_only = False
+        # Per-field indexes used by `select`, built on first use and dropped when rows are added
+        self._source_index = None  # (row ids sorted by source code, offsets per code)
+        self._extra_index: Dict[str, Dict[Any, List[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._deleted)
+
+    def __iter__(self) -> Iterator[Optional[Dict]]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i: int) -> Optional[Dict]:
+        """
+        Decodes row i into a metadata dictionary, or returns None if the row was deleted.
+        """
+        if not 0 <= i < len(self):
+            raise IndexError(f"Metadata row {i} out of range for store of size {len(self)}")
+        if self._deleted[i]:
+            return None
+
+        metadata = {"text": bytes(self._text[self._text_offsets[i]:self._text_offsets[i + 1]]).decode("utf-8")}
+        for name, column in self._columns.items():
+            value = int(column[i])
+            if value != MISSING:
+                metadata[name] = value
+        source_code = int(self._source_codes[i])
+        if source_code != MISSING:
+            metadata["source"] = self.sources[source_code]
+        extra_start, extra_end = self._extra_offsets[i], self._extra_offsets[i + 1]
+        if extra_end > extra_start:
+            metadata.update(json.loads(bytes(self._extra[extra_start:extra_end]).decode("utf-8")))
+        return metadata
+
+    def __setitem__(self, i: int, value: None):
+        """
+        Only deletion is supported: `store[i] = None` tombstones row i.
+        """
+        if value is not None:
+            raise TypeError("MetadataStore rows are immutable; only `store[i] = None` (delete) is supported.")
+        if not 0 <= i < len(self):
+            raise IndexError(f"Metadata row {i} out of range for store of size {len(self)}")
+        self._ensure_writable()
+        self._deleted[i] = 1
+
+    def deleted_ids(self) -> Set[int]:
+        return set(np.flatnonzero(np.frombuffer(self._deleted, dtype=np.uint8)).tolist())
+
+    def _source_code(self, source: str) -> int:
+        code = self._source_lookup.get(source)
+        if code is None:
+            code = len(self.sources)
+            self.sources.append(source)
+            self._source_lookup[source] = code
+        return code
+
+    def append(self, metadata: Optional[Dict]):
+        self.extend([metadata])
+
+    def extend(self, metadatas: Iterable[Optional[Dict]]):
+        """
+        Appends rows. A None row is stored as already deleted.
+        """
+        self._ensure_writable()
+        self._source_index = None
+        self._extra_index = {}
+        for metadata in metadatas:
+            is_deleted = metadata is None
+            metadata = metadata or {}
+            extra = {}
+            text = metadata.get("text", "")
+            if isinstance(text, str):
+                self._text += text.encode("utf-8")
+            else:
+                extra["text"] = text
+            self._text_offsets.append(len(self._text))
+
+            for name, column in self._columns.items():
+                value = metadata.get(name)
+                if _is_int(value) and value != MISSING:
+                    column.append(int(value))
+                else:
+                    column.append(MISSING)
+                    if name in metadata:
+                        extra[name] = value
+
+            source = metadata.get("source")
+            if isinstance(source, str):
+                self._source_codes.append(self._source_code(source))
+            else:
+                self._source_codes.append(MISSING)
+                if "source" in metadata:
+                    extra["source"] = source
+
+            for key, value in metadata.items():
+                if key not in ("text", "source") and key not in self._columns:
+                    extra[key] = value
+            if extra:
+                self._extra += json.dumps(extra, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            self._extra_offsets.append(len(self._extra))
+            self._deleted.append(1 if is_deleted else 0)
+
+    def subset(self, rows: Iterable[int]) -> "MetadataStore":
+        """
+        Returns a new store holding the given rows, in the given order.
+        """
+        store = MetadataStore()
+        store.extend(self[i] for i in rows)
+        return store
+
+    def live_mask(self) -> np.ndarray:
+        """
+        Returns a boolean array with one entry per row, False for deleted rows.
+        """
+        return np.frombuffer(self._deleted, dtype=np.uint8) == 0
+
+    def select(self, filters: Dict[str, Any]) -> np.ndarray:
+        """
+        Evaluates a filter expression over all rows without decoding them.
+        Conditions on different keys are combined with AND. Each condition is either a single value
+        (equality), a list/tuple/set of values (membership) or a {"min": ..., "max": ...} dict
+        (inclusive range, either bound optional; integer columns only). Besides the metadata keys,
+        "doc_type" matches the file extension of "source" (e.g. "pdf").
+        Examples: {"source": {"a.pdf", "b.txt"}}, {"page": {"min": 3, "max": 10}},
+        {"ingested_at": {"min": datetime(2024, 1, 1)}}.
+        :return: A boolean array with one entry per row, True for live rows matching every condition.
+        """
+        mask = self.live_mask().copy()
+        for key, condition in filters.items():
+            if key in self._columns:
+                mask &= self._select_int_column(key, condition)
+            elif key == "source":
+                mask &= self._rows_for_sources(self._condition_values(condition))
+            elif key == "doc_type":
+                extensions = {str(value).lower().lstrip(".") for value in self._condition_values(condition)}
+                mask &= self._rows_for_sources(
+                    [source for source in self.sources
+                     if os.path.splitext(source)[1].lower().lstrip(".") in extensions])
+            else:
+                mask &= self._select_extra(key, condition)
+        return mask
+
+    @staticmethod
+    def _condition_values(condition) -> List:
+        if isinstance(condition, dict):
+            raise ValueError(f"Range conditions are only supported on integer columns {sorted(INT_COLUMNS)}")
+        if isinstance(condition, (list, tuple, set, frozenset)):
+            return list(condition)
+        return [condition]
+
+    def _select_int_column(self, name: str, condition) -> np.ndarray:
+        column = np.asarray(self._columns[name])
+        if isinstance(condition, dict):
+            unknown = set(condition) - {"min", "max"}
+            if unknown:
+                raise ValueError(f"Unknown range bound(s) {sorted(unknown)} for '{name}'; use 'min' and 'max'.")
+            mask = column != MISSING
+            if condition.get("min") is not None:
+                mask &= column >= _filter_int(condition["min"])
+            if condition.get("max") is not None:
+                mask &= column <= _filter_int(condition["max"])
+            return mask
+        values = [_filter_int(value) for value in self._condition_values(condition)]
+        return np.isin(column, values)
+
+    def _rows_for_sources(self, sources: Iterable[str]) -> np.ndarray:
+        """
+        Looks rows up in an inverted index from source code to row ids, so the cost depends on the
+        number of matching rows rather than on the size of the store.
+        """
+        if self._source_index is None:
+            codes = np.asarray(self._source_codes, dtype=np.int64)
+            order = np.argsort(codes, kind="stable")
+            counts = np.bincount(codes + 1, minlength=len(self.sources) + 1)  # Shifted so MISSING is 0
+            self._source_index = (order, np.concatenate(([0], np.cumsum(counts))))
+        order, offsets = self._source_index
+        mask = np.zeros(len(self), dtype=bool)
+        for source in sources:
+            code = self._source_lookup.get(source)
+            if code is not None:
+                mask[order[offsets[code + 1]:offsets[code + 2]]] = True
+        return mask
+
+    def _select_extra(self, key: str, condition) -> np.ndarray:
+        """
+        Matches a key stored in the JSON extras through a value -> row ids index built the first
+        time the key is filtered on.
+        """
+        index = self._extra_index.get(key)
+        if index is None:
+            index = {}
+            for i in range(len(self)):
+                extra_start, extra_end = self._extra_offsets[i], self._extra_offsets[i + 1]
+                if extra_end > extra_start:
+                    extra = json.loads(bytes(self._extra[extra_start:extra_end]).decode("utf-8"))
+                    if key in extra:
+                        index.setdefault(_hashable(extra[key]), []).append(i)
+            self._extra_index[key] = index
+        mask = np.zeros(len(self), dtype=bool)
+        for value in self._condition_values(condition):
+            rows = index.get(_hashable(value))
+            if rows:
+                mask[rows] = True
+        return mask
+
+    def _ensure_writable(self):
+        """
+        Copies columns loaded from disk (numpy arrays, possibly memory-mapped) into growable
+        in-memory buffers.
+        """
+        if not self._read_only:
+            return
+        self._text = bytearray(self._text)
+        self._extra = bytearray(self._extra)
+        self._deleted = bytearray(self._deleted)
+        self._text_offsets = array("q", np.asarray(self._text_offsets).tobytes())
+        self._extra_offsets = array("q", np.asarray(self._extra_offsets).tobytes())
+        self._source_codes = array("i", np.asarray(self._source_codes).tobytes())
+        self._columns = {name: array(INT_COLUMNS[name], np.asarray(column).tobytes())
+                         for name, column in self._columns.items()}
+        self._read_only = False
+
+    def save(self, path: str):
+        """
+        Writes the store to a directory: raw UTF-8 buffers plus one .npy file per column.
+        The directory is replaced as a whole so readers never see a partially written store.
+        """
+        tmp_path = path + ".tmp"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        with open(os.path.join(tmp_path, TEXT_FILENAME), "wb") as f:
+            f.write(self._text)
+        with open(os.path.join(tmp_path, EXTRA_FILENAME), "wb") as f:
+            f.write(self._extra)
+        with open(os.path.join(tmp_path, SOURCES_FILENAME), "w", encoding="utf-8") as f:
+            json.dump(self.sources, f, ensure_ascii=False)
+        arrays = {
+            "text_offsets": np.asarray(self._text_offsets, dtype=np.int64),
+            "extra_offsets": np.asarray(self._extra_offsets, dtype=np.int64),
+            "source": np.asarray(self._source_codes, dtype=np.int32),
+            "deleted": np.frombuffer(bytes(self._deleted), dtype=np.uint8),
+        }
+        for name, column in self._columns.items():
+            arrays[name] = np.asarray(column, dtype=np.int32 if INT_COLUMNS[name] == "i" else np.int64)
+        for name, values in arrays.items():
+            np.save(os.path.join(tmp_path, f"{name}.npy"), values)
+
+        old_path = path + ".old"
+        if os.path.exists(path):
+            os.replace(path, old_path)
+        os.replace(tmp_path, path)
+        if os.path.exists(old_path):
+            shutil.rmtree(old_path, ignore_errors=True)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "MetadataStore":
+        """
+        Opens a store written with `save`. With mmap=True the buffers and columns are
+        memory-mapped, so opening is O(1) and only the rows that are read are paged in.
+        """
+        mmap_mode = "r" if mmap else None
+        store = cls()
+
+        def load_buffer(filename: str):
+            file_path = os.path.join(path, filename)
+            if mmap and os.path.getsize(file_path) > 0:
+                return np.memmap(file_path, dtype=np.uint8, mode="r")
+            with open(file_path, "rb") as f:
+                return bytearray(f.read())
+
+        store._text = load_buffer(TEXT_FILENAME)
+        store._extra = load_buffer(EXTRA_FILENAME)
+        with open(os.path.join(path, SOURCES_FILENAME), "r", encoding="utf-8") as f:
+            store.sources = json.load(f)
+        store._source_lookup = {source: code for code, source in enumerate(store.sources)}
+
+        def load_column(name: str):
+            return np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode)
+
+        def load_int_column(name: str):
+            if not os.path.isfile(os.path.join(path, f"{name}.npy")):  # Column added after the store was saved
+                dtype = np.int32 if INT_COLUMNS[name] == "i" else np.int64
+                return np.full(len(store._deleted), MISSING, dtype=dtype)
+            return load_column(name)
+
+        store._text_offsets = load_column("text_offsets")
+        store._extra_offsets = load_column("extra_offsets")
+        store._source_codes = load_column("source")
+        store._deleted = load_column("deleted")
+        store._columns = {name: load_int_column(name) for name in INT_COLUMNS}
+        # Columns loaded from disk are numpy arrays; they are copied into growable buffers on first write
+        store._read_only = True
+        return store
@@ -1,45 +1,468 @@
+import hashlib
+import json
 import os
 import sys
-from typing import List, Dict
+import time
+from collections import Counter
+from typing import Any, List, Dict, Optional, Set, Tuple
 
-from .document_ingestion import load_documents_from_directory
+import numpy as np
+
+from .bm25_index import BM25Index, reciprocal_rank_fusion
+from .chunker import Chunker
+from .dedup import Deduplicator
+from .document_ingestion import list_document_files, iter_file_chunks
+from .embedding_cache import EmbeddingCache
 from .embedding_module import get_embeddings
+from .reranker import Reranker
+from .retrieval_cache import RetrievalCache
 from .vector_db_module import VectorDB
 
+MANIFEST_FILENAME = "manifest.json"
+DEFAULT_INGEST_BATCH_SIZE = 256
+LEXICAL_DIRNAME = "bm25"
+DEDUP_DIRNAME = "dedup"
+DUPLICATES_FILENAME = "duplicates.json"
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+HYBRID_CANDIDATES = 4  # Each ranking contributes k * HYBRID_CANDIDATES candidates to the fusion
+RERANK_CANDIDATES = 5  # With a reranker, k * RERANK_CANDIDATES first-stage results are re-scored
+
+def _file_sha256(file_path: str) -> str:
+    """
+    Hashes a file's content in fixed-size blocks so large PDFs are not read into memory at once.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
 class RAGPipeline:
-    def __init__(self, embedding_dimension: int = 384): # Default dimension for paraphrase-multilingual-MiniLM-L12-v2
-        self.vector_db = VectorDB(dimension=embedding_dimension)
+    def __init__(self, embedding_dimension: int = 384, max_workers: Optional[int] = None, # Default dimension for paraphrase-multilingual-MiniLM-L12-v2
+                 embedding_cache: Optional[EmbeddingCache] = None, index_spec: str = "Flat",
+                 metric: str = "cosine", compact_threshold: Optional[float] = None, storage: str = "float32",
+                 rescore: bool = False, chunker: Optional[Chunker] = None, deduplicate: bool = True,
+                 reranker: Optional[Reranker] = None, retrieval_cache: Optional[RetrievalCache] = None):
+        # Sentence-transformer embeddings are meant to be compared by cosine similarity
+        self.vector_db = VectorDB(dimension=embedding_dimension, index_spec=index_spec, metric=metric,
+                                  compact_threshold=compact_threshold, storage=storage, rescore=rescore)
+        self.lexical_index = BM25Index()  # Built alongside the vector index, keyed by the same ids
+        # Sentence-aware chunks sized to the embedding model's token window
+        self.chunker = chunker or Chunker()
+        # Exact and near-duplicate chunks are embedded once; the vector keeps the first file as its
+        # "source" and duplicate_sources maps its id to the {"source", "chunk_id"} of the other copies
+        self.deduplicator = Deduplicator() if deduplicate else None
+        self.duplicate_sources: Dict[int, List[Dict]] = {}
+        self.reranker = reranker  # Optional cross-encoder applied to a larger candidate set
+        self.retrieval_cache = retrieval_cache  # Optional cache of retrieve_information results
+        # Incremented whenever chunks are added, replaced or deleted; cached results of an older
+        # generation are stale
+        self.index_generation = 0
+        self.max_workers = max_workers  # Document loading processes; None uses all CPUs
+        self.embedding_cache = embedding_cache  # Shared by ingestion and query embedding
+        # Maps absolute file path -> {"size", "mtime", "sha256", "ids"} for every ingested file
+        self.manifest: Dict[str, Dict] = {}
 
     def ingest_documents(self, directory_path: str):
         """
         Loads documents from a directory, chunks them, generates embeddings,
         and adds them to the vector database.
+        Ingestion is incremental: files recorded in the manifest with the same size and
+        modification time (or the same content hash) are skipped, vectors of modified files
+        are replaced, and vectors of files that no longer exist are deleted.
+        """
+        self.ingest_stream(directory_path)
+
+    def _delete_ids(self, ids: List[int]):
+        if ids:
+            self.index_generation += 1
+        self.vector_db.delete(ids)
+        self.lexical_index.delete(ids)
+        if self.deduplicator is not None:
+            for vector_id in ids:
+                self.deduplicator.remove(vector_id)
+
+    def _release_file(self, file_path: str, ids: List[int], newest: bool = False):
+        """
+        Removes the chunks of a removed or modified file. Vectors that other files share through
+        deduplication are kept: the file's references are dropped and, if the file owned the
+        vector, ownership passes to one of the remaining copies.
+        Each occurrence of an id in `ids` releases one chunk of the file, so references the file
+        added to a shared vector since are kept; `newest` releases the latest references instead
+        of the earliest.
+        """
+        deleted, transferred = [], {}
+        for vector_id, count in Counter(ids).items():
+            metadata = self.vector_db.get_metadata(vector_id)
+            if metadata is None:
+                continue
+            owned = metadata["source"] == file_path
+            references = self.duplicate_sources.pop(vector_id, [])
+            positions = [position for position, reference in enumerate(references)
+                         if reference["source"] == file_path]
+            count -= owned  # The file's remaining chunks are references
+            released = set(positions[max(len(positions) - count, 0):] if newest else positions[:count])
+            references = [reference for position, reference in enumerate(references) if position not in released]
+            if not owned:
+                pass  # Another file owns the vector
+            elif references:
+                owner = references.pop(0)
+                transferred[vector_id] = dict(metadata, source=owner["source"], chunk_id=owner["chunk_id"])
+            else:
+                deleted.append(vector_id)
+            if references:
+                self.duplicate_sources[vector_id] = references
+        if transferred:
+            # The vector itself is unchanged, only its metadata moves to the new owner
+            self.vector_db.update_metadata(list(transferred), list(transferred.values()))
+            self.index_generation += 1
+        self._delete_ids(deleted)
+
+    def _deduplicate(self, batch: List[Dict], replaced_ids: Set[int]) -> Tuple[List[Dict], List, List[Tuple[Dict, int]]]:
+        """
+        Splits a batch of chunks into the chunks to embed (with their signatures) and duplicates
+        of indexed chunks or of earlier chunks of the batch. Chunks to embed are indexed under
+        provisional keys -1, -2, ... until they have vector ids.
+        Vectors in `replaced_ids` are owned by modified files and are released once the batch is
+        committed, so chunks are never recorded as their duplicates.
+        :return: (unique chunks, their signatures, (duplicate chunk, key of the original) pairs).
+        """
+        unique, signatures, duplicates = [], [], []
+        for metadata in batch:
+            signature = self.deduplicator.signature(metadata["text"])
+            match = self.deduplicator.query(signature, exclude=replaced_ids)
+            if match is None:
+                unique.append(metadata)
+                signatures.append(signature)
+                self.deduplicator.add(-len(unique), signature)
+            else:
+                duplicates.append((metadata, match))
+        return unique, signatures, duplicates
+
+    def _with_duplicate_sources(self, results: List[Dict]) -> List[Dict]:
+        """
+        Lists the other files containing each retrieved chunk under "duplicate_sources".
+        """
+        if self.duplicate_sources:
+            for result in results:
+                references = self.duplicate_sources.get(result["id"])
+                if references and result["metadata"] is not None:
+                    result["metadata"]["duplicate_sources"] = [reference["source"] for reference in references]
+        return results
+
+    def _plan_ingestion(self, directory_path: str) -> List[Tuple[str, Dict]]:
+        """
+        Compares a directory with the manifest. Deletes the vectors of removed files and returns
+        (file_path, manifest entry) for every file that needs to be (re-)ingested. Modified files
+        keep their vectors and manifest entry until their new chunks are committed.
+        """
+        directory_key = os.path.join(os.path.abspath(directory_path), "")
+        current_files = [os.path.abspath(file_path) for file_path in list_document_files(directory_path)]
+
+        # Files that were ingested from this directory before but have since been removed
+        current_file_set = set(current_files)
+        for file_key in [key for key in self.manifest if key.startswith(directory_key) and key not in current_file_set]:
+            print(f"Removing deleted file: {os.path.basename(file_key)}")
+            self._release_file(file_key, self.manifest.pop(file_key)["ids"])
+
+        pending = []
+        for file_path in current_files:
+            stat = os.stat(file_path)
+            entry = self.manifest.get(file_path)
+            if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                continue
+
+            sha256 = _file_sha256(file_path)
+            if entry and entry["sha256"] == sha256:
+                entry["mtime"] = stat.st_mtime  # Touched but not modified
+                continue
+
+            if entry:
+                print(f"Re-processing modified file: {os.path.basename(file_path)}")
+            else:
+                print(f"Processing file: {os.path.basename(file_path)}")
+            pending.append((file_path, {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": sha256}))
+        return pending
+
+    def ingest_stream(self, directory_path: str, batch_size: int = DEFAULT_INGEST_BATCH_SIZE,
+                      max_memory_mb: Optional[float] = None):
+        """
+        Ingests a directory incrementally (see `ingest_documents`) as a stream: chunks are pulled
+        from the loader in batches, embedded and appended to the index as they arrive, so peak
+        memory depends on the batch size rather than the size of the corpus.
+        :param directory_path: The directory to ingest.
+        :param batch_size: Maximum number of chunks embedded per batch.
+        :param max_memory_mb: Optional ceiling for the text and embeddings buffered per batch;
+                              a batch is flushed early once it is reached.
         """
         print(f"Starting document ingestion from: {directory_path}")
-        chunks = load_documents_from_directory(directory_path)
-        
-        if not chunks:
-            print("No documents or chunks generated. Skipping embedding and vector DB population.")
+        pending = self._plan_ingestion(directory_path)
+        if not pending:
+            print("No new or modified documents. Skipping embedding and vector DB population.")
             return
 
-        print(f"Generated {len(chunks)} chunks. Generating embeddings...")
-        embeddings = get_embeddings(chunks)
-        
-        # Prepare metadatas for each chunk
-        # In a real application, you'd want more robust metadata (e.g., source file, page number)
-        metadatas = [{"text": chunk, "chunk_id": i} for i, chunk in enumerate(chunks)]
+        max_buffer_bytes = max_memory_mb * 1024 * 1024 if max_memory_mb else None
+        embedding_bytes = self.vector_db.dimension * 4  # float32
+        ids_by_file: Dict[str, List[int]] = {file_path: [] for file_path, _ in pending}
+        # Vectors owned by the previous versions of modified files; vectors they only share with
+        # other files stay indexed and can still be matched
+        replaced_ids = {vector_id for file_path, _ in pending if file_path in self.manifest
+                        for vector_id in self.manifest[file_path]["ids"]
+                        if (self.vector_db.get_metadata(vector_id) or {}).get("source") == file_path}
+        batch: List[Dict] = []
+        buffered_bytes = 0
+        total_chunks = 0
+        total_duplicates = 0
+        embedding_seconds = 0.0
+        ingested_at = int(time.time())  # Recorded per chunk so searches can filter by ingest date
+
+        def flush() -> int:
+            nonlocal embedding_seconds
+            for metadata in batch:
+                metadata["ingested_at"] = ingested_at
+            unique, signatures, duplicates = batch, [], []
+            if self.deduplicator is not None:
+                unique, signatures, duplicates = self._deduplicate(batch, replaced_ids)
+            ids = []
+            if unique:
+                texts = [metadata["text"] for metadata in unique]
+                start = time.perf_counter()
+                embeddings = get_embeddings(texts, cache=self.embedding_cache)
+                embedding_seconds += time.perf_counter() - start
+                ids = self.vector_db.add_vectors(embeddings, unique)
+                self.lexical_index.add(ids, texts)
+                self.index_generation += 1
+            for vector_id, metadata in zip(ids, unique):
+                ids_by_file[metadata["source"]].append(vector_id)
+            for position, (vector_id, signature) in enumerate(zip(ids, signatures)):
+                self.deduplicator.remove(-position - 1)
+                self.deduplicator.add(vector_id, signature)
+            for metadata, match in duplicates:
+                vector_id = ids[-match - 1] if match < 0 else match
+                self.duplicate_sources.setdefault(vector_id, []).append(
+                    {"source": metadata["source"], "chunk_id": metadata["chunk_id"]})
+                ids_by_file[metadata["source"]].append(vector_id)
+            return len(duplicates)
 
-        self.vector_db.add_vectors(embeddings, metadatas)
-        print("Document ingestion complete.")
+        chunks = iter_file_chunks([file_path for file_path, _ in pending], max_workers=self.max_workers,
+                                  chunker=self.chunker)
+        try:
+            for metadata in chunks:
+                batch.append(metadata)
+                buffered_bytes += len(metadata["text"].encode("utf-8")) + embedding_bytes
+                if len(batch) >= batch_size or (max_buffer_bytes and buffered_bytes >= max_buffer_bytes):
+                    total_duplicates += flush()
+                    total_chunks += len(batch)
+                    batch = []
+                    buffered_bytes = 0
+            if batch:
+                total_duplicates += flush()
+                total_chunks += len(batch)
+            if self.vector_db.num_pending:
+                # Approximate indexes buffer vectors until trained; train on what this run produced
+                self.vector_db.train()
+        except BaseException:
+            # Drop the partially ingested chunks; the previous versions and the manifest are untouched,
+            # so the files are retried by the next run
+            if self.deduplicator is not None:
+                for position in range(len(batch)):
+                    self.deduplicator.remove(-position - 1)
+            for file_path, ids in ids_by_file.items():
+                self._release_file(file_path, ids, newest=True)
+            raise
 
-    def retrieve_information(self, query: str, k: int = 5) -> List[Dict]:
+        for file_path, entry in pending:
+            if file_path in self.manifest:
+                self._release_file(file_path, self.manifest[file_path]["ids"])
+            self.manifest[file_path] = dict(entry, ids=ids_by_file[file_path])
+        print(f"Document ingestion complete. Embedded {total_chunks - total_duplicates} chunks from {len(pending)} files "
+              f"({total_duplicates} duplicate chunks skipped).")
+        if embedding_seconds > 0:
+            print(f"Embedding throughput: {(total_chunks - total_duplicates) / embedding_seconds:.1f} chunks/sec.")
+
+    def retrieve_information(self, query: str, k: int = 5, min_score: Optional[float] = None,
+                             mode: str = "dense", filters: Optional[Dict[str, Any]] = None) -> List[Dict]:
         """
         Retrieves relevant information from the vector database based on a query.
+        :param min_score: Optional similarity threshold; weaker dense matches are dropped.
+        :param mode: "dense" (vector search), "lexical" (BM25 keyword search) or "hybrid" (both
+                     rankings fused with reciprocal rank fusion, see `retrieve_batch`).
+        :param filters: Optional metadata filter, e.g. {"source": ["docs/a.pdf"], "doc_type": "pdf",
+                         "ingested_at": {"min": datetime(2024, 1, 1)}} (see `MetadataStore.select`).
+                         Relative source paths are resolved like the ingested directory.
+        With a reranker, `k * RERANK_CANDIDATES` results are retrieved and the top k after
+        re-ranking are returned, each with a "rerank_score".
+        With a retrieval cache, repeated (and, with its semantic tier, similar) queries are
+        answered from the cache until the index changes.
         """
         print(f"Retrieving information for query: '{query}'")
-        query_embedding = get_embeddings([query])[0]
-        search_results = self.vector_db.search(query_embedding, k=k)
-        return search_results
+        generation = self.index_generation
+        query_embedding = None
+        if self.retrieval_cache is not None:
+            cache_key = RetrievalCache.make_key(query, k=k, min_score=min_score, mode=mode, filters=filters)
+            cached = self.retrieval_cache.get(cache_key, generation)
+            if cached is None and self.retrieval_cache.semantic_threshold is not None:
+                query_embedding = get_embeddings([query], cache=self.embedding_cache)[0]
+                cached = self.retrieval_cache.get_similar(cache_key, query_embedding, generation)
+            if cached is not None:
+                return cached
+
+        num_candidates = k * RERANK_CANDIDATES if self.reranker else k
+        if mode == "dense" and not filters:
+            if query_embedding is None:
+                query_embedding = get_embeddings([query], cache=self.embedding_cache)[0]
+            search_results = self.vector_db.search(query_embedding, k=num_candidates, min_score=min_score)
+            results = self._rerank([query], [self._with_duplicate_sources(search_results)], k)[0]
+        else:
+            query_embeddings = query_embedding.reshape(1, -1) if query_embedding is not None else None
+            results = self._rerank([query], self._retrieve(queries=[query], k=num_candidates, min_score=min_score,
+                                                           mode=mode, filters=filters,
+                                                           query_embeddings=query_embeddings), k)[0]
+        if self.retrieval_cache is not None:
+            self.retrieval_cache.put(cache_key, results, generation, embedding=query_embedding)
+        return results
+
+    def retrieve_batch(self, queries: List[str], k: int = 5, min_score: Optional[float] = None,
+                       mode: str = "dense", filters: Optional[Dict[str, Any]] = None) -> List[List[Dict]]:
+        """
+        Retrieves information for several queries at once: all queries are embedded in one
+        encoder pass and searched with one FAISS call.
+        In "hybrid" mode the dense and BM25 rankings of each query are fused with reciprocal rank
+        fusion, so exact identifiers and error strings are found even when the embedding misses
+        them; results then carry the fused "score" only.
+        :return: One list of results per query, in the same order as queries.
+        """
+        if not queries:
+            return []
+        print(f"Retrieving information for {len(queries)} queries")
+        num_candidates = k * RERANK_CANDIDATES if self.reranker else k
+        results = self._retrieve(queries, k=num_candidates, min_score=min_score, mode=mode, filters=filters)
+        return self._rerank(queries, results, k)
+
+    def _rerank(self, queries: List[str], results: List[List[Dict]], k: int) -> List[List[Dict]]:
+        """
+        Re-orders each query's candidates with the reranker, if one is configured.
+        """
+        if self.reranker is None:
+            return results
+        return [self.reranker.rerank(query, query_results, k=k) for query, query_results in zip(queries, results)]
+
+    def _retrieve(self, queries: List[str], k: int, min_score: Optional[float], mode: str,
+                  filters: Optional[Dict[str, Any]] = None,
+                  query_embeddings: Optional[np.ndarray] = None) -> List[List[Dict]]:
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode '{mode}'. Expected one of {RETRIEVAL_MODES}.")
+        # The filter is evaluated once and shared by the dense and lexical searches
+        mask = self.vector_db.metadatas.select(self._resolve_filters(filters)) if filters else None
+        # The lexical index is keyed by vector id rather than by row
+        lexical_mask = self.vector_db.id_mask(mask) if mask is not None and mode != "dense" else None
+        if mode == "lexical":
+            return [self._with_duplicate_sources(self._lexical_results(self.lexical_index.search(query, k=k, mask=lexical_mask)))
+                    for query in queries]
+
+        num_candidates = k if mode == "dense" else k * HYBRID_CANDIDATES
+        if query_embeddings is None:
+            query_embeddings = get_embeddings(queries, cache=self.embedding_cache)
+        dense_results = self.vector_db.search_batch(query_embeddings, k=num_candidates, min_score=min_score,
+                                                    filters=mask)
+        if mode == "dense":
+            return [self._with_duplicate_sources(results) for results in dense_results]
+
+        results = []
+        for query, dense in zip(queries, dense_results):
+            lexical = self.lexical_index.search(query, k=num_candidates, mask=lexical_mask)
+            fused = reciprocal_rank_fusion([[result["id"] for result in dense],
+                                            [doc_id for doc_id, _ in lexical]])[:k]
+            results.append(self._with_duplicate_sources(self._lexical_results(fused)))
+        return results
+
+    @staticmethod
+    def _resolve_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Chunks record absolute source paths, so source filters are made absolute as well.
+        """
+        if "source" not in filters:
+            return filters
+        sources = filters["source"]
+        sources = [sources] if isinstance(sources, str) else sources
+        return dict(filters, source=[os.path.abspath(source) for source in sources])
+
+    def _lexical_results(self, scored_ids: List[Tuple[int, float]]) -> List[Dict]:
+        return [{"id": doc_id, "metadata": self.vector_db.get_metadata(doc_id), "score": score}
+                for doc_id, score in scored_ids]
+
+    def compact(self):
+        """
+        Reclaims the space of deleted chunks in the vector index (see `VectorDB.compact`).
+        The lexical index drops its deleted postings on `save`.
+        """
+        self.vector_db.compact()
+
+    def save(self, path: str):
+        """
+        Persists the ingested index and the ingestion manifest to a directory so later runs
+        can skip ingestion, or only re-ingest the files that changed.
+        """
+        self.vector_db.save(path)
+        self.lexical_index.save(os.path.join(path, LEXICAL_DIRNAME))
+        if self.deduplicator is not None:
+            self.deduplicator.save(os.path.join(path, DEDUP_DIRNAME))
+        duplicates_path = os.path.join(path, DUPLICATES_FILENAME)
+        with open(duplicates_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({str(vector_id): references for vector_id, references in self.duplicate_sources.items()},
+                      f, ensure_ascii=False)
+        os.replace(duplicates_path + ".tmp", duplicates_path)
+        manifest_path = os.path.join(path, MANIFEST_FILENAME)
+        with open(manifest_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, max_workers: Optional[int] = None,
+             embedding_cache: Optional[EmbeddingCache] = None, compact_threshold: Optional[float] = None,
+             chunker: Optional[Chunker] = None, deduplicate: bool = True, reranker: Optional[Reranker] = None,
+             retrieval_cache: Optional[RetrievalCache] = None) -> "RAGPipeline":
+        """
+        Creates a pipeline backed by an index previously written with `save`.
+        The keyword arguments are those of `__init__`; the index layout (dimension, index_spec,
+        metric, storage, rescore) is the saved one. `compact_threshold` defaults to the saved value.
+        """
+        vector_db = VectorDB.load(path, mmap=mmap)
+        if compact_threshold is not None:
+            vector_db.compact_threshold = compact_threshold
+        rag_pipeline = cls(embedding_dimension=vector_db.dimension, max_workers=max_workers,
+                           embedding_cache=embedding_cache, index_spec=vector_db.index_spec, metric=vector_db.metric,
+                           compact_threshold=vector_db.compact_threshold, storage=vector_db.storage,
+                           rescore=vector_db.rescore, chunker=chunker, deduplicate=deduplicate, reranker=reranker,
+                           retrieval_cache=retrieval_cache)
+        rag_pipeline.vector_db = vector_db
+        lexical_path = os.path.join(path, LEXICAL_DIRNAME)
+        if os.path.isdir(lexical_path):
+            rag_pipeline.lexical_index = BM25Index.load(lexical_path, mmap=mmap)
+        else:
+            # Index saved before lexical search existed (so vector ids are row positions);
+            # rebuild it from the stored chunk texts
+            for vector_id, metadata in enumerate(vector_db.metadatas):
+                if metadata is not None:
+                    rag_pipeline.lexical_index.add([vector_id], [metadata["text"]])
+        dedup_path = os.path.join(path, DEDUP_DIRNAME)
+        if deduplicate and os.path.isdir(dedup_path):
+            rag_pipeline.deduplicator = Deduplicator.load(dedup_path)
+        elif deduplicate:
+            # Index saved without deduplication; index the stored chunk texts
+            for vector_id in np.flatnonzero(vector_db.id_mask(vector_db.metadatas.live_mask())).tolist():
+                metadata = vector_db.get_metadata(vector_id)
+                rag_pipeline.deduplicator.add(vector_id, rag_pipeline.deduplicator.signature(metadata["text"]))
+        duplicates_path = os.path.join(path, DUPLICATES_FILENAME)
+        if os.path.isfile(duplicates_path):
+            with open(duplicates_path, "r", encoding="utf-8") as f:
+                rag_pipeline.duplicate_sources = {int(vector_id): references
+                                                  for vector_id, references in json.load(f).items()}
+        manifest_path = os.path.join(path, MANIFEST_FILENAME)
+        if os.path.isfile(manifest_path):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                rag_pipeline.manifest = json.load(f)
+        return rag_pipeline
 
 if __name__ == "__main__":
     # Example usage of the RAG Pipeline
@@ -65,14 +488,14 @@ if __name__ == "__main__":
     results1 = rag_pipeline.retrieve_information(query1, k=2)
     print(f"\nResults for query: '{query1}'")
     for i, result in enumerate(results1):
-        print(f"--- Result {i+1} (Distance: {result['distance']:.4f}) ---")
+        print(f"--- Result {i+1} (Score: {result['score']:.4f}) ---")
         print(f"Text: {result['metadata']['text']}")
 
     query2 = "When did the Cold War end?"
     results2 = rag_pipeline.retrieve_information(query2, k=2)
     print(f"\nResults for query: '{query2}'")
     for i, result in enumerate(results2):
-        print(f"--- Result {i+1} (Distance: {result['distance']:.4f}) ---")
+        print(f"--- Result {i+1} (Score: {result['score']:.4f}) ---")
         print(f"Text: {result['metadata']['text']}")
     
     # Clean up dummy directory
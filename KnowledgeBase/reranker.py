@@ -0,0 +1,104 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# A small multilingual cross-encoder (trained on mMARCO), so Chinese queries are re-ranked as well
+RERANKER_MODEL_NAME = 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1'
+
+class Reranker:
+    def __init__(self, model_name: str = RERANKER_MODEL_NAME, device: Optional[str] = None,
+                 batch_size: int = 16, max_length: int = 256, latency_budget_ms: Optional[float] = None):
+        """
+        Second retrieval stage: re-scores (query, chunk) pairs with a cross-encoder, which reads
+        the query and the chunk together and ranks far more precisely than the embedding
+        similarity used to find the candidates. The model is loaded lazily, like `Embedder`.
+        :param model_name: The sentence-transformers CrossEncoder to load.
+        :param device: Device to run on (e.g. "cpu", "cuda"). None lets sentence-transformers choose.
+        :param batch_size: Pairs scored per model call.
+        :param max_length: Maximum tokens of a (query, chunk) pair.
+        :param latency_budget_ms: Default time budget per query. Candidates are scored in batches,
+                                  best first-stage candidates first, and scoring stops once the
+                                  next batch would exceed the budget. None scores every candidate.
+        """
+        self.model_name = model_name
+        self.device = device
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.latency_budget_ms = latency_budget_ms
+        self._model = None
+        self._lock = threading.Lock()
+        self._seconds_per_pair: Optional[float] = None  # Running estimate of the scoring cost
+
+    @property
+    def model(self):
+        """
+        The underlying CrossEncoder, loaded on first access (thread-safe).
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device=self.device, max_length=self.max_length)
+        return self._model
+
+    def score(self, query: str, texts: List[str]) -> np.ndarray:
+        """
+        Returns the cross-encoder relevance score of each text for the query.
+        """
+        if not texts:
+            return np.empty(0, dtype=np.float32)
+        start = time.perf_counter()
+        scores = np.asarray(self.model.predict([(query, text) for text in texts], batch_size=self.batch_size,
+                                               show_progress_bar=False), dtype=np.float32)
+        seconds_per_pair = (time.perf_counter() - start) / len(texts)
+        # Exponential moving average, so the budget adapts to the machine and the chunk lengths
+        self._seconds_per_pair = seconds_per_pair if self._seconds_per_pair is None else \
+            0.8 * self._seconds_per_pair + 0.2 * seconds_per_pair
+        return scores
+
+    def rerank(self, query: str, results: List[Dict], k: Optional[int] = None,
+               latency_budget_ms: Optional[float] = None) -> List[Dict]:
+        """
+        Re-orders retrieval results by cross-encoder score.
+        Results that were scored get a "rerank_score" and come first; candidates left unscored
+        because of the latency budget follow in their original order.
+        :param query: The query the results were retrieved for.
+        :param results: Results with the chunk text in result["metadata"]["text"], best first.
+        :param k: Number of results to return. Defaults to all of them.
+        :param latency_budget_ms: Overrides the default time budget for this query.
+        """
+        budget_ms = latency_budget_ms if latency_budget_ms is not None else self.latency_budget_ms
+        candidates = [result for result in results if result.get("metadata") is not None]
+        limit = len(candidates)
+        if budget_ms is not None and self._seconds_per_pair:
+            limit = min(limit, max(self.batch_size, int(budget_ms / 1000 / self._seconds_per_pair)))
+
+        start = time.perf_counter()
+        scored = 0
+        while scored < limit:
+            if budget_ms is not None and scored:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if elapsed_ms + elapsed_ms / scored * self.batch_size > budget_ms:
+                    break
+            batch = candidates[scored:min(scored + self.batch_size, limit)]
+            scores = self.score(query, [result["metadata"]["text"] for result in batch])
+            for result, score in zip(batch, scores.tolist()):
+                result["rerank_score"] = score
+            scored += len(batch)
+
+        reranked = sorted(candidates[:scored], key=lambda result: -result["rerank_score"]) + candidates[scored:]
+        return reranked[:k] if k is not None else reranked
+
+if __name__ == "__main__":
+    # Example usage:
+    reranker = Reranker()
+    query = "What kind of pets are loyal?"
+    results = [{"id": i, "metadata": {"text": text}, "score": 0.0} for i, text in enumerate([
+        "Cats are domesticated carnivorous mammals, often kept as indoor pets.",
+        "Dogs are known for their loyalty and companionship.",
+        "Birds are warm-blooded vertebrates characterized by feathers.",
+    ])]
+    for result in reranker.rerank(query, results, k=2):
+        print(f"{result['rerank_score']:.4f}  {result['metadata']['text']}")
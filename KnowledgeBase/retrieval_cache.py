@@ -0,0 +1,155 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .text_utils import fold_text
+
+class RetrievalCache:
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = 3600,
+                 semantic_threshold: Optional[float] = None):
+        """
+        In-process cache of retrieval results, so repeated questions are answered without
+        embedding the query or searching the index again.
+        Entries are keyed by the normalized query text and the retrieval parameters, evicted in
+        LRU order beyond `max_entries` and expire after `ttl_seconds`. Every entry records the
+        index generation it was computed for; an entry from an older generation is a miss, so
+        ingesting documents invalidates the cache.
+        :param max_entries: Maximum number of cached queries.
+        :param ttl_seconds: Lifetime of an entry. None keeps entries until evicted or invalidated.
+        :param semantic_threshold: Enables the semantic tier: a query whose embedding has at least
+                                   this cosine similarity with a cached query (with the same
+                                   parameters) is answered with the cached results. None disables it.
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_threshold = semantic_threshold
+        # key -> (results, generation, expiry time, embedding slot or -1)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[List[Dict], int, float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        # Semantic tier: normalized query embeddings in fixed slots, scanned with one matrix product
+        self._embeddings: Optional[np.ndarray] = None
+        self._slot_keys: List[Optional[Tuple[str, str]]] = []
+        self._free_slots: List[int] = []
+
+    @staticmethod
+    def make_key(query: str, **params: Any) -> Tuple[str, str]:
+        """
+        Returns the cache key of a query and its retrieval parameters (k, mode, filters, ...).
+        """
+        return fold_text(query), json.dumps(params, sort_keys=True, default=str)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the hit/miss counters of the cache.
+        """
+        return {"hits": self.hits, "semantic_hits": self.semantic_hits, "misses": self.misses,
+                "entries": len(self._entries)}
+
+    def _remove(self, key: Tuple[str, str]):
+        _, _, _, slot = self._entries.pop(key)
+        if slot >= 0:
+            self._slot_keys[slot] = None
+            self._free_slots.append(slot)
+
+    def _lookup(self, key: Tuple[str, str], generation: int) -> Optional[List[Dict]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        results, entry_generation, expires_at, _ = entry
+        if entry_generation != generation or expires_at < time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return copy.deepcopy(results)  # Callers may annotate the results they get
+
+    def get(self, key: Tuple[str, str], generation: int) -> Optional[List[Dict]]:
+        """
+        Returns the cached results of an exact (normalized) query match, or None.
+        With the semantic tier enabled, a miss is only counted by the `get_similar` that follows.
+        """
+        with self._lock:
+            results = self._lookup(key, generation)
+            if results is not None:
+                self.hits += 1
+            elif self.semantic_threshold is None:
+                self.misses += 1
+            return results
+
+    def get_similar(self, key: Tuple[str, str], embedding: np.ndarray, generation: int) -> Optional[List[Dict]]:
+        """
+        Semantic tier: returns the cached results of the most similar cached query with the same
+        parameters, if its cosine similarity reaches `semantic_threshold`. Call after a `get` miss.
+        """
+        with self._lock:
+            if self._embeddings is not None and self.semantic_threshold is not None:
+                similarities = self._embeddings[:len(self._slot_keys)] @ self._normalize(embedding)
+                for slot in np.argsort(-similarities).tolist():
+                    if similarities[slot] < self.semantic_threshold:
+                        break
+                    cached_key = self._slot_keys[slot]
+                    if cached_key is None or cached_key[1] != key[1]:
+                        continue
+                    results = self._lookup(cached_key, generation)
+                    if results is not None:
+                        self.semantic_hits += 1
+                        return results
+            self.misses += 1
+            return None
+
+    @staticmethod
+    def _normalize(embedding: np.ndarray) -> np.ndarray:
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+    def put(self, key: Tuple[str, str], results: List[Dict], generation: int, embedding: Optional[np.ndarray] = None):
+        """
+        Caches the results of a query computed at the given index generation. The query
+        embedding is only kept when the semantic tier is enabled.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while len(self._entries) >= self.max_entries:
+                self._remove(next(iter(self._entries)))  # Least recently used
+            slot = -1
+            if embedding is not None and self.semantic_threshold is not None:
+                embedding = self._normalize(embedding)
+                if self._embeddings is None:
+                    self._embeddings = np.zeros((self.max_entries, len(embedding)), dtype=np.float32)
+                slot = self._free_slots.pop() if self._free_slots else len(self._slot_keys)
+                if slot == len(self._slot_keys):
+                    self._slot_keys.append(None)
+                self._embeddings[slot] = embedding
+                self._slot_keys[slot] = key
+            expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else float("inf")
+            self._entries[key] = (copy.deepcopy(results), generation, expires_at, slot)
+
+    def clear(self):
+        """
+        Drops every entry.
+        """
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+if __name__ == "__main__":
+    # Example usage:
+    cache = RetrievalCache(semantic_threshold=0.9)
+    key = RetrievalCache.make_key("What is the grading policy?", k=3, mode="hybrid")
+    cache.put(key, [{"id": 0, "metadata": {"text": "Grading: homework 40%, exams 60%."}, "score": 1.0}],
+              generation=0, embedding=np.array([1.0, 0.0]))
+
+    print(cache.get(RetrievalCache.make_key("  what is the GRADING policy? ", k=3, mode="hybrid"), generation=0))
+    similar_key = RetrievalCache.make_key("How is the course graded?", k=3, mode="hybrid")
+    print(cache.get(similar_key, generation=0) or cache.get_similar(similar_key, np.array([0.95, 0.1]), generation=0))
+    print(cache.get(key, generation=1))  # The index changed since the entry was cached
+    print(cache.stats())
@@ -0,0 +1,220 @@
+import heapq
+import json
+import os
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .vector_db_module import VectorDB
+
+HEADER_FILENAME = "sharded_vector_db.json"
+PARTITIONS = ("hash", "source")
+
+class ShardedVectorDB:
+    def __init__(self, dimension: int, num_shards: int = 4, partition: str = "hash", index_spec: str = "Flat",
+                 metric: str = "l2", train_size: Optional[int] = None, compact_threshold: Optional[float] = None,
+                 max_workers: Optional[int] = None, storage: str = "float32", rescore: bool = False):
+        """
+        Partitions vectors over several independent `VectorDB` shards. Searches fan out to all shards
+        in a thread pool (FAISS releases the GIL while searching) and the per-shard top-k lists are
+        merged, so per-shard memory stays bounded and search time scales with the number of cores.
+        Vector ids are global: the id of a vector with local id `i` in shard `s` is `i * num_shards + s`.
+        :param dimension: The dimension of the embeddings.
+        :param num_shards: Number of shards.
+        :param partition: "hash" spreads chunks over shards by a hash of their text; "source" keeps
+                          all chunks of a file in one shard, so removing a file touches one shard.
+        :param index_spec, metric, train_size, compact_threshold, storage, rescore: Passed to every
+                                                                    shard (see `VectorDB`).
+        :param max_workers: Threads used to search shards concurrently. Defaults to one per shard.
+        """
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1.")
+        if partition not in PARTITIONS:
+            raise ValueError(f"Unknown partition '{partition}'. Expected one of {PARTITIONS}.")
+        self.dimension = dimension
+        self.num_shards = num_shards
+        self.partition = partition
+        self.index_spec = index_spec
+        self.metric = metric
+        self.storage = storage
+        self.rescore = rescore
+        self.train_size = train_size
+        self.compact_threshold = compact_threshold
+        self.shards = [VectorDB(dimension, index_spec=index_spec, train_size=train_size, metric=metric,
+                                compact_threshold=compact_threshold, storage=storage, rescore=rescore)
+                       for _ in range(num_shards)]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or num_shards)
+
+    def __len__(self) -> int:
+        """
+        Number of vectors (including deleted ones not yet compacted) over all shards.
+        """
+        return sum(len(shard.metadatas) for shard in self.shards)
+
+    def _shard_for(self, metadata: Dict) -> int:
+        key = metadata.get("source", "") if self.partition == "source" else metadata.get("text", "")
+        return zlib.crc32(str(key).encode("utf-8")) % self.num_shards
+
+    def _split_ids(self, ids) -> Dict[int, List[int]]:
+        """
+        Groups global ids by shard and converts them to the shards' local ids.
+        """
+        local_ids: Dict[int, List[int]] = {}
+        for vector_id in ids:
+            local_ids.setdefault(vector_id % self.num_shards, []).append(vector_id // self.num_shards)
+        return local_ids
+
+    def add_vectors(self, embeddings: np.ndarray, metadatas: List[Dict]) -> List[int]:
+        """
+        Adds embeddings and their metadata, routing each vector to a shard by the partition key.
+        :return: The global ids of the added vectors, in input order.
+        """
+        if embeddings.shape[1] != self.dimension:
+            raise ValueError(f"Embedding dimension mismatch. Expected {self.dimension}, got {embeddings.shape[1]}")
+        shard_of = np.array([self._shard_for(metadata) for metadata in metadatas], dtype=np.int64)
+        ids = np.zeros(len(metadatas), dtype=np.int64)
+        for shard_id in np.unique(shard_of).tolist():
+            positions = np.flatnonzero(shard_of == shard_id)
+            local_ids = self.shards[shard_id].add_vectors(embeddings[positions], [metadatas[i] for i in positions])
+            ids[positions] = np.asarray(local_ids, dtype=np.int64) * self.num_shards + shard_id
+        return ids.tolist()
+
+    def upsert(self, ids: List[int], embeddings: np.ndarray, metadatas: List[Dict]):
+        """
+        Inserts or replaces vectors under global ids. The shard is given by the id, so a replaced
+        vector stays in the shard of its previous version.
+        """
+        positions_by_shard: Dict[int, List[int]] = {}
+        for position, vector_id in enumerate(ids):
+            positions_by_shard.setdefault(vector_id % self.num_shards, []).append(position)
+        for shard_id, positions in positions_by_shard.items():
+            self.shards[shard_id].upsert([ids[i] // self.num_shards for i in positions], embeddings[positions],
+                                         [metadatas[i] for i in positions])
+
+    def delete(self, ids: List[int]):
+        """
+        Tombstones vectors by global id (see `VectorDB.delete`).
+        """
+        for shard_id, local_ids in self._split_ids(ids).items():
+            self.shards[shard_id].delete(local_ids)
+
+    def get_metadata(self, vector_id: int) -> Optional[Dict]:
+        """
+        Returns the metadata of the vector with the given global id, or None.
+        """
+        return self.shards[vector_id % self.num_shards].get_metadata(vector_id // self.num_shards)
+
+    def train(self):
+        """
+        Trains every shard on the vectors buffered for it (see `VectorDB.train`).
+        """
+        for shard in self.shards:
+            if shard.num_pending:
+                shard.train()
+
+    def compact(self):
+        """
+        Compacts the shards concurrently (see `VectorDB.compact`).
+        """
+        list(self._executor.map(lambda shard: shard.compact(), self.shards))
+
+    def search(self, query_embedding: np.ndarray, k: int = 5, **kwargs) -> List[Dict]:
+        """
+        Searches all shards with a query embedding and returns the overall top k (see `search_batch`).
+        """
+        if query_embedding.ndim == 1:
+            query_embedding = query_embedding.reshape(1, -1)
+        return self.search_batch(query_embedding, k=k, **kwargs)[0]
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 5, nprobe: Optional[int] = None,
+                     ef_search: Optional[int] = None, min_score: Optional[float] = None,
+                     filters: Optional[Dict[str, Any]] = None) -> List[List[Dict]]:
+        """
+        Searches all shards concurrently and merges the per-shard top k of each query.
+        Takes the same arguments and returns results in the same format as `VectorDB.search_batch`,
+        with global ids. Filters must be filter expressions, since each shard evaluates them
+        against its own metadata.
+        """
+        if filters is not None and not isinstance(filters, dict):
+            raise ValueError("ShardedVectorDB only supports filter expressions (dictionaries) as filters.")
+
+        def search_shard(shard_id: int) -> List[List[Dict]]:
+            shard_results = self.shards[shard_id].search_batch(query_embeddings, k=k, nprobe=nprobe,
+                                                               ef_search=ef_search, min_score=min_score,
+                                                               filters=filters)
+            for results in shard_results:
+                for result in results:
+                    result["id"] = result["id"] * self.num_shards + shard_id
+            return shard_results
+
+        per_shard = list(self._executor.map(search_shard, range(self.num_shards)))
+        # Each shard's list is already sorted by score, so a k-way heap merge yields the overall top k
+        return [list(islice(heapq.merge(*(shard_results[query] for shard_results in per_shard),
+                                        key=lambda result: -result["score"]), k))
+                for query in range(len(query_embeddings))]
+
+    def close(self):
+        """
+        Shuts down the search thread pool.
+        """
+        self._executor.shutdown(wait=True)
+
+    def save_shard(self, shard_id: int, path: str):
+        """
+        Saves one shard, e.g. after only that shard changed.
+        """
+        self.shards[shard_id].save(os.path.join(path, f"shard_{shard_id}"))
+
+    def load_shard(self, shard_id: int, path: str, mmap: bool = True):
+        """
+        Replaces one shard with the copy saved under `path`.
+        """
+        self.shards[shard_id] = VectorDB.load(os.path.join(path, f"shard_{shard_id}"), mmap=mmap)
+
+    def save(self, path: str):
+        """
+        Saves every shard to its own `shard_{i}` subdirectory of `path`, plus a small header.
+        """
+        os.makedirs(path, exist_ok=True)
+        list(self._executor.map(lambda shard_id: self.save_shard(shard_id, path), range(self.num_shards)))
+        header_path = os.path.join(path, HEADER_FILENAME)
+        with open(header_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"dimension": self.dimension, "num_shards": self.num_shards, "partition": self.partition,
+                       "index_spec": self.index_spec, "metric": self.metric, "storage": self.storage,
+                       "rescore": self.rescore, "train_size": self.train_size,
+                       "compact_threshold": self.compact_threshold}, f)
+        os.replace(header_path + ".tmp", header_path)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, max_workers: Optional[int] = None) -> "ShardedVectorDB":
+        """
+        Reopens a sharded database written with `save`, loading the shards concurrently.
+        """
+        header_path = os.path.join(path, HEADER_FILENAME)
+        if not os.path.isfile(header_path):
+            raise FileNotFoundError(f"No saved sharded vector database found in '{path}'.")
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        sharded_db = cls(header["dimension"], num_shards=header["num_shards"], partition=header["partition"],
+                         index_spec=header["index_spec"], metric=header["metric"], max_workers=max_workers,
+                         storage=header.get("storage", "float32"), rescore=header.get("rescore", False),
+                         train_size=header.get("train_size"), compact_threshold=header.get("compact_threshold"))
+        list(sharded_db._executor.map(lambda shard_id: sharded_db.load_shard(shard_id, path, mmap=mmap),
+                                      range(sharded_db.num_shards)))
+        return sharded_db
+
+if __name__ == "__main__":
+    # Example usage:
+    dimension = 64
+    sharded_db = ShardedVectorDB(dimension, num_shards=4)
+    embeddings = np.random.rand(10000, dimension).astype("float32")
+    ids = sharded_db.add_vectors(embeddings, [{"text": f"chunk {i}"} for i in range(len(embeddings))])
+
+    results = sharded_db.search(embeddings[123], k=3)
+    print("\nSearch Results:")
+    for i, result in enumerate(results):
+        print(f"--- Result {i+1} (Distance: {result['distance']:.4f}) ---")
+        print(f"Text: {result['metadata']['text']}")
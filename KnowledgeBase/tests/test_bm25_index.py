@@ -0,0 +1,83 @@
+import unittest
+import os
+import shutil
+import sys
+
+# Add the parent directory to the sys.path to allow importing bm25_index
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from RAG.bm25_index import BM25Index, tokenize, reciprocal_rank_fusion
+
+class TestBM25Index(unittest.TestCase):
+    def setUp(self):
+        self.documents = [
+            "Course CS-101 introduces programming with Python.",
+            "Error E1234 means the upload exceeded the maximum file size.",
+            "機器學習是人工智慧的一個分支。",
+            "Python is a popular programming language for data science and programming courses.",
+        ]
+        self.index = BM25Index()
+        self.index.add(range(len(self.documents)), self.documents)
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("CS-101 Error_42"), ["cs", "101", "error_42"])
+        self.assertEqual(tokenize("人工智慧"), ["人", "工", "智", "慧", "人工", "工智", "智慧"])
+        self.assertEqual(tokenize("ＡＢＣ 資料"), ["abc", "資", "料", "資料"])
+        self.assertEqual(tokenize("!!"), [])
+
+    def test_search(self):
+        self.assertEqual(self.index.search("e1234", k=1)[0][0], 1)
+        self.assertEqual(self.index.search("CS-101", k=1)[0][0], 0)
+        self.assertEqual(self.index.search("人工智慧", k=1)[0][0], 2)
+
+        results = self.index.search("programming", k=5)
+        self.assertEqual({doc_id for doc_id, _ in results}, {0, 3})
+        self.assertGreaterEqual(results[0][1], results[1][1])
+        self.assertEqual(self.index.search("astronomy", k=5), [])
+        self.assertEqual(self.index.search("programming", k=1), results[:1])
+
+    def test_delete(self):
+        self.index.delete([1])
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.search("e1234", k=5), [])
+
+    def test_save_and_load(self):
+        index_dir = "test_temp_bm25_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        self.index.delete([1])
+        expected = self.index.search("python programming", k=5)
+        self.index.save(index_dir)
+        self.assertEqual(self.index.search("python programming", k=5), expected)
+
+        for mmap in (True, False):
+            loaded_index = BM25Index.load(index_dir, mmap=mmap)
+            self.assertEqual(len(loaded_index), 3)
+            self.assertEqual(loaded_index.search("python programming", k=5), expected)
+            self.assertEqual(loaded_index.search("e1234", k=5), [])
+
+            # Documents added after loading are searchable next to the saved postings
+            loaded_index.add([4], ["Advanced Python programming: CS-201."])
+            self.assertIn(4, [doc_id for doc_id, _ in loaded_index.search("cs 201", k=5)])
+
+    def test_save_drops_deleted_postings(self):
+        index_dir = "test_temp_bm25_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        self.index.delete([1])
+        self.index.save(index_dir)
+        self.assertNotIn("e1234", self.index.vocabulary)
+        self.assertEqual(self.index.deleted_ids, set())
+        self.assertEqual(len(self.index), 3)
+
+        self.index.delete([1])  # Already gone
+        self.assertEqual(len(self.index), 3)
+        loaded_index = BM25Index.load(index_dir)
+        self.assertEqual(len(loaded_index), 3)
+        self.assertEqual(loaded_index.search("e1234", k=5), [])
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]])
+        self.assertEqual([doc_id for doc_id, _ in fused], [1, 3, 2])
+        self.assertAlmostEqual(fused[0][1], 1 / 61 + 1 / 62)
+
+if __name__ == '__main__':
+    unittest.main()
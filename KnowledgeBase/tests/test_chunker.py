@@ -0,0 +1,88 @@
+import unittest
+import os
+import sys
+import time
+
+# Add the parent directory to the sys.path to allow importing chunker
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from RAG.chunker import Chunker, estimate_tokens, split_sentences
+
+def count_words(texts):
+    return [len(text.split()) for text in texts]
+
+class TestChunker(unittest.TestCase):
+    def test_split_sentences(self):
+        text = "First sentence. Second one? Third!\n\n第一句。第二句！「引號。」結尾"
+        sentences = split_sentences(text)
+        self.assertEqual("".join(sentence for sentence, _ in sentences), text)
+        self.assertEqual([sentence.strip() for sentence, _ in sentences],
+                         ["First sentence.", "Second one?", "Third!", "第一句。", "第二句！", "「引號。」", "結尾"])
+        self.assertEqual([ends_paragraph for _, ends_paragraph in sentences],
+                         [False, False, True, False, False, False, True])
+
+    def test_split_sentences_keeps_decimals_and_identifiers(self):
+        sentences = split_sentences("Version 3.14 of file.txt is out. Done.")
+        self.assertEqual([sentence.strip() for sentence, _ in sentences], ["Version 3.14 of file.txt is out.", "Done."])
+
+    def test_chunks_respect_sentences_and_budget(self):
+        text = " ".join(f"Sentence number {i} has exactly seven words." for i in range(20))
+        chunker = Chunker(max_tokens=20, count_tokens=count_words)
+        chunks = chunker.chunk(text)
+        self.assertEqual(len(chunks), 10)
+        for chunk in chunks:
+            self.assertLessEqual(count_words([chunk])[0], 20)
+            self.assertTrue(chunk.startswith("Sentence") and chunk.endswith("words."))
+
+    def test_overlap_sentences(self):
+        text = " ".join(f"Sentence {i} here." for i in range(6))
+        chunks = Chunker(max_tokens=9, overlap_sentences=1, count_tokens=count_words).chunk(text)
+        self.assertEqual(chunks, ["Sentence 0 here. Sentence 1 here. Sentence 2 here.",
+                                  "Sentence 2 here. Sentence 3 here. Sentence 4 here.",
+                                  "Sentence 4 here. Sentence 5 here."])
+
+    def test_paragraph_boundary_ends_chunk(self):
+        text = "One two three four five six.\n\nSeven eight nine."
+        chunks = Chunker(max_tokens=10, count_tokens=count_words).chunk(text)
+        self.assertEqual(chunks, ["One two three four five six.", "Seven eight nine."])
+
+    def test_long_sentence_is_split(self):
+        text = " ".join(["word"] * 25) + "."
+        chunks = Chunker(max_tokens=10, count_tokens=count_words).chunk(text)
+        self.assertEqual([count_words([chunk])[0] for chunk in chunks], [10, 10, 5])
+
+        cjk_chunks = Chunker(max_tokens=8, count_tokens=estimate_tokens).chunk("貓" * 20)
+        self.assertEqual(cjk_chunks, ["貓" * 8, "貓" * 8, "貓" * 4])
+
+    def test_empty_input(self):
+        chunker = Chunker(max_tokens=10, count_tokens=count_words)
+        self.assertEqual(chunker.chunk(""), [])
+        self.assertEqual(chunker.chunk(" \n\n "), [])
+
+    def test_uses_embedder_window(self):
+        class FakeTokenizer:
+            def __call__(self, texts, add_special_tokens=False, **kwargs):
+                return {"input_ids": [text.split() for text in texts]}
+
+        class FakeModel:
+            max_seq_length = 12
+            tokenizer = FakeTokenizer()
+
+        class FakeEmbedder:
+            model = FakeModel()
+
+        chunker = Chunker(embedder=FakeEmbedder())
+        chunks = chunker.chunk(" ".join(["Two words."] * 12))
+        self.assertEqual(chunker.max_tokens, 10)
+        self.assertEqual(len(chunks), 3)
+
+    def test_linear_time(self):
+        chunker = Chunker(max_tokens=100, count_tokens=estimate_tokens)
+        text = "這是一個句子。This is a sentence. " * 20000
+        start = time.perf_counter()
+        chunks = chunker.chunk(text)
+        self.assertLess(time.perf_counter() - start, 10)
+        self.assertGreater(len(chunks), 1000)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+import shutil
+import sys
+
+# Add the parent directory to the sys.path to allow importing dedup
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from RAG.dedup import Deduplicator
+from RAG.text_utils import fold_text
+
+SYLLABUS = ("Course CS-101 covers variables, loops and functions. Grading: homework 40%, "
+            "midterm 25%, final exam 35%. Office hours are on Tuesdays in room 204.")
+
+class TestDeduplicator(unittest.TestCase):
+    def setUp(self):
+        self.deduplicator = Deduplicator()
+        self.deduplicator.add(0, self.deduplicator.signature(SYLLABUS))
+
+    def test_fold_text(self):
+        self.assertEqual(fold_text("  Hello\n\nWORLD\t１２３ "), "hello world 123")
+
+    def test_exact_duplicate(self):
+        self.assertEqual(self.deduplicator.query(self.deduplicator.signature(SYLLABUS.upper())), 0)
+        self.assertEqual(self.deduplicator.query(self.deduplicator.signature(SYLLABUS.replace(" ", "\n"))), 0)
+
+    def test_near_duplicate(self):
+        revised = SYLLABUS.replace("Tuesdays", "Thursdays")
+        self.assertEqual(self.deduplicator.query(self.deduplicator.signature(revised)), 0)
+
+    def test_distinct_text(self):
+        other = "Dogs are loyal companions. They love to play fetch in the park every morning."
+        self.assertIsNone(self.deduplicator.query(self.deduplicator.signature(other)))
+
+    def test_cjk_near_duplicate(self):
+        text = "本課程介紹程式設計的基本概念，包括變數、迴圈與函式。成績由作業與期末考組成。"
+        self.deduplicator.add(1, self.deduplicator.signature(text))
+        self.assertEqual(self.deduplicator.query(self.deduplicator.signature(text.replace("期末考", "期末報告"))), 1)
+
+    def test_query_excludes_keys(self):
+        self.deduplicator.add(1, self.deduplicator.signature(SYLLABUS))
+        signature = self.deduplicator.signature(SYLLABUS)
+        self.assertEqual(self.deduplicator.query(signature, exclude={0}), 1)
+        self.assertIsNone(self.deduplicator.query(signature, exclude={0, 1}))
+
+    def test_remove(self):
+        self.deduplicator.remove(0)
+        self.assertEqual(len(self.deduplicator), 0)
+        self.assertIsNone(self.deduplicator.query(self.deduplicator.signature(SYLLABUS)))
+        self.deduplicator.remove(0)  # Unknown keys are ignored
+
+    def test_save_and_load(self):
+        path = "test_temp_dedup"
+        self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        self.deduplicator.save(path)
+
+        loaded = Deduplicator.load(path)
+        self.assertEqual(len(loaded), 1)
+        self.assertEqual(loaded.query(loaded.signature(SYLLABUS.replace("Tuesdays", "Thursdays"))), 0)
+        self.assertEqual(loaded.query(loaded.signature(SYLLABUS)), 0)
+
+    def test_invalid_bands(self):
+        with self.assertRaises(ValueError):
+            Deduplicator(num_perm=64, bands=10)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,7 +7,10 @@ from unittest.mock import patch, mock_open
 # Add the parent directory to the sys.path to allow importing document_ingestion
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from RAG.document_ingestion import read_text_file, read_pdf_file, chunk_text, load_documents_from_directory
+from pypdf import PdfWriter
+
+from RAG import document_ingestion
+from RAG.document_ingestion import read_text_file, read_pdf_file, chunk_text, load_documents_from_directory, load_documents, iter_chunks
 
 class TestDocumentIngestion(unittest.TestCase):
     def setUp(self):
@@ -63,6 +66,55 @@ class TestDocumentIngestion(unittest.TestCase):
         self.assertIn("Content of document one.", chunks[0])
         self.assertIn("Content of document two.", chunks[1])
 
+    def test_load_documents_parallel_keeps_order(self):
+        file_paths = []
+        for i in range(6):
+            file_path = os.path.join(self.test_dir, f"doc{i}.txt")
+            with open(file_path, "w", encoding="utf-8") as f:
+                f.write(f"Content of document {i}. " * 5)
+            file_paths.append(file_path)
+
+        serial_contents = load_documents(file_paths, max_workers=1)
+        parallel_contents = load_documents(file_paths, max_workers=3)
+        self.assertEqual(parallel_contents, serial_contents)
+        for i, content in enumerate(parallel_contents):
+            self.assertIn(f"Content of document {i}.", content)
+
+    def test_iter_chunks_streams_metadata(self):
+        for name in ("b.txt", "a.txt"):
+            with open(os.path.join(self.test_dir, name), "w", encoding="utf-8") as f:
+                f.write(f"Content of {name}. " * 40)
+
+        chunks = iter_chunks(self.test_dir, max_workers=1)
+        self.assertNotIsInstance(chunks, list)
+        chunks = list(chunks)
+
+        self.assertEqual([c["text"] for c in chunks], load_documents_from_directory(self.test_dir, max_workers=1))
+        self.assertEqual(chunks[0]["source"], os.path.join(self.test_dir, "a.txt"))
+        self.assertEqual(chunks[0]["chunk_id"], 0)
+        self.assertEqual(chunks[1]["chunk_id"], 1)
+        # Chunks point back into their document; text files have no pages
+        content = read_text_file(chunks[1]["source"])
+        self.assertEqual(content[chunks[1]["char_start"]:chunks[1]["char_end"]], chunks[1]["text"])
+        self.assertNotIn("page", chunks[1])
+
+    def test_large_pdf_is_split_into_page_ranges(self):
+        file_path = os.path.join(self.test_dir, "large.pdf")
+        writer = PdfWriter()
+        for _ in range(120):
+            writer.add_blank_page(width=200, height=200)
+        with open(file_path, "wb") as f:
+            writer.write(f)
+
+        with patch.object(document_ingestion, "PDF_SPLIT_MIN_BYTES", 0):
+            tasks = document_ingestion._plan_load_tasks(file_path)
+            self.assertEqual(tasks, [(file_path, 0, 50), (file_path, 50, 100), (file_path, 100, 120)])
+            contents = load_documents([file_path], max_workers=2)
+        # Each page contributes one line, in page order
+        self.assertEqual(contents, [read_pdf_file(file_path)])
+        self.assertEqual(contents[0].count("\n"), 120)
+        self.assertEqual(contents[0].count(document_ingestion.PAGE_BREAK), 120)
+
     @patch('RAG.document_ingestion.PdfReader')
     def test_read_pdf_file_error_handling(self, MockPdfReader):
         # Simulate an invalid PDF file by making PdfReader raise an exception
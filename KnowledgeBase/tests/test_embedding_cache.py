@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+import os
+import shutil
+import sys
+
+# Add the parent directory to the sys.path to allow importing embedding_cache
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from RAG.embedding_cache import EmbeddingCache, normalize_text, text_hash
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = "test_temp_embedding_cache"
+        os.makedirs(self.test_dir, exist_ok=True)
+        self.cache_path = os.path.join(self.test_dir, "embeddings.sqlite")
+        self.model_name = "test-model"
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("  Hello \n\t world  "), "Hello world")
+        self.assertEqual(text_hash("Hello world"), text_hash("Hello   world\n"))
+        self.assertNotEqual(text_hash("Hello world"), text_hash("hello world"))
+
+    def test_miss_then_hit(self):
+        cache = EmbeddingCache()
+        texts = ["first text", "second text"]
+        self.assertEqual(cache.get_many(self.model_name, texts), [None, None])
+        self.assertEqual(cache.misses, 2)
+
+        embeddings = np.random.rand(2, 8).astype('float32')
+        cache.put_many(self.model_name, texts, embeddings)
+        cached = cache.get_many(self.model_name, ["second text", "first text"])
+        np.testing.assert_array_equal(cached[0], embeddings[1])
+        np.testing.assert_array_equal(cached[1], embeddings[0])
+        self.assertEqual(cache.stats()["memory_hits"], 2)
+
+    def test_keys_include_model_name(self):
+        cache = EmbeddingCache()
+        cache.put_many(self.model_name, ["text"], np.ones((1, 4), dtype='float32'))
+        self.assertEqual(cache.get_many("other-model", ["text"]), [None])
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_memory_items=2)
+        cache.put_many(self.model_name, ["a", "b", "c"], np.random.rand(3, 4).astype('float32'))
+        self.assertEqual(cache.stats()["memory_items"], 2)
+        results = cache.get_many(self.model_name, ["a", "b", "c"])
+        self.assertIsNone(results[0])
+        self.assertIsNotNone(results[1])
+        self.assertIsNotNone(results[2])
+
+    def test_persistent_store(self):
+        embeddings = np.random.rand(3, 8).astype('float32')
+        cache = EmbeddingCache(self.cache_path)
+        cache.put_many(self.model_name, ["x", "y", "z"], embeddings)
+        cache.close()
+
+        reopened = EmbeddingCache(self.cache_path)
+        cached = reopened.get_many(self.model_name, ["z", "missing", "x"])
+        np.testing.assert_array_equal(cached[0], embeddings[2])
+        self.assertIsNone(cached[1])
+        np.testing.assert_array_equal(cached[2], embeddings[0])
+        self.assertEqual(reopened.stats()["disk_hits"], 2)
+        self.assertEqual(reopened.stats()["misses"], 1)
+
+        # Disk hits are promoted to the in-process LRU
+        reopened.get_many(self.model_name, ["x"])
+        self.assertEqual(reopened.stats()["memory_hits"], 1)
+        reopened.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,11 +2,15 @@ import unittest
 import numpy as np
 import os
 import sys
+import threading
+from unittest.mock import patch
 
 # Add the parent directory to the sys.path to allow importing embedding_module
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from RAG.embedding_module import get_embeddings, model # Import model to get its dimension
+from RAG.embedding_module import Embedder, get_embedder, MODEL_NAME
+from RAG.embedding_cache import EmbeddingCache
 
 class TestEmbeddingModule(unittest.TestCase):
     def setUp(self):
@@ -36,6 +40,11 @@ class TestEmbeddingModule(unittest.TestCase):
         self.assertIsInstance(embeddings, np.ndarray)
         self.assertEqual(embeddings.shape, (0, self.embedding_dimension)) # Expect (0, dimension) for empty input
 
+        # The dimension of the default model is known without loading it
+        embedder = Embedder(MODEL_NAME)
+        self.assertEqual(get_embeddings([], embedder=embedder).shape, (0, self.embedding_dimension))
+        self.assertFalse(embedder.is_loaded)
+
     def test_embedding_consistency(self):
         text = "The quick brown fox jumps over the lazy dog."
         embedding1 = get_embeddings([text])
@@ -44,5 +53,117 @@ class TestEmbeddingModule(unittest.TestCase):
         # Embeddings should be nearly identical for the same input
         np.testing.assert_allclose(embedding1, embedding2, rtol=1e-5, atol=1e-5)
 
+    def test_get_embeddings_with_cache(self):
+        cache = EmbeddingCache()
+        texts = ["Repeated footer.", "A unique sentence.", "Repeated footer."]
+        expected = get_embeddings(texts)
+
+        with patch.object(model, "encode", wraps=model.encode) as mock_encode:
+            embeddings = get_embeddings(texts, cache=cache)
+            # Duplicates within one call are encoded once
+            self.assertEqual(mock_encode.call_args.args[0], ["Repeated footer.", "A unique sentence."])
+            np.testing.assert_allclose(embeddings, expected, rtol=1e-5, atol=1e-5)
+
+            mock_encode.reset_mock()
+            cached_embeddings = get_embeddings(texts, cache=cache)
+            mock_encode.assert_not_called()
+            np.testing.assert_allclose(cached_embeddings, expected, rtol=1e-5, atol=1e-5)
+        self.assertEqual(cache.stats()["hits"], 3)
+
+    def test_cached_embeddings_do_not_load_model(self):
+        cache = EmbeddingCache()
+        texts = ["Cached once.", "Cached twice."]
+        expected = get_embeddings(texts, cache=cache)
+
+        embedder = Embedder(MODEL_NAME)
+        np.testing.assert_allclose(get_embeddings(texts, cache=cache, embedder=embedder), expected,
+                                   rtol=1e-5, atol=1e-5)
+        self.assertFalse(embedder.is_loaded)
+
+        get_embeddings(texts + ["Not cached."], cache=cache, embedder=embedder)
+        self.assertTrue(embedder.is_loaded)
+
+    def test_embedder_loads_lazily(self):
+        embedder = Embedder(MODEL_NAME, max_seq_length=64)
+        self.assertFalse(embedder.is_loaded)
+
+        embeddings = embedder.encode(["Load on first use."])
+        self.assertTrue(embedder.is_loaded)
+        self.assertEqual(embeddings.shape, (1, self.embedding_dimension))
+        self.assertEqual(embedder.model.max_seq_length, 64)
+
+    def test_shared_embedder(self):
+        self.assertIs(get_embedder(), get_embedder())
+        self.assertIs(get_embedder().model, model)
+
+        embedder = Embedder(MODEL_NAME)
+        loaded_models = []
+        threads = [threading.Thread(target=lambda: loaded_models.append(embedder.model)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Concurrent first use loads the model exactly once
+        self.assertTrue(all(m is loaded_models[0] for m in loaded_models))
+
+    def _fake_embedder(self, **kwargs):
+        class FakeModel:
+            device = "cpu"
+            max_seq_length = 128
+
+            def __init__(self):
+                self.calls = []
+
+            def encode(self, texts, batch_size=32, pool=None, **kwargs):
+                self.calls.append((list(texts), batch_size, pool))
+                return np.array([[len(text), i] for i, text in enumerate(texts)], dtype=np.float32)
+
+            def start_multi_process_pool(self, devices):
+                return {"devices": devices}
+
+            def stop_multi_process_pool(self, pool):
+                self.stopped = pool
+
+        embedder = Embedder(MODEL_NAME, **kwargs)
+        embedder._model = FakeModel()
+        return embedder
+
+    def test_encode_buckets_by_length(self):
+        embedder = self._fake_embedder()
+        texts = ["short", "x" * 400, "tiny", "y" * 390, "medium length text " * 3]
+        with patch("RAG.embedding_module._available_memory", return_value=None):
+            embeddings = embedder.encode(texts)
+
+        # Embeddings come back in input order
+        np.testing.assert_array_equal(embeddings[:, 0], [len(text) for text in texts])
+        calls = embedder.model.calls
+        self.assertEqual([call[0] for call in calls], [["x" * 400, "y" * 390], ["medium length text " * 3], ["short", "tiny"]])
+        # Shorter buckets get larger batches from the same token budget
+        batch_sizes = [call[1] for call in calls]
+        self.assertEqual(batch_sizes, sorted(batch_sizes))
+        self.assertEqual(batch_sizes[0], 32)
+
+    def test_encode_fixed_batch_size(self):
+        embedder = self._fake_embedder(batch_size=7)
+        embedder.encode(["a", "b" * 300])
+        self.assertTrue(all(call[1] == 7 for call in embedder.model.calls))
+
+    def test_batch_size_follows_free_memory(self):
+        embedder = self._fake_embedder()
+        with patch("RAG.embedding_module._available_memory", return_value=8 * 1024 ** 3):
+            self.assertEqual(embedder._batch_size(128), 256)
+            self.assertEqual(embedder._batch_size(8), 512)
+
+    def test_encode_with_worker_pool(self):
+        embedder = self._fake_embedder(batch_size=2, num_workers=2)
+        texts = [f"text number {i}" for i in range(10)]
+        embeddings = embedder.encode(texts)
+        np.testing.assert_array_equal(embeddings[:, 0], [len(text) for text in texts])
+        self.assertEqual(embedder.model.calls[0][2], {"devices": ["cpu", "cpu"]})
+
+        embedder.close()
+        self.assertEqual(embedder.model.stopped, {"devices": ["cpu", "cpu"]})
+        self.assertIsNone(embedder._pool)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import numpy as np
+
+# Add the parent directory to the sys.path to allow importing metadata_store
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from RAG.metadata_store import MetadataStore
+
+class TestMetadataStore(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = "test_temp_metadata_store"
+        self.store = MetadataStore()
+        self.metadatas = [
+            {"text": "First chunk.", "chunk_id": 0, "source": "docs/a.txt"},
+            {"text": "第二個區塊。", "chunk_id": 1, "source": "docs/a.txt", "page": 3},
+            {"text": "Third chunk.", "chunk_id": 0, "source": "docs/b.pdf", "char_start": 10, "char_end": 22},
+            {"text": "Custom keys.", "id": "x-1", "tags": ["faq", "2024"]},
+        ]
+
+    def tearDown(self):
+        if os.path.exists(self.test_dir):
+            shutil.rmtree(self.test_dir)
+
+    def test_extend_and_get(self):
+        self.store.extend(self.metadatas)
+        self.assertEqual(len(self.store), 4)
+        for i, metadata in enumerate(self.metadatas):
+            self.assertEqual(self.store[i], metadata)
+        self.assertEqual(list(self.store), self.metadatas)
+        # Source paths are dictionary-encoded
+        self.assertEqual(self.store.sources, ["docs/a.txt", "docs/b.pdf"])
+
+    def test_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.store[0]
+
+    def test_delete(self):
+        self.store.extend(self.metadatas)
+        self.store[1] = None
+        self.assertIsNone(self.store[1])
+        self.assertEqual(self.store[2], self.metadatas[2])
+        self.assertEqual(self.store.deleted_ids(), {1})
+        with self.assertRaises(TypeError):
+            self.store[0] = {"text": "replacement"}
+
+    def test_save_and_load(self):
+        self.store.extend(self.metadatas)
+        self.store[3] = None
+        path = os.path.join(self.test_dir, "metadata")
+        self.store.save(path)
+
+        for mmap in (True, False):
+            loaded = MetadataStore.load(path, mmap=mmap)
+            self.assertEqual(len(loaded), 4)
+            self.assertEqual(list(loaded), self.metadatas[:3] + [None])
+            self.assertEqual(loaded.deleted_ids(), {3})
+
+    def test_append_after_load_and_resave(self):
+        self.store.extend(self.metadatas[:2])
+        path = os.path.join(self.test_dir, "metadata")
+        self.store.save(path)
+
+        loaded = MetadataStore.load(path, mmap=True)
+        loaded.extend(self.metadatas[2:])
+        loaded[0] = None
+        loaded.save(path)
+
+        reloaded = MetadataStore.load(path)
+        self.assertEqual(list(reloaded), [None] + self.metadatas[1:])
+
+    def test_select(self):
+        self.store.extend(self.metadatas)
+        select = lambda filters: np.flatnonzero(self.store.select(filters)).tolist()
+
+        self.assertEqual(select({"source": {"docs/a.txt"}}), [0, 1])
+        self.assertEqual(select({"source": "docs/b.pdf"}), [2])
+        self.assertEqual(select({"source": ["missing.txt"]}), [])
+        self.assertEqual(select({"doc_type": "PDF"}), [2])
+        self.assertEqual(select({"chunk_id": 0}), [0, 2])
+        self.assertEqual(select({"page": {"min": 2, "max": 5}}), [1])
+        self.assertEqual(select({"char_start": {"max": 10}}), [2])
+        self.assertEqual(select({"id": "x-1"}), [3])
+        self.assertEqual(select({"tags": [["faq", "2024"]]}), [3])
+        self.assertEqual(select({"source": "docs/a.txt", "chunk_id": [1, 2]}), [1])
+        with self.assertRaises(ValueError):
+            self.store.select({"source": {"min": "a"}})
+
+        # Deleted rows never match; added rows are picked up by the field indexes
+        self.store[0] = None
+        self.store.append({"text": "Fourth chunk.", "source": "docs/a.txt", "id": "x-1"})
+        self.assertEqual(select({"source": "docs/a.txt"}), [1, 4])
+        self.assertEqual(select({"id": "x-1"}), [3, 4])
+
+    def test_select_ingested_at(self):
+        day = int(datetime(2024, 5, 1).timestamp())
+        self.store.extend([{"text": "old", "ingested_at": day}, {"text": "new", "ingested_at": day + 86400}, {"text": "legacy"}])
+        self.store.save(self.test_dir)
+
+        loaded = MetadataStore.load(self.test_dir)
+        self.assertEqual(np.flatnonzero(loaded.select({"ingested_at": {"min": datetime(2024, 5, 2)}})).tolist(), [1])
+        self.assertEqual(np.flatnonzero(loaded.select({"ingested_at": {"max": day}})).tolist(), [0])
+
+    def test_load_store_without_new_column(self):
+        self.store.extend(self.metadatas)
+        self.store.save(self.test_dir)
+        os.remove(os.path.join(self.test_dir, "ingested_at.npy"))  # As written before the column existed
+
+        loaded = MetadataStore.load(self.test_dir)
+        self.assertEqual(list(loaded), self.metadatas)
+        self.assertFalse(loaded.select({"ingested_at": {"min": 0}}).any())
+
+if __name__ == '__main__':
+    unittest.main()
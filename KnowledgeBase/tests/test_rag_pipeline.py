@@ -2,12 +2,15 @@ import unittest
 import os
 import shutil
 import sys
+import time
 import numpy as np
+from unittest.mock import Mock, patch
 
 # Add the parent directory to the sys.path to allow importing rag_pipeline
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
 from RAG.rag_pipeline import RAGPipeline
+from RAG.chunker import Chunker, estimate_tokens
 from RAG.embedding_module import get_embeddings # To generate query embeddings for assertions
 
 class TestRAGPipeline(unittest.TestCase):
@@ -63,6 +66,349 @@ class TestRAGPipeline(unittest.TestCase):
         results = self.rag_pipeline.retrieve_information(query, k=1)
         self.assertEqual(len(results), 0)
 
+    def test_chunks_fit_token_window(self):
+        sentence = "Cats are curious animals that enjoy climbing tall furniture at night. "
+        self._create_dummy_document("doc_long.txt", sentence * 40)
+        self.rag_pipeline = RAGPipeline(deduplicate=False)
+
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        texts = [metadata["text"] for metadata in self.rag_pipeline.vector_db.metadatas]
+        self.assertGreater(len(texts), 1)
+        for text in texts:
+            self.assertLessEqual(self.rag_pipeline.chunker.count_tokens([text])[0], self.rag_pipeline.chunker.max_tokens)
+            self.assertTrue(text.startswith("Cats") and text.endswith("night."))
+
+    def test_duplicate_chunks_are_embedded_once(self):
+        syllabus = "Course CS-101 covers variables, loops and functions. Grading is homework and a final exam."
+        self._create_dummy_document("syllabus_2023.txt", syllabus)
+        self._create_dummy_document("syllabus_2024.txt", syllabus.replace("final exam", "final project"))
+        self._create_dummy_document("syllabus_copy.txt", syllabus.upper())
+        self._create_dummy_document("doc_dog.txt", "Dogs are loyal companions. They love to play fetch.")
+
+        with patch('RAG.rag_pipeline.get_embeddings', wraps=get_embeddings) as mock_get_embeddings:
+            self.rag_pipeline.ingest_documents(self.test_dir)
+
+        self.assertEqual(self.rag_pipeline.vector_db.index.ntotal, 2)
+        self.assertEqual(sum(len(call.args[0]) for call in mock_get_embeddings.call_args_list), 2)
+        syllabus_id = self.rag_pipeline.manifest[os.path.abspath(os.path.join(self.test_dir, "syllabus_2023.txt"))]["ids"][0]
+        for name in ("syllabus_2024.txt", "syllabus_copy.txt"):
+            self.assertEqual(self.rag_pipeline.manifest[os.path.abspath(os.path.join(self.test_dir, name))]["ids"], [syllabus_id])
+
+        result = self.rag_pipeline.retrieve_information("CS-101 grading", k=1, mode="lexical")[0]
+        self.assertEqual(result["id"], syllabus_id)
+        self.assertEqual(sorted(os.path.basename(source) for source in result["metadata"]["duplicate_sources"]),
+                         ["syllabus_2024.txt", "syllabus_copy.txt"])
+
+    def test_removing_owner_keeps_shared_chunk(self):
+        index_dir = "test_rag_temp_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        text = "Office hours are held on Tuesdays in room 204 of the science building."
+        first_path = self._create_dummy_document("a.txt", text)
+        self._create_dummy_document("b.txt", text)
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        shared_id = self.rag_pipeline.manifest[os.path.abspath(first_path)]["ids"][0]
+
+        self.rag_pipeline.save(index_dir)
+        loaded_pipeline = RAGPipeline.load(index_dir)
+        os.remove(first_path)
+        with patch('RAG.rag_pipeline.get_embeddings') as mock_get_embeddings:
+            loaded_pipeline.ingest_documents(self.test_dir)
+        # Ownership moves to the copy without embedding the chunk again
+        mock_get_embeddings.assert_not_called()
+
+        metadata = loaded_pipeline.vector_db.get_metadata(shared_id)
+        self.assertEqual(os.path.basename(metadata["source"]), "b.txt")
+        self.assertNotIn(shared_id, loaded_pipeline.duplicate_sources)
+        self.assertEqual(loaded_pipeline.retrieve_information("office hours", k=1, mode="lexical")[0]["id"], shared_id)
+
+        os.remove(os.path.join(self.test_dir, "b.txt"))
+        loaded_pipeline.ingest_documents(self.test_dir)
+        self.assertIsNone(loaded_pipeline.vector_db.get_metadata(shared_id))
+        self.assertEqual(len(loaded_pipeline.deduplicator), 0)
+
+    def test_reranker_reorders_candidates(self):
+        class FakeReranker:
+            def rerank(self, query, results, k=None):
+                self.num_candidates = len(results)
+                reranked = sorted(results, key=lambda result: "fetch" not in result["metadata"]["text"])
+                return reranked[:k]
+
+        self._create_dummy_document("doc1.txt", "This is a test document about cats. Cats are furry animals.")
+        self._create_dummy_document("doc2.txt", "Dogs are loyal companions. They love to play fetch.")
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        self.rag_pipeline.reranker = FakeReranker()
+
+        results = self.rag_pipeline.retrieve_information("cats", k=1)
+        self.assertEqual(len(results), 1)
+        self.assertIn("fetch", results[0]["metadata"]["text"])
+        self.assertEqual(self.rag_pipeline.reranker.num_candidates, 2)
+        batch_results = self.rag_pipeline.retrieve_batch(["cats", "dogs"], k=1, mode="hybrid")
+        self.assertTrue(all("fetch" in results[0]["metadata"]["text"] for results in batch_results))
+
+    def test_retrieval_cache(self):
+        from RAG.retrieval_cache import RetrievalCache
+        self.rag_pipeline.retrieval_cache = RetrievalCache()
+        self._create_dummy_document("doc1.txt", "This is a test document about cats. Cats are furry animals.")
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        first = self.rag_pipeline.retrieve_information("Tell me about cats", k=2, mode="hybrid")
+        with patch('RAG.rag_pipeline.get_embeddings', wraps=get_embeddings) as mock_get_embeddings:
+            second = self.rag_pipeline.retrieve_information("tell me about  CATS", k=2, mode="hybrid")
+        mock_get_embeddings.assert_not_called()
+        self.assertEqual(second, first)
+
+        # Ingesting a new document invalidates the cached results
+        self._create_dummy_document("doc2.txt", "Cats sleep for most of the day.")
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        third = self.rag_pipeline.retrieve_information("Tell me about cats", k=2, mode="hybrid")
+        self.assertEqual(len(third), 2)
+        self.assertEqual(self.rag_pipeline.retrieval_cache.stats()["hits"], 1)
+
+    def test_reingest_is_incremental(self):
+        self._create_dummy_document("doc1.txt", "This is a test document about cats. Cats are furry animals.")
+        doc2_path = self._create_dummy_document("doc2.txt", "Dogs are loyal companions. They love to play fetch.")
+
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        # Unchanged files are skipped, so nothing is duplicated
+        self.assertEqual(self.rag_pipeline.vector_db.index.ntotal, 2)
+        self.assertEqual(len(self.rag_pipeline.manifest), 2)
+
+        # A modified file replaces its old vectors
+        with open(doc2_path, "w", encoding="utf-8") as f:
+            f.write("Parrots are colourful birds that can mimic human speech.")
+        os.utime(doc2_path, (0, 0))
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        self.assertEqual(self.rag_pipeline.vector_db.index.ntotal, 3)
+        self.assertEqual(self.rag_pipeline.vector_db.deleted_ids, {1})
+        results = self.rag_pipeline.retrieve_information("Which birds can talk?", k=5)
+        retrieved_texts = [r["metadata"]["text"].lower() for r in results]
+        self.assertEqual(len(retrieved_texts), 2)
+        self.assertFalse(any("dogs" in text for text in retrieved_texts))
+
+        # A deleted file has its vectors removed
+        os.remove(doc2_path)
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        results = self.rag_pipeline.retrieve_information("anything", k=5)
+        self.assertEqual(len(results), 1)
+        self.assertIn("cats", results[0]["metadata"]["text"].lower())
+
+    def test_failed_reingest_keeps_previous_version(self):
+        self._create_dummy_document("doc1.txt", "This is a test document about cats. Cats are furry animals.")
+        doc2_path = self._create_dummy_document("doc2.txt", "Dogs are loyal companions. They love to play fetch.")
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        manifest = {path: dict(entry) for path, entry in self.rag_pipeline.manifest.items()}
+
+        with open(doc2_path, "w", encoding="utf-8") as f:
+            f.write("Parrots are colourful birds that can mimic human speech.")
+        os.utime(doc2_path, (0, 0))
+        with patch("RAG.rag_pipeline.get_embeddings", side_effect=RuntimeError("embedding failed")):
+            with self.assertRaises(RuntimeError):
+                self.rag_pipeline.ingest_documents(self.test_dir)
+
+        # The old chunks are still served and the manifest still describes them
+        self.assertEqual(self.rag_pipeline.manifest, manifest)
+        texts = [r["metadata"]["text"] for r in self.rag_pipeline.retrieve_information("anything", k=5)]
+        self.assertEqual(len(texts), 2)
+        self.assertTrue(any("Dogs" in text for text in texts))
+
+        # The next run retries the file
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        texts = [r["metadata"]["text"] for r in self.rag_pipeline.retrieve_information("anything", k=5)]
+        self.assertEqual(len(texts), 2)
+        self.assertTrue(any("Parrots" in text for text in texts))
+        self.assertFalse(any("Dogs" in text for text in texts))
+
+    def test_reingest_keeps_unchanged_chunks(self):
+        doc_path = self._create_dummy_document("doc.txt", "Dogs are loyal companions. They love to play fetch.")
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        # Re-ingesting a modified file whose chunk did not change must not drop that chunk
+        os.utime(doc_path, (0, 0))
+        self.rag_pipeline.manifest[os.path.abspath(doc_path)]["sha256"] = "outdated"
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        results = self.rag_pipeline.retrieve_information("anything", k=5)
+        self.assertEqual(len(results), 1)
+        self.assertIn("Dogs", results[0]["metadata"]["text"])
+        self.assertNotIn("duplicate_sources", results[0]["metadata"])
+
+    def test_reingest_keeps_shared_chunk_deduplicated(self):
+        text = "Office hours are held on Tuesdays in room 204 of the science building."
+        self._create_dummy_document("a.txt", text)
+        copy_path = self._create_dummy_document("b.txt", text)
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        shared_id = self.rag_pipeline.manifest[os.path.abspath(copy_path)]["ids"][0]
+
+        # b.txt only references the vector a.txt owns, so its new version still matches it
+        os.utime(copy_path, (0, 0))
+        self.rag_pipeline.manifest[os.path.abspath(copy_path)]["sha256"] = "outdated"
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        self.assertEqual(self.rag_pipeline.vector_db.index.ntotal, 1)
+        self.assertEqual(self.rag_pipeline.manifest[os.path.abspath(copy_path)]["ids"], [shared_id])
+        self.assertEqual([reference["source"] for reference in self.rag_pipeline.duplicate_sources[shared_id]],
+                         [os.path.abspath(copy_path)])
+
+    def test_retrieve_batch(self):
+        self._create_dummy_document("doc_cat.txt", "Cats are domesticated carnivorous mammals. They are often called house cats when kept as indoor pets.")
+        self._create_dummy_document("doc_dog.txt", "Dogs are domesticated mammals, not typically wild animals. They are known for their loyalty and companionship.")
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        queries = ["What kind of pets are loyal?", "Which pets live indoors as house cats?"]
+        batch_results = self.rag_pipeline.retrieve_batch(queries, k=1)
+
+        self.assertEqual(len(batch_results), 2)
+        self.assertIn("dogs", batch_results[0][0]["metadata"]["text"].lower())
+        self.assertIn("cats", batch_results[1][0]["metadata"]["text"].lower())
+        for query, results in zip(queries, batch_results):
+            single_results = self.rag_pipeline.retrieve_information(query, k=1)
+            self.assertEqual(results[0]["metadata"], single_results[0]["metadata"])
+        self.assertEqual(self.rag_pipeline.retrieve_batch([], k=1), [])
+
+    def test_ingest_stream_in_batches(self):
+        for i in range(5):
+            self._create_dummy_document(f"doc{i}.txt", f"Document number {i} talks about topic {i}. " * 30)
+        # The documents repeat one sentence, so deduplication would collapse their chunks
+        self.rag_pipeline = RAGPipeline(deduplicate=False)
+
+        with patch('RAG.rag_pipeline.get_embeddings', wraps=get_embeddings) as mock_get_embeddings:
+            self.rag_pipeline.ingest_stream(self.test_dir, batch_size=4)
+
+        total = self.rag_pipeline.vector_db.index.ntotal
+        self.assertGreater(total, 4)
+        batch_sizes = [len(call.args[0]) for call in mock_get_embeddings.call_args_list]
+        self.assertTrue(all(size <= 4 for size in batch_sizes))
+        self.assertEqual(sum(batch_sizes), total)
+        # Every chunk is attributed to its file in the manifest
+        self.assertEqual(sum(len(entry["ids"]) for entry in self.rag_pipeline.manifest.values()), total)
+
+    def test_save_and_load_pipeline(self):
+        index_dir = "test_rag_temp_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        self._create_dummy_document("doc1.txt", "This is a test document about cats. Cats are furry animals.")
+
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        self.rag_pipeline.save(index_dir)
+
+        loaded_pipeline = RAGPipeline.load(index_dir)
+        self.assertEqual(loaded_pipeline.vector_db.index.ntotal, 1)
+        self.assertEqual(loaded_pipeline.manifest, self.rag_pipeline.manifest)
+
+        # The manifest survives the round trip, so re-ingesting the same directory is a no-op
+        loaded_pipeline.ingest_documents(self.test_dir)
+        self.assertEqual(loaded_pipeline.vector_db.index.ntotal, 1)
+
+    def test_load_accepts_pipeline_options(self):
+        index_dir = "test_rag_temp_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        self._create_dummy_document("doc1.txt", "This is a test document about cats. Cats are furry animals.")
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        self.rag_pipeline.save(index_dir)
+
+        chunker, reranker, retrieval_cache = Chunker(max_tokens=20, count_tokens=estimate_tokens), Mock(), Mock()
+        loaded_pipeline = RAGPipeline.load(index_dir, max_workers=1, compact_threshold=0.5, chunker=chunker,
+                                           deduplicate=False, reranker=reranker, retrieval_cache=retrieval_cache)
+        self.assertEqual((loaded_pipeline.max_workers, loaded_pipeline.vector_db.compact_threshold), (1, 0.5))
+        self.assertIs(loaded_pipeline.chunker, chunker)
+        self.assertIsNone(loaded_pipeline.deduplicator)
+        self.assertIs(loaded_pipeline.reranker, reranker)
+        self.assertIs(loaded_pipeline.retrieval_cache, retrieval_cache)
+
+    def test_hybrid_retrieval_finds_identifiers(self):
+        index_dir = "test_rag_temp_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        self._create_dummy_document("doc_course.txt", "Course CS-4021 covers distributed systems and consensus.")
+        self._create_dummy_document("doc_error.txt", "If the upload fails with error E7731, reduce the file size.")
+        self._create_dummy_document("doc_zh.txt", "機器學習是人工智慧的一個分支。")
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        results = self.rag_pipeline.retrieve_information("E7731", k=1, mode="lexical")
+        self.assertIn("e7731", results[0]["metadata"]["text"].lower())
+        results = self.rag_pipeline.retrieve_information("人工智慧", k=1, mode="lexical")
+        self.assertIn("人工智慧", results[0]["metadata"]["text"])
+
+        results = self.rag_pipeline.retrieve_information("what does cs-4021 cover?", k=3, mode="hybrid")
+        self.assertEqual(len(results), 3)
+        self.assertIn("cs-4021", results[0]["metadata"]["text"].lower())
+        self.assertGreater(results[0]["score"], results[-1]["score"])
+
+        # The lexical index is persisted with the pipeline and follows deletions
+        self.rag_pipeline.save(index_dir)
+        loaded_pipeline = RAGPipeline.load(index_dir)
+        results = loaded_pipeline.retrieve_batch(["E7731"], k=1, mode="lexical")
+        self.assertIn("e7731", results[0][0]["metadata"]["text"].lower())
+        os.remove(os.path.join(self.test_dir, "doc_error.txt"))
+        loaded_pipeline.ingest_documents(self.test_dir)
+        self.assertEqual(loaded_pipeline.retrieve_information("E7731", k=1, mode="lexical"), [])
+
+        with self.assertRaises(ValueError):
+            loaded_pipeline.retrieve_information("E7731", mode="fuzzy")
+
+    def test_retrieve_with_filters(self):
+        self._create_dummy_document("doc_cat.txt", "Cats are domesticated carnivorous mammals.")
+        self._create_dummy_document("doc_dog.txt", "Dogs are domesticated mammals known for loyalty.")
+        before = int(time.time())
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        dog_path = os.path.join(self.test_dir, "doc_dog.txt")
+        for mode in ("dense", "lexical", "hybrid"):
+            results = self.rag_pipeline.retrieve_information("domesticated mammals", k=5, mode=mode,
+                                                             filters={"source": dog_path})
+            self.assertEqual(len(results), 1)
+            self.assertIn("dogs", results[0]["metadata"]["text"].lower())
+
+        self.assertGreaterEqual(self.rag_pipeline.vector_db.metadatas[0]["ingested_at"], before)
+        batch_results = self.rag_pipeline.retrieve_batch(["mammals"], k=5, filters={"ingested_at": {"max": before - 1}})
+        self.assertEqual(batch_results, [[]])
+
+    @patch("RAG.document_ingestion.PdfReader")
+    def test_retrieve_with_page_filter(self, MockPdfReader):
+        page_texts = ["Cats are domesticated carnivorous mammals that purr and sleep a lot.",
+                      "Dogs are loyal companions that love to play fetch in the park.",
+                      "Parrots are colourful birds that can mimic human speech very well."]
+        MockPdfReader.return_value.pages = [Mock(extract_text=lambda text=text: text) for text in page_texts]
+        self._create_dummy_document("animals.pdf", "")
+        pipeline = RAGPipeline(max_workers=1, chunker=Chunker(max_tokens=20, count_tokens=estimate_tokens))
+        pipeline.ingest_documents(self.test_dir)
+
+        pages = {r["metadata"]["page"]: r["metadata"] for r in pipeline.retrieve_information("animals", k=5)}
+        self.assertEqual(sorted(pages), [1, 2, 3])
+        self.assertTrue(pages[2]["text"].startswith("Dogs"))
+        self.assertLess(pages[1]["char_end"], pages[2]["char_start"])
+
+        results = pipeline.retrieve_information("animals", k=5, filters={"page": {"min": 2}})
+        self.assertEqual(sorted(r["metadata"]["page"] for r in results), [2, 3])
+        results = pipeline.retrieve_information("animals", k=5, filters={"page": 1})
+        self.assertEqual([r["metadata"]["text"] for r in results], [page_texts[0]])
+
+    def test_compact_after_reingest(self):
+        index_dir = "test_rag_temp_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+        self._create_dummy_document("doc1.txt", "Cats are furry animals.")
+        doc2_path = self._create_dummy_document("doc2.txt", "Error E7731 means the upload failed.")
+        self.rag_pipeline.ingest_documents(self.test_dir)
+
+        with open(doc2_path, "w", encoding="utf-8") as f:
+            f.write("Error E9000 means the disk is full.")
+        os.utime(doc2_path, (0, 0))
+        self.rag_pipeline.ingest_documents(self.test_dir)
+        self.rag_pipeline.compact()
+        self.assertEqual(self.rag_pipeline.vector_db.index.ntotal, 2)
+
+        # Manifest and lexical ids still point at the right chunks after compaction
+        self.rag_pipeline.save(index_dir)
+        loaded_pipeline = RAGPipeline.load(index_dir)
+        results = loaded_pipeline.retrieve_information("E9000", k=1, mode="hybrid")
+        self.assertIn("e9000", results[0]["metadata"]["text"].lower())
+        self.assertEqual(loaded_pipeline.retrieve_information("E7731", k=1, mode="lexical"), [])
+        os.remove(doc2_path)
+        loaded_pipeline.ingest_documents(self.test_dir)
+        self.assertEqual(len(loaded_pipeline.retrieve_information("anything", k=5)), 1)
+
     def test_pipeline_end_to_end(self):
         # Create multiple documents
         self._create_dummy_document("doc_science.txt", "The Earth is the third planet from the Sun. It is the only astronomical object known to harbor life.")
@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+import time
+import numpy as np
+
+# Add the parent directory to the sys.path to allow importing reranker
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from RAG.reranker import Reranker
+
+class FakeCrossEncoder:
+    """
+    Scores a pair by the number of query words found in the text; optionally slow.
+    """
+    def __init__(self, seconds_per_pair=0.0):
+        self.seconds_per_pair = seconds_per_pair
+        self.batches = []
+
+    def predict(self, pairs, batch_size=32, **kwargs):
+        self.batches.append(len(pairs))
+        time.sleep(self.seconds_per_pair * len(pairs))
+        return np.array([len(set(query.lower().split()) & set(text.lower().split())) for query, text in pairs],
+                        dtype=np.float32)
+
+def make_results(texts):
+    return [{"id": i, "metadata": {"text": text}, "score": -i} for i, text in enumerate(texts)]
+
+class TestReranker(unittest.TestCase):
+    def setUp(self):
+        self.reranker = Reranker(batch_size=2)
+        self.reranker._model = FakeCrossEncoder()
+
+    def test_rerank_orders_by_cross_encoder(self):
+        results = make_results(["cats are pets", "birds fly", "loyal dogs are loyal pets", "dogs bark"])
+        reranked = self.reranker.rerank("loyal dogs", results, k=2)
+        self.assertEqual([result["id"] for result in reranked], [2, 3])
+        self.assertEqual(reranked[0]["rerank_score"], 2.0)
+        self.assertEqual(self.reranker.model.batches, [2, 2])
+
+    def test_rerank_skips_missing_metadata(self):
+        results = make_results(["dogs"]) + [{"id": 9, "metadata": None, "score": 0.0}]
+        self.assertEqual([result["id"] for result in self.reranker.rerank("dogs", results)], [0])
+
+    def test_latency_budget_caps_candidates(self):
+        self.reranker._model = FakeCrossEncoder(seconds_per_pair=0.01)
+        results = make_results([f"text {i}" for i in range(20)])
+        reranked = self.reranker.rerank("text 7", results, latency_budget_ms=50)
+        scored = [result for result in reranked if "rerank_score" in result]
+        self.assertLess(len(scored), 20)
+        self.assertGreaterEqual(len(scored), 2)
+        # Unscored candidates keep their first-stage order after the re-ranked ones
+        self.assertEqual([result["id"] for result in reranked[len(scored):]], list(range(len(scored), 20)))
+        self.assertEqual(len(reranked), 20)
+
+    def test_empty_results(self):
+        self.assertEqual(self.reranker.rerank("anything", []), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import os
+import sys
+import time
+import numpy as np
+from unittest.mock import patch
+
+# Add the parent directory to the sys.path to allow importing retrieval_cache
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from RAG.retrieval_cache import RetrievalCache
+
+RESULTS = [{"id": 0, "metadata": {"text": "Grading: homework 40%, exams 60%."}, "score": 1.0}]
+
+class TestRetrievalCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = RetrievalCache(max_entries=2)
+        self.key = RetrievalCache.make_key("What is the grading policy?", k=3, mode="dense")
+
+    def test_exact_hit_with_normalized_query(self):
+        self.cache.put(self.key, RESULTS, generation=0)
+        self.assertEqual(self.cache.get(RetrievalCache.make_key("  what is the GRADING policy? ", k=3, mode="dense"), 0), RESULTS)
+        self.assertIsNone(self.cache.get(RetrievalCache.make_key("What is the grading policy?", k=5, mode="dense"), 0))
+        self.assertEqual(self.cache.stats(), {"hits": 1, "semantic_hits": 0, "misses": 1, "entries": 1})
+
+    def test_results_are_copied(self):
+        self.cache.put(self.key, RESULTS, generation=0)
+        self.cache.get(self.key, 0)[0]["metadata"]["text"] = "changed"
+        self.assertEqual(self.cache.get(self.key, 0), RESULTS)
+
+    def test_generation_invalidates(self):
+        self.cache.put(self.key, RESULTS, generation=0)
+        self.assertIsNone(self.cache.get(self.key, 1))
+        self.assertEqual(self.cache.stats()["entries"], 0)
+
+    def test_ttl_expiry(self):
+        cache = RetrievalCache(ttl_seconds=10)
+        cache.put(self.key, RESULTS, generation=0)
+        with patch("RAG.retrieval_cache.time.monotonic", return_value=time.monotonic() + 11):
+            self.assertIsNone(cache.get(self.key, 0))
+
+    def test_lru_eviction(self):
+        keys = [RetrievalCache.make_key(f"query {i}", k=3) for i in range(3)]
+        self.cache.put(keys[0], RESULTS, generation=0)
+        self.cache.put(keys[1], RESULTS, generation=0)
+        self.cache.get(keys[0], 0)  # keys[1] is now the least recently used
+        self.cache.put(keys[2], RESULTS, generation=0)
+        self.assertIsNotNone(self.cache.get(keys[0], 0))
+        self.assertIsNone(self.cache.get(keys[1], 0))
+        self.assertIsNotNone(self.cache.get(keys[2], 0))
+
+    def test_semantic_tier(self):
+        cache = RetrievalCache(max_entries=2, semantic_threshold=0.9)
+        cache.put(self.key, RESULTS, generation=0, embedding=np.array([1.0, 0.0, 0.0]))
+        similar = RetrievalCache.make_key("How is the course graded?", k=3, mode="dense")
+        self.assertIsNone(cache.get(similar, 0))
+        self.assertEqual(cache.get_similar(similar, np.array([0.95, 0.1, 0.0]), 0), RESULTS)
+        self.assertIsNone(cache.get_similar(similar, np.array([0.1, 1.0, 0.0]), 0))
+        # Parameters must match as well
+        other_params = RetrievalCache.make_key("How is the course graded?", k=5, mode="dense")
+        self.assertIsNone(cache.get_similar(other_params, np.array([0.95, 0.1, 0.0]), 0))
+        self.assertEqual(cache.stats(), {"hits": 0, "semantic_hits": 1, "misses": 2, "entries": 1})
+
+    def test_semantic_slots_are_reused(self):
+        cache = RetrievalCache(max_entries=2, semantic_threshold=0.9)
+        for i in range(5):
+            embedding = np.zeros(5)
+            embedding[i] = 1.0
+            cache.put(RetrievalCache.make_key(f"query {i}", k=3), [{"id": i}], generation=0, embedding=embedding)
+        self.assertEqual(len(cache._slot_keys), 2)
+        self.assertEqual(cache.get_similar(RetrievalCache.make_key("other", k=3), np.eye(5)[4], 0), [{"id": 4}])
+        self.assertIsNone(cache.get_similar(RetrievalCache.make_key("other", k=3), np.eye(5)[0], 0))
+
+    def test_clear(self):
+        self.cache.put(self.key, RESULTS, generation=0)
+        self.cache.clear()
+        self.assertIsNone(self.cache.get(self.key, 0))
+
+if __name__ == '__main__':
+    unittest.main()
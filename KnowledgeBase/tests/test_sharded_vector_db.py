@@ -0,0 +1,108 @@
+import unittest
+import numpy as np
+import sys
+import os
+import shutil
+
+# Add the parent directory to the sys.path to allow importing sharded_vector_db
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from RAG.sharded_vector_db import ShardedVectorDB
+from RAG.vector_db_module import VectorDB
+
+class TestShardedVectorDB(unittest.TestCase):
+    def setUp(self):
+        self.dimension = 32
+        self.index_dir = "test_temp_sharded_index"
+        self.embeddings = np.random.rand(200, self.dimension).astype('float32')
+        self.metadatas = [{"text": f"chunk {i}", "source": f"doc_{i % 7}.txt"} for i in range(200)]
+
+    def tearDown(self):
+        shutil.rmtree(self.index_dir, ignore_errors=True)
+
+    def test_search_matches_single_index(self):
+        sharded_db = ShardedVectorDB(self.dimension, num_shards=4)
+        self.addCleanup(sharded_db.close)
+        ids = sharded_db.add_vectors(self.embeddings, self.metadatas)
+        self.assertEqual(len(set(ids)), 200)
+        self.assertTrue(all(len(shard.metadatas) > 0 for shard in sharded_db.shards))
+        self.assertEqual(len(sharded_db), 200)
+
+        single_db = VectorDB(self.dimension)
+        single_db.add_vectors(self.embeddings, self.metadatas)
+        queries = np.random.rand(5, self.dimension).astype('float32')
+        for sharded, single in zip(sharded_db.search_batch(queries, k=10), single_db.search_batch(queries, k=10)):
+            self.assertEqual([r["metadata"]["text"] for r in sharded], [r["metadata"]["text"] for r in single])
+
+        result = sharded_db.search(self.embeddings[17], k=1)[0]
+        self.assertEqual(result["id"], ids[17])
+        self.assertEqual(sharded_db.get_metadata(ids[17]), self.metadatas[17])
+
+    def test_delete_and_upsert(self):
+        sharded_db = ShardedVectorDB(self.dimension, num_shards=3)
+        self.addCleanup(sharded_db.close)
+        ids = sharded_db.add_vectors(self.embeddings, self.metadatas)
+
+        sharded_db.delete([ids[5]])
+        self.assertNotEqual(sharded_db.search(self.embeddings[5], k=1)[0]["id"], ids[5])
+        sharded_db.upsert([ids[6]], self.embeddings[5:6], [{"text": "replaced"}])
+        self.assertEqual(sharded_db.search(self.embeddings[5], k=1)[0]["id"], ids[6])
+        self.assertEqual(sharded_db.get_metadata(ids[6]), {"text": "replaced"})
+
+        sharded_db.compact()
+        self.assertEqual(len(sharded_db), 199)
+        self.assertEqual(sharded_db.get_metadata(ids[6]), {"text": "replaced"})
+
+    def test_source_partition_and_filters(self):
+        sharded_db = ShardedVectorDB(self.dimension, num_shards=4, partition="source")
+        self.addCleanup(sharded_db.close)
+        sharded_db.add_vectors(self.embeddings, self.metadatas)
+        for shard in sharded_db.shards:
+            sources = {metadata["source"] for metadata in shard.metadatas}
+            for other in sharded_db.shards:
+                if other is not shard:
+                    self.assertFalse(sources & {metadata["source"] for metadata in other.metadatas})
+
+        results = sharded_db.search(self.embeddings[0], k=10, filters={"source": "doc_3.txt"})
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(r["metadata"]["source"] == "doc_3.txt" for r in results))
+
+    def test_save_and_load(self):
+        sharded_db = ShardedVectorDB(self.dimension, num_shards=2, metric="cosine")
+        self.addCleanup(sharded_db.close)
+        ids = sharded_db.add_vectors(self.embeddings, self.metadatas)
+        sharded_db.save(self.index_dir)
+
+        loaded_db = ShardedVectorDB.load(self.index_dir)
+        self.addCleanup(loaded_db.close)
+        self.assertEqual((loaded_db.num_shards, loaded_db.metric), (2, "cosine"))
+        self.assertEqual(loaded_db.search(self.embeddings[42], k=1)[0]["id"], ids[42])
+
+        # A single shard can be updated and saved on its own
+        loaded_db.delete([ids[42]])
+        loaded_db.save_shard(ids[42] % 2, self.index_dir)
+        sharded_db.load_shard(ids[42] % 2, self.index_dir)
+        self.assertIsNone(sharded_db.get_metadata(ids[42]))
+
+    def test_save_and_load_keeps_settings(self):
+        sharded_db = ShardedVectorDB(self.dimension, num_shards=2, index_spec="IVF2,Flat", train_size=150,
+                                     compact_threshold=0.3)
+        self.addCleanup(sharded_db.close)
+        sharded_db.add_vectors(self.embeddings, self.metadatas)
+        sharded_db.save(self.index_dir)
+
+        loaded_db = ShardedVectorDB.load(self.index_dir)
+        self.addCleanup(loaded_db.close)
+        self.assertEqual((loaded_db.train_size, loaded_db.compact_threshold), (150, 0.3))
+        loaded_db.load_shard(1, self.index_dir)
+        for shard in loaded_db.shards:
+            self.assertEqual((shard.train_size, shard.compact_threshold), (150, 0.3))
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            ShardedVectorDB(self.dimension, num_shards=0)
+        with self.assertRaises(ValueError):
+            ShardedVectorDB(self.dimension, partition="random")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,11 +3,13 @@ import numpy as np
 import faiss
 import sys
 import os
+import shutil
+import threading
 
 # Add the parent directory to the sys.path to allow importing vector_db_module
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from RAG.vector_db_module import VectorDB
+from RAG.vector_db_module import VectorDB, quantization_report, recall_report
 
 class TestVectorDBModule(unittest.TestCase):
     def setUp(self):
@@ -66,6 +68,29 @@ class TestVectorDBModule(unittest.TestCase):
             self.vector_db.search(query_embedding, k=1)
         self.assertIn("Query embedding dimension mismatch", str(cm.exception))
 
+    def test_search_batch(self):
+        embeddings = np.random.rand(20, self.dimension).astype('float32')
+        metadatas = [{"id": i, "text": f"text_{i}"} for i in range(20)]
+        self.vector_db.add_vectors(embeddings, metadatas)
+
+        batch_results = self.vector_db.search_batch(embeddings[[3, 11, 17]], k=4)
+        self.assertEqual(len(batch_results), 3)
+        for query_id, results in zip([3, 11, 17], batch_results):
+            self.assertEqual(len(results), 4)
+            self.assertEqual(results[0]["metadata"]["id"], query_id)
+            # Identical to issuing the queries one by one
+            single_results = self.vector_db.search(embeddings[query_id], k=4)
+            self.assertEqual([r["metadata"]["id"] for r in results], [r["metadata"]["id"] for r in single_results])
+
+    def test_search_batch_pads_and_checks_dimension(self):
+        embeddings = np.random.rand(2, self.dimension).astype('float32')
+        self.vector_db.add_vectors(embeddings, [{"id": 0}, {"id": 1}])
+        batch_results = self.vector_db.search_batch(embeddings, k=5)
+        self.assertEqual([len(results) for results in batch_results], [2, 2])
+
+        with self.assertRaises(ValueError):
+            self.vector_db.search_batch(np.random.rand(2, self.dimension + 1).astype('float32'), k=1)
+
     def test_search_relevance(self):
         # Create a set of embeddings where one is clearly closer to the query
         target_embedding = np.array([0.9] * self.dimension).astype('float32')
@@ -88,5 +113,442 @@ class TestVectorDBModule(unittest.TestCase):
         self.assertEqual(results[0]["metadata"]["id"], 0)
         self.assertLess(results[0]["distance"], 1e-6) # Distance should be very close to 0
 
+    def test_add_vectors_returns_ids(self):
+        embeddings = np.random.rand(4, self.dimension).astype('float32')
+        ids = self.vector_db.add_vectors(embeddings, [{"id": i} for i in range(4)])
+        self.assertEqual(ids, [0, 1, 2, 3])
+        ids = self.vector_db.add_vectors(embeddings[:2], [{"id": i} for i in range(4, 6)])
+        self.assertEqual(ids, [4, 5])
+
+    def test_delete(self):
+        embeddings = np.random.rand(10, self.dimension).astype('float32')
+        metadatas = [{"id": i, "text": f"text_{i}"} for i in range(10)]
+        ids = self.vector_db.add_vectors(embeddings, metadatas)
+
+        self.vector_db.delete([ids[0], ids[5]])
+
+        results = self.vector_db.search(embeddings[0], k=10)
+        self.assertEqual(len(results), 8)
+        returned_ids = [r["metadata"]["id"] for r in results]
+        self.assertNotIn(0, returned_ids)
+        self.assertNotIn(5, returned_ids)
+        self.assertIsNone(self.vector_db.metadatas[0])
+
+    def test_ivf_index_trains_on_buffered_vectors(self):
+        vector_db = VectorDB(dimension=self.dimension, index_spec="IVF4,Flat", train_size=200)
+        self.assertIsInstance(vector_db.index, faiss.IndexIVFFlat)
+        self.assertFalse(vector_db.index.is_trained)
+
+        embeddings = np.random.rand(300, self.dimension).astype('float32')
+        vector_db.add_vectors(embeddings[:150], [{"id": i} for i in range(150)])
+        self.assertEqual(vector_db.num_pending, 150)
+        self.assertEqual(vector_db.index.ntotal, 0)
+
+        ids = vector_db.add_vectors(embeddings[150:], [{"id": i} for i in range(150, 300)])
+        self.assertTrue(vector_db.index.is_trained)
+        self.assertEqual(vector_db.num_pending, 0)
+        self.assertEqual(vector_db.index.ntotal, 300)
+        self.assertEqual(ids[0], 150)
+
+        # Visiting every list makes IVF exact
+        results = vector_db.search(embeddings[42], k=1, nprobe=4)
+        self.assertEqual(results[0]["metadata"]["id"], 42)
+
+    def test_search_trains_small_index(self):
+        vector_db = VectorDB(dimension=self.dimension, index_spec="IVF2,Flat")
+        embeddings = np.random.rand(50, self.dimension).astype('float32')
+        vector_db.add_vectors(embeddings, [{"id": i} for i in range(50)])
+        self.assertEqual(vector_db.num_pending, 50)
+
+        results = vector_db.search(embeddings[7], k=1, nprobe=2)
+        self.assertEqual(results[0]["metadata"]["id"], 7)
+        self.assertEqual(vector_db.index.ntotal, 50)
+
+    def test_hnsw_index(self):
+        vector_db = VectorDB(dimension=self.dimension, index_spec="HNSW16")
+        embeddings = np.random.rand(100, self.dimension).astype('float32')
+        vector_db.add_vectors(embeddings, [{"id": i} for i in range(100)])
+        vector_db.delete([3])
+
+        results = vector_db.search(embeddings[5], k=3, ef_search=64)
+        self.assertEqual(results[0]["metadata"]["id"], 5)
+        results = vector_db.search(embeddings[3], k=3, ef_search=64)
+        self.assertNotIn(3, [r["metadata"]["id"] for r in results])
+
+    def test_ivf_search_after_delete_without_nprobe(self):
+        # The tombstone selector alone must be passed in IVF search parameters
+        for index_spec in ["IVF16,Flat", "IVF16,PQ4"]:
+            vector_db = VectorDB(dimension=self.dimension, index_spec=index_spec, train_size=400)
+            embeddings = np.random.rand(400, self.dimension).astype('float32')
+            vector_db.add_vectors(embeddings, [{"id": i} for i in range(400)])
+            vector_db.delete([0])
+
+            results = vector_db.search(embeddings[0], k=5)
+            self.assertTrue(results)
+            self.assertNotIn(0, [r["metadata"]["id"] for r in results])
+
+    def test_recall_report(self):
+        embeddings = np.random.rand(500, self.dimension).astype('float32')
+        queries = np.random.rand(10, self.dimension).astype('float32')
+        report = recall_report(embeddings, queries, ["Flat", "IVF4,Flat", "HNSW16"], k=5,
+                               nprobe_values=(1, 4), ef_search_values=(32,))
+
+        self.assertEqual([(row["index_spec"], row.get("nprobe"), row.get("ef_search")) for row in report],
+                         [("Flat", None, None), ("IVF4,Flat", 1, None), ("IVF4,Flat", 4, None), ("HNSW16", None, 32)])
+        self.assertEqual(report[0]["recall@5"], 1.0)
+        self.assertAlmostEqual(report[2]["recall@5"], 1.0)
+        for row in report:
+            self.assertGreaterEqual(row["p99_latency_ms"], 0)
+
+    def test_save_and_load(self):
+        index_dir = "test_temp_vector_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+
+        embeddings = np.random.rand(10, self.dimension).astype('float32')
+        metadatas = [{"id": i, "text": f"text_{i}"} for i in range(10)]
+        self.vector_db.add_vectors(embeddings, metadatas)
+        self.vector_db.save(index_dir)
+
+        for mmap in (True, False):
+            loaded_db = VectorDB.load(index_dir, mmap=mmap)
+            self.assertEqual(loaded_db.dimension, self.dimension)
+            self.assertEqual(loaded_db.index.ntotal, 10)
+            self.assertEqual(list(loaded_db.metadatas), metadatas)
+
+            results = loaded_db.search(embeddings[3], k=1)
+            self.assertEqual(results[0]["metadata"]["id"], 3)
+
+    def test_save_and_load_ivf_then_add(self):
+        index_dir = "test_temp_vector_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+
+        vector_db = VectorDB(dimension=self.dimension, index_spec="IVF4,Flat", train_size=200)
+        embeddings = np.random.rand(250, self.dimension).astype('float32')
+        vector_db.add_vectors(embeddings[:200], [{"id": i} for i in range(200)])
+        vector_db.save(index_dir)
+
+        loaded_db = VectorDB.load(index_dir, mmap=True)
+        self.assertEqual(loaded_db.index_spec, "IVF4,Flat")
+        # Memory-mapped IVF lists are read-only; adding must still work
+        loaded_db.add_vectors(embeddings[200:], [{"id": i} for i in range(200, 250)])
+        self.assertEqual(loaded_db.index.ntotal, 250)
+        results = loaded_db.search(embeddings[220], k=1, nprobe=4)
+        self.assertEqual(results[0]["metadata"]["id"], 220)
+
+    def test_mmap_load_does_not_copy_flat_codes(self):
+        index_dir = "test_temp_vector_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+
+        for index_spec in ("Flat", "HNSW16"):
+            vector_db = VectorDB(dimension=self.dimension, index_spec=index_spec)
+            embeddings = np.random.rand(20, self.dimension).astype('float32')
+            vector_db.add_vectors(embeddings[:10], [{"id": i} for i in range(10)])
+            vector_db.save(index_dir)
+
+            loaded_db = VectorDB.load(index_dir, mmap=True)
+            flat = loaded_db.index if index_spec == "Flat" else faiss.downcast_index(loaded_db.index.storage)
+            # The codes point into the mapped file instead of an owned copy
+            self.assertFalse(flat.codes.is_owned)
+            self.assertEqual(loaded_db.search(embeddings[4], k=1)[0]["metadata"]["id"], 4)
+
+            # Writes reload a writable copy first
+            loaded_db.add_vectors(embeddings[10:], [{"id": i} for i in range(10, 20)])
+            self.assertEqual(loaded_db.index.ntotal, 20)
+            self.assertEqual(loaded_db.search(embeddings[15], k=1)[0]["metadata"]["id"], 15)
+
+    def test_save_and_load_keeps_deletions(self):
+        index_dir = "test_temp_vector_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+
+        embeddings = np.random.rand(5, self.dimension).astype('float32')
+        self.vector_db.add_vectors(embeddings, [{"id": i} for i in range(5)])
+        self.vector_db.delete([2])
+        self.vector_db.save(index_dir)
+
+        loaded_db = VectorDB.load(index_dir)
+        self.assertEqual(loaded_db.deleted_ids, {2})
+        results = loaded_db.search(embeddings[2], k=5)
+        self.assertNotIn(2, [r["metadata"]["id"] for r in results])
+
+    def test_cosine_metric(self):
+        vector_db = VectorDB(dimension=self.dimension, metric="cosine")
+        self.assertIsInstance(vector_db.index, faiss.IndexFlatIP)
+        embeddings = np.random.rand(10, self.dimension).astype('float32')
+        original = embeddings.copy()
+        vector_db.add_vectors(embeddings, [{"id": i} for i in range(10)])
+        np.testing.assert_array_equal(embeddings, original)  # The caller's array is not normalized
+
+        # Cosine similarity ignores vector length
+        results = vector_db.search(embeddings[4] * 10, k=3)
+        self.assertEqual(results[0]["metadata"]["id"], 4)
+        self.assertAlmostEqual(results[0]["score"], 1.0, places=5)
+        self.assertAlmostEqual(results[0]["distance"], 0.0, places=5)
+        self.assertGreaterEqual(results[0]["score"], results[1]["score"])
+
+    def test_min_score_prunes_results(self):
+        vector_db = VectorDB(dimension=2, metric="cosine")
+        embeddings = np.array([[1, 0], [1, 1], [0, 1]], dtype='float32')
+        vector_db.add_vectors(embeddings, [{"id": i} for i in range(3)])
+
+        results = vector_db.search_batch(np.array([[1, 0], [0, 1]], dtype='float32'), k=3, min_score=0.5)
+        self.assertEqual([[r["metadata"]["id"] for r in row] for row in results], [[0, 1], [2, 1]])
+
+    def test_unknown_metric(self):
+        with self.assertRaises(ValueError):
+            VectorDB(dimension=self.dimension, metric="manhattan")
+
+    def test_save_and_load_keeps_metric(self):
+        index_dir = "test_temp_vector_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+
+        vector_db = VectorDB(dimension=self.dimension, index_spec="HNSW16", metric="cosine")
+        embeddings = np.random.rand(20, self.dimension).astype('float32')
+        vector_db.add_vectors(embeddings, [{"id": i} for i in range(20)])
+        vector_db.save(index_dir)
+
+        loaded_db = VectorDB.load(index_dir)
+        self.assertEqual(loaded_db.metric, "cosine")
+        results = loaded_db.search(embeddings[7] * 3, k=1)
+        self.assertEqual(results[0]["metadata"]["id"], 7)
+        self.assertAlmostEqual(results[0]["score"], 1.0, places=5)
+
+    def test_search_with_filters(self):
+        embeddings = np.random.rand(100, self.dimension).astype('float32')
+        metadatas = [{"id": i, "source": f"doc_{i % 10}.{'pdf' if i % 2 else 'txt'}", "page": i // 10}
+                     for i in range(100)]
+        self.vector_db.add_vectors(embeddings, metadatas)
+        self.vector_db.delete([13])
+
+        # A highly selective filter still returns k matches, not the matches among the unfiltered top k
+        results = self.vector_db.search(embeddings[0], k=5, filters={"source": {"doc_3.pdf"}})
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r["metadata"]["source"] == "doc_3.pdf" for r in results))
+        self.assertNotIn(13, [r["id"] for r in results])
+
+        results = self.vector_db.search_batch(embeddings[:2], k=100, filters={"doc_type": "txt", "page": {"min": 2, "max": 3}})
+        for row in results:
+            self.assertEqual(sorted(r["id"] for r in row), [i for i in range(20, 40) if i % 2 == 0])
+        self.assertEqual(self.vector_db.search(embeddings[0], k=5, filters={"page": 42}), [])
+
+    def test_search_with_stale_row_mask(self):
+        embeddings = np.random.rand(20, self.dimension).astype('float32')
+        ids = self.vector_db.add_vectors(embeddings, [{"id": i, "chunk_id": i % 2} for i in range(20)])
+        mask = self.vector_db.metadatas.select({"chunk_id": 0})
+        self.vector_db.delete([ids[0], ids[2]])
+
+        results = self.vector_db.search(embeddings[0], k=20, filters=mask)
+        self.assertEqual(sorted(r["id"] for r in results), ids[4:20:2])
+        self.assertTrue(all(r["metadata"] is not None for r in results))
+
+    def test_search_with_filters_ivf(self):
+        vector_db = VectorDB(dimension=self.dimension, index_spec="IVF4,Flat", train_size=200)
+        embeddings = np.random.rand(200, self.dimension).astype('float32')
+        vector_db.add_vectors(embeddings, [{"id": i, "chunk_id": i % 3} for i in range(200)])
+        results = vector_db.search(embeddings[0], k=10, nprobe=4, filters={"chunk_id": 1})
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(r["id"] % 3 == 1 for r in results))
+
+        # Without a search-time nprobe the filter selector is still passed in IVF parameters
+        results = vector_db.search(embeddings[0], k=5, filters={"chunk_id": 2})
+        self.assertTrue(results)
+        self.assertTrue(all(r["id"] % 3 == 2 for r in results))
+
+    def test_search_with_filters_hnsw(self):
+        vector_db = VectorDB(dimension=self.dimension, index_spec="HNSW16")
+        embeddings = np.random.rand(200, self.dimension).astype('float32')
+        vector_db.add_vectors(embeddings, [{"id": i, "chunk_id": i % 3} for i in range(200)])
+        vector_db.delete([3])
+        for ef_search in (None, 64):
+            results = vector_db.search(embeddings[3], k=10, ef_search=ef_search, filters={"chunk_id": 0})
+            self.assertEqual(len(results), 10)
+            self.assertTrue(all(r["id"] % 3 == 0 for r in results))
+            self.assertNotIn(3, [r["id"] for r in results])
+
+    def test_upsert_replaces_vectors(self):
+        embeddings = np.random.rand(10, self.dimension).astype('float32')
+        ids = self.vector_db.add_vectors(embeddings, [{"id": i} for i in range(10)])
+
+        replacement = np.random.rand(2, self.dimension).astype('float32')
+        self.vector_db.upsert([ids[3], 42], replacement, [{"id": "3b", "text": "3b"}, {"id": "new", "text": "new"}])
+        self.assertEqual(self.vector_db.get_metadata(ids[3]), {"id": "3b", "text": "3b"})
+        self.assertEqual(self.vector_db.get_metadata(42), {"id": "new", "text": "new"})
+        self.assertEqual(self.vector_db.search(replacement[0], k=1)[0]["id"], ids[3])
+        self.assertNotEqual(self.vector_db.search(embeddings[3], k=1)[0]["metadata"]["id"], 3)
+        # Later additions get ids past the largest upserted id
+        self.assertEqual(self.vector_db.add_vectors(embeddings[:1], [{"id": "next"}]), [43])
+
+        with self.assertRaises(ValueError):
+            self.vector_db.upsert([1, 1], replacement, [{}, {}])
+
+    def test_update_metadata_keeps_vectors(self):
+        embeddings = np.random.rand(300, self.dimension).astype('float32')
+        for kwargs in ({"index_spec": "Flat"}, {"index_spec": "IVF4,Flat", "train_size": 200},
+                       {"index_spec": "IVF4,Flat", "train_size": 1000}, {"storage": "sq8", "rescore": True, "train_size": 200}):
+            vector_db = VectorDB(self.dimension, **kwargs)
+            ids = vector_db.add_vectors(embeddings, [{"id": i} for i in range(300)])
+            vector_db.update_metadata([ids[7], ids[250]], [{"id": "7b", "text": "7b"}, {"id": "250b", "text": "250b"}])
+            vector_db.train()
+
+            self.assertEqual(vector_db.get_metadata(ids[7]), {"id": "7b", "text": "7b"})
+            self.assertEqual(vector_db.search(embeddings[250], k=1, nprobe=4)[0]["id"], ids[250], kwargs)
+            self.assertEqual(vector_db.index.ntotal, 302)
+            with self.assertRaises(KeyError):
+                vector_db.update_metadata([999], [{}])
+
+    def test_compact_keeps_ids(self):
+        for index_spec in ("Flat", "IVF4,Flat", "HNSW16"):
+            vector_db = VectorDB(dimension=self.dimension, index_spec=index_spec, train_size=200)
+            embeddings = np.random.rand(300, self.dimension).astype('float32')
+            ids = vector_db.add_vectors(embeddings, [{"id": i} for i in range(300)])
+            vector_db.upsert([ids[0]], embeddings[299:300], [{"id": "moved", "text": "moved"}])
+            vector_db.delete(ids[100:250])
+
+            vector_db.compact()
+            self.assertEqual(vector_db.index.ntotal, 150)
+            self.assertEqual(len(vector_db.metadatas), 150)
+            self.assertEqual(vector_db.deleted_ids, set())
+            self.assertEqual(vector_db.get_metadata(ids[0]), {"id": "moved", "text": "moved"})
+            self.assertIsNone(vector_db.get_metadata(ids[120]))
+            results = vector_db.search(embeddings[260], k=1, nprobe=4)
+            self.assertEqual((results[0]["id"], results[0]["metadata"]["id"]), (ids[260], 260))
+
+            # Ids stay usable after compaction
+            vector_db.delete([ids[260]])
+            self.assertNotEqual(vector_db.search(embeddings[260], k=1, nprobe=4)[0]["id"], ids[260])
+
+    def test_background_compaction(self):
+        vector_db = VectorDB(dimension=self.dimension, compact_threshold=0.5)
+        embeddings = np.random.rand(20, self.dimension).astype('float32')
+        ids = vector_db.add_vectors(embeddings, [{"id": i} for i in range(20)])
+        vector_db.delete(ids[:5])
+        self.assertEqual(vector_db.index.ntotal, 20)  # Below the threshold
+
+        vector_db.delete(ids[5:10])
+        vector_db.wait_for_compaction()
+        self.assertEqual(vector_db.index.ntotal, 10)
+        self.assertEqual(vector_db.search(embeddings[15], k=1)[0]["id"], ids[15])
+
+    def test_concurrent_writes_and_searches(self):
+        vector_db = VectorDB(dimension=self.dimension, compact_threshold=0.2)
+        embeddings = np.random.rand(1000, self.dimension).astype('float32')
+        ids = vector_db.add_vectors(embeddings[:500], [{"id": i, "chunk_id": i} for i in range(500)])
+        errors = []
+        done = threading.Event()
+
+        def write():
+            try:
+                for i in range(250):
+                    vector_db.delete([ids[i]])
+                    vector_db.add_vectors(embeddings[500 + i:501 + i], [{"id": 500 + i, "chunk_id": 500 + i}])
+                    vector_db.upsert([ids[499 - i]], embeddings[i:i + 1], [{"id": f"{499 - i}b", "chunk_id": 499 - i}])
+            except Exception as e:
+                errors.append(e)
+            finally:
+                done.set()
+
+        def search():
+            try:
+                while not done.is_set():
+                    for results in vector_db.search_batch(embeddings[:8], k=10):
+                        # Deleted vectors never show up, not even as rows without metadata
+                        self.assertTrue(all(r["metadata"] is not None for r in results))
+                    vector_db.search(embeddings[0], k=5, filters={"chunk_id": {"min": 100}})
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write)] + [threading.Thread(target=search) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        vector_db.wait_for_compaction()
+        self.assertEqual(errors, [])
+        self.assertIsNone(vector_db.get_metadata(ids[0]))
+        self.assertEqual(vector_db.get_metadata(ids[250])["id"], "250b")
+
+    def test_save_and_load_after_compaction(self):
+        index_dir = "test_temp_vector_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+
+        embeddings = np.random.rand(10, self.dimension).astype('float32')
+        ids = self.vector_db.add_vectors(embeddings, [{"id": i} for i in range(10)])
+        self.vector_db.delete(ids[:4])
+        self.vector_db.compact()
+        self.vector_db.upsert([ids[5]], embeddings[9:10], [{"id": "5b", "text": "5b"}])
+        self.vector_db.save(index_dir)
+
+        loaded_db = VectorDB.load(index_dir)
+        self.assertEqual(loaded_db.get_metadata(ids[5]), {"id": "5b", "text": "5b"})
+        self.assertIsNone(loaded_db.get_metadata(ids[2]))
+        self.assertEqual(loaded_db.search(embeddings[7], k=1)[0]["id"], ids[7])
+        self.assertEqual(loaded_db.add_vectors(embeddings[:1], [{"id": "new", "text": "new"}]), [10])
+
+    def test_quantized_storage(self):
+        embeddings = np.random.rand(500, self.dimension).astype('float32')
+        sizes = {}
+        for storage in ("float32", "float16", "sq8"):
+            vector_db = VectorDB(self.dimension, storage=storage, train_size=500)
+            ids = vector_db.add_vectors(embeddings, [{"id": i} for i in range(500)])
+            self.assertEqual(vector_db.index.ntotal, 500)
+            self.assertEqual(vector_db.search(embeddings[42], k=1)[0]["id"], ids[42])
+            sizes[storage] = vector_db.memory_usage()["index_bytes"]
+        self.assertLess(sizes["float16"], sizes["float32"] * 0.6)
+        self.assertLess(sizes["sq8"], sizes["float32"] * 0.3)
+
+        self.assertIsInstance(VectorDB(self.dimension, index_spec="IVF4,Flat", storage="sq8").index,
+                              faiss.IndexIVFScalarQuantizer)
+        self.assertIsInstance(VectorDB(self.dimension, index_spec="HNSW16", storage="float16").index,
+                              faiss.IndexHNSWSQ)
+        with self.assertRaises(ValueError):
+            VectorDB(self.dimension, index_spec="IVF4,PQ4", storage="sq8")
+        with self.assertRaises(ValueError):
+            VectorDB(self.dimension, storage="int4")
+
+    def test_rescore_uses_exact_scores(self):
+        embeddings = np.random.rand(200, self.dimension).astype('float32')
+        vector_db = VectorDB(self.dimension, storage="sq8", rescore=True, train_size=200)
+        ids = vector_db.add_vectors(embeddings, [{"id": i} for i in range(200)])
+        results = vector_db.search(embeddings[7], k=3)
+        self.assertEqual(results[0]["id"], ids[7])
+        self.assertAlmostEqual(results[0]["distance"], 0.0, places=5)
+        expected = ((embeddings[results[1]["id"]] - embeddings[7]) ** 2).sum()
+        self.assertAlmostEqual(results[1]["distance"], float(expected), places=3)
+
+    def test_save_and_load_rescore_after_compaction(self):
+        index_dir = "test_temp_vector_index"
+        self.addCleanup(shutil.rmtree, index_dir, ignore_errors=True)
+
+        embeddings = np.random.rand(50, self.dimension).astype('float32')
+        vector_db = VectorDB(self.dimension, storage="float16", rescore=True, metric="cosine")
+        ids = vector_db.add_vectors(embeddings[:30], [{"id": i} for i in range(30)])
+        ids += vector_db.add_vectors(embeddings[30:], [{"id": i} for i in range(30, 50)])
+        vector_db.delete(ids[:10])
+        vector_db.compact()
+        self.assertEqual(vector_db.search(embeddings[35], k=1)[0]["id"], ids[35])
+        vector_db.save(index_dir)
+
+        loaded_db = VectorDB.load(index_dir)
+        self.assertEqual((loaded_db.storage, loaded_db.rescore), ("float16", True))
+        result = loaded_db.search(embeddings[12], k=1)[0]
+        self.assertEqual(result["id"], ids[12])
+        self.assertAlmostEqual(result["score"], 1.0, places=5)
+        new_ids = loaded_db.add_vectors(embeddings[:1], [{"id": "new"}])
+        self.assertEqual(loaded_db.search(embeddings[0], k=2)[0]["id"], new_ids[0])
+
+    def test_quantization_report(self):
+        embeddings = np.random.rand(300, self.dimension).astype('float32')
+        queries = np.random.rand(10, self.dimension).astype('float32')
+        report = quantization_report(embeddings, queries, k=5)
+        self.assertEqual([(row["storage"], row["rescore"]) for row in report],
+                         [("float32", False), ("float16", False), ("float16", True), ("sq8", False), ("sq8", True)])
+        self.assertEqual(report[0]["recall@5"], 1.0)
+        self.assertEqual(report[0]["memory_saved"], 0.0)
+        self.assertGreater(report[3]["memory_saved"], 0.7)
+        self.assertGreaterEqual(report[4]["recall@5"], 0.9)
+
+    def test_load_missing_directory(self):
+        with self.assertRaises(FileNotFoundError):
+            VectorDB.load("test_temp_missing_index")
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,19 @@
+import unicodedata
+
+# Han, Hiragana/Katakana and Hangul ranges, as a regex character class body. These scripts have
+# no spaces between words, so tokenizers and chunkers treat them per character.
+CJK_CHARS = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff"
+
+def normalize_text(text: str) -> str:
+    """
+    Normalizes text before hashing so that chunks differing only in Unicode form or
+    whitespace share one cache entry. Case is kept, since the embedding model is case-sensitive.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+def fold_text(text: str) -> str:
+    """
+    Folds text for matching: Unicode NFKC, lower case and collapsed whitespace, so copies that
+    differ only in layout (e.g. re-extracted PDF pages) or case compare equal.
+    """
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
@@ -1,40 +1,525 @@
 import faiss
+import json
 import numpy as np
-from typing import List, Dict
+from array import array
+from bisect import bisect_left
+from typing import Any, List, Dict, Iterable, Optional, Tuple, Union
 import os
 import sys
+import threading
+import time
+from contextlib import contextmanager
 
 from .document_ingestion import load_documents_from_directory
 from .embedding_module import get_embeddings
+from .metadata_store import MetadataStore
+
+INDEX_FILENAME = "index.faiss"
+HEADER_FILENAME = "vector_db.json"
+METADATA_DIRNAME = "metadata"
+IDS_FILENAME = "ids.npy"
+VECTORS_FILENAME = "vectors.npy"  # Full-precision copies of quantized vectors, used for re-scoring
+COMPACTION_BLOCK_SIZE = 65536  # Vectors copied per step when an index is rebuilt by `compact`
+METRICS = ("l2", "cosine", "ip")
+
+def _faiss_metric(metric: str) -> int:
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}'. Expected one of {METRICS}.")
+    return faiss.METRIC_L2 if metric == "l2" else faiss.METRIC_INNER_PRODUCT
+
+# FAISS scalar quantizer codecs for each storage mode: 2 bytes (float16) or 1 byte (sq8) per dimension
+STORAGE_CODECS = {"float32": "Flat", "float16": "SQfp16", "sq8": "SQ8"}
+
+def _storage_spec(index_spec: str, storage: str) -> str:
+    """
+    Rewrites an index factory string so that vectors are stored with the codec of `storage`,
+    e.g. ("IVF1024,Flat", "sq8") -> "IVF1024,SQ8" and ("HNSW32", "float16") -> "HNSW32,SQfp16".
+    """
+    if storage not in STORAGE_CODECS:
+        raise ValueError(f"Unknown storage '{storage}'. Expected one of {tuple(STORAGE_CODECS)}.")
+    if storage == "float32":
+        return index_spec
+    parts = index_spec.split(",")
+    if parts[-1] == "Flat":
+        parts[-1] = STORAGE_CODECS[storage]
+    elif len(parts) == 1 and parts[0].startswith("HNSW"):
+        parts.append(STORAGE_CODECS[storage])
+    else:
+        raise ValueError(f"Index spec '{index_spec}' already sets a vector codec; use storage='float32'.")
+    return ",".join(parts)
+
+class _ReadWriteLock:
+    """
+    Lets any number of searches run together while writes get exclusive access. Waiting writers
+    block new readers, so a steady stream of searches cannot starve them. The writing thread may
+    re-acquire the write lock (e.g. `upsert` deleting, then appending).
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None  # Thread holding the write lock
+        self._writer_depth = 0
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self):
+        with self._condition:
+            while self._writer is not None or self._waiting_writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextmanager
+    def write(self):
+        me = threading.current_thread()
+        with self._condition:
+            if self._writer is not me:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+                self._waiting_writers -= 1
+                self._writer = me
+            self._writer_depth += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._condition.notify_all()
 
 class VectorDB:
-    def __init__(self, dimension: int):
+    def __init__(self, dimension: int, index_spec: str = "Flat", train_size: Optional[int] = None,
+                 metric: str = "l2", compact_threshold: Optional[float] = None, storage: str = "float32",
+                 rescore: bool = False, rescore_factor: int = 4):
         """
         Initializes the FAISS index.
         :param dimension: The dimension of the embeddings.
+        :param index_spec: A FAISS index factory string. "Flat" (the default) is an exact brute-force
+                           index; approximate options include "IVF1024,Flat", "IVF1024,PQ48" and "HNSW32".
+        :param train_size: Number of vectors to buffer before training indexes that need it (IVF/PQ).
+                           Defaults to a size derived from the number of centroids.
+        :param metric: "l2" (Euclidean distance), "cosine" (vectors are L2-normalized when added
+                       and queried, then compared by inner product) or "ip" (raw inner product).
+        :param compact_threshold: Fraction of deleted rows at which `compact` is started in a background
+                                  thread. None disables automatic compaction.
+        :param storage: How the index stores vectors: "float32", "float16" (half the memory) or
+                        "sq8" (8-bit scalar quantization, a quarter of the memory; needs training).
+        :param rescore: Keep full-precision copies of the vectors (memory-mapped once saved) and
+                        re-rank the top `k * rescore_factor` candidates of each search by their exact
+                        scores, recovering most of the recall lost to quantization.
+        :param rescore_factor: Candidates fetched per requested result when re-scoring.
         """
         self.dimension = dimension
-        self.index = faiss.IndexFlatL2(dimension)  # L2 distance for similarity search
-        self.metadatas = []  # To store original text chunks and other metadata
+        self.index_spec = index_spec
+        self.metric = metric
+        self.storage = storage
+        faiss_metric = _faiss_metric(metric)
+        spec = _storage_spec(index_spec, storage)
+        if spec == "Flat" and metric == "l2":
+            self.index = faiss.IndexFlatL2(dimension)  # L2 distance for similarity search
+        elif spec == "Flat":
+            self.index = faiss.IndexFlatIP(dimension)  # Inner product; cosine for normalized vectors
+        else:
+            self.index = faiss.index_factory(dimension, spec, faiss_metric)
+        self.rescore = rescore
+        self.rescore_factor = rescore_factor
+        # Full-precision vectors by row, kept in blocks (one per add) when re-scoring is enabled
+        self._raw_blocks: List[np.ndarray] = []
+        self._raw_offsets = [0]
+        self.train_size = train_size or self._default_train_size()
+        self.metadatas = MetadataStore()  # To store original text chunks and other metadata
+        self.deleted_ids = set()  # Tombstoned rows, excluded from search results
+        self._live_filter = None  # Cached (bitmap, selector) excluding deleted rows
+        # Vector ids are stable across `compact`, which moves vectors to new rows. Rows hold ids in
+        # increasing order up to `_sorted_rows` (found by bisection); later rows are looked up in `_id_rows`.
+        self._row_ids = array("q")  # Vector id of each row
+        self._sorted_rows = 0
+        self._id_rows: Dict[int, int] = {}  # Vector id -> row, for rows after the sorted prefix
+        self._next_id = 0
+        self.compact_threshold = compact_threshold
+        self._write_lock = threading.RLock()  # Serializes writers; held for the whole of `compact`
+        # Searches read the index and metadata under `read()`; every change to them (adding vectors,
+        # tombstoning, swapping in a compacted index) happens under `write()`
+        self._rw_lock = _ReadWriteLock()
+        self._compaction_thread = None
+        self._untrained_embeddings = []  # Vectors buffered until the index is trained
+        self._mmap_path = None  # Set when the index is memory-mapped (read-only) from disk
+        # Query-time accuracy/speed knobs for approximate indexes
+        self.nprobe = None
+        self.ef_search = None
+
+    def _default_train_size(self) -> int:
+        if self.index.is_trained:
+            return 0
+        size = 10000
+        ivf_index = faiss.try_extract_index_ivf(self.index)
+        if ivf_index is not None:
+            size = max(size, 40 * ivf_index.nlist)  # FAISS wants ~39 training points per centroid
+        return size
+
+    @property
+    def num_pending(self) -> int:
+        """
+        Number of vectors waiting for the index to be trained; not yet searchable.
+        """
+        return sum(len(embeddings) for embeddings in self._untrained_embeddings)
 
-    def add_vectors(self, embeddings: np.ndarray, metadatas: List[Dict]):
+    def _prepare(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Converts vectors to the contiguous float32 layout FAISS expects and, for the cosine metric,
+        L2-normalizes them in place. The caller's array is copied first rather than modified.
+        """
+        prepared = np.ascontiguousarray(embeddings, dtype=np.float32)
+        if self.metric == "cosine":
+            if np.may_share_memory(prepared, embeddings):
+                prepared = prepared.copy()
+            faiss.normalize_L2(prepared)
+        return prepared
+
+    def train(self, sample: Optional[np.ndarray] = None):
+        """
+        Trains the index (a no-op for indexes that need no training, such as Flat and HNSW).
+        :param sample: Training vectors. Defaults to the vectors buffered by `add_vectors`,
+                       which are then added to the index.
+        """
+        with self._rw_lock.write():
+            pending = np.vstack(self._untrained_embeddings) if self._untrained_embeddings else None
+            if not self.index.is_trained:
+                training_set = sample if sample is not None else pending
+                if training_set is None or len(training_set) == 0:
+                    raise ValueError(f"Index '{self.index_spec}' needs training vectors before it can be used.")
+                print(f"Training '{self.index_spec}' index on {len(training_set)} vectors...")
+                if training_set is not pending:
+                    training_set = self._prepare(training_set)
+                self.index.train(training_set)
+            if pending is not None:
+                self._untrained_embeddings = []
+                self.index.add(pending)
+                self._live_filter = None
+
+    def _ensure_writable(self):
+        """
+        Memory-mapped indexes are read-only for some index types (e.g. IVF), so they are read
+        into memory the first time they are modified.
+        """
+        if self._mmap_path is not None:
+            index = faiss.read_index(self._mmap_path)
+            with self._rw_lock.write():
+                self.index = index
+                self._mmap_path = None
+
+    def add_vectors(self, embeddings: np.ndarray, metadatas: List[Dict]) -> List[int]:
         """
         Adds embeddings and their associated metadata to the FAISS index.
+        For indexes that need training, vectors are buffered until `train_size` vectors are
+        available (or `train` is called) and then used as the training sample.
         :param embeddings: A numpy array of embeddings.
         :param metadatas: A list of dictionaries, where each dictionary contains metadata
                           for the corresponding embedding.
+        :return: The ids assigned to the added vectors, usable with `delete` and `upsert`.
+        """
+        if embeddings.shape[1] != self.dimension:
+            raise ValueError(f"Embedding dimension mismatch. Expected {self.dimension}, got {embeddings.shape[1]}")
+        with self._write_lock:
+            ids = list(range(self._next_id, self._next_id + len(embeddings)))
+            self._append(embeddings, metadatas, ids)
+        print(f"Added {len(embeddings)} vectors to the index. Total vectors: {len(self.metadatas)}")
+        return ids
+
+    def upsert(self, ids: List[int], embeddings: np.ndarray, metadatas: List[Dict]):
+        """
+        Inserts vectors under caller-chosen ids, replacing the vectors that currently have those ids.
+        The replaced vectors are tombstoned like `delete` and reclaimed by `compact`.
+        :param ids: Non-negative vector ids, e.g. ids previously returned by `add_vectors`.
+        :param embeddings: A numpy array with one embedding per id.
+        :param metadatas: One metadata dictionary per id.
         """
         if embeddings.shape[1] != self.dimension:
             raise ValueError(f"Embedding dimension mismatch. Expected {self.dimension}, got {embeddings.shape[1]}")
-        self.index.add(embeddings)
-        self.metadatas.extend(metadatas)
-        print(f"Added {len(embeddings)} vectors to the index. Total vectors: {self.index.ntotal}")
+        ids = [int(vector_id) for vector_id in ids]
+        if len(ids) != len(embeddings) or len(ids) != len(metadatas) or len(set(ids)) != len(ids):
+            raise ValueError("upsert needs one embedding and one metadata dictionary per distinct id.")
+        if any(vector_id < 0 for vector_id in ids):
+            raise ValueError("Vector ids must be non-negative.")
+        with self._write_lock, self._rw_lock.write():
+            # Searches see either the old or the new vectors, never neither
+            self.delete(ids)
+            self._append(embeddings, metadatas, ids)
+        print(f"Upserted {len(ids)} vectors. Total vectors: {len(self.metadatas)}")
+
+    def update_metadata(self, ids: List[int], metadatas: List[Dict]):
+        """
+        Replaces the metadata of existing vectors without recomputing their embeddings.
+        Metadata rows are immutable, so the stored vectors are upserted again under the same ids:
+        the full-precision copies when re-scoring, otherwise the vectors read back from the index
+        (for PQ indexes their decoded approximation, as in `compact`).
+        :param ids: Ids of live vectors.
+        :param metadatas: One metadata dictionary per id.
+        """
+        ids = [int(vector_id) for vector_id in ids]
+        with self._write_lock:
+            rows = [self._row_of(vector_id) for vector_id in ids]
+            missing = [vector_id for vector_id, row in zip(ids, rows) if row is None]
+            if missing:
+                raise KeyError(f"No vectors with ids {missing}.")
+            self.upsert(ids, self._stored_vectors(np.array(rows, dtype=np.int64)), metadatas)
+
+    def _stored_vectors(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Returns the vectors of the given rows as they were added (normalized for the cosine metric).
+        """
+        if self.rescore:
+            return self._gather_raw(rows)
+        vectors = np.empty((len(rows), self.dimension), dtype=np.float32)
+        indexed = rows < self.index.ntotal
+        if not indexed.all():  # Still buffered until the index is trained
+            vectors[~indexed] = np.vstack(self._untrained_embeddings)[rows[~indexed] - self.index.ntotal]
+        if indexed.any():
+            self._ensure_writable()
+            ivf_index = faiss.try_extract_index_ivf(self.index)
+            if ivf_index is None:
+                vectors[indexed] = self.index.reconstruct_batch(rows[indexed])
+            else:
+                with self._rw_lock.write():
+                    ivf_index.make_direct_map()  # Needed to reconstruct vectors by row
+                    try:
+                        vectors[indexed] = self.index.reconstruct_batch(rows[indexed])
+                    finally:
+                        ivf_index.make_direct_map(False)
+        return vectors
+
+    def _append(self, embeddings: np.ndarray, metadatas: List[Dict], ids: List[int]):
+        self._ensure_writable()
+        original = embeddings
+        embeddings = self._prepare(embeddings)
+        if self.rescore:
+            block = embeddings.copy() if np.may_share_memory(embeddings, original) else embeddings
+        with self._rw_lock.write():
+            if self.rescore:
+                self._raw_blocks.append(block)
+                self._raw_offsets.append(self._raw_offsets[-1] + len(block))
+            if self.index.is_trained:
+                self.index.add(embeddings)
+            else:
+                self._untrained_embeddings.append(embeddings)
+            self.metadatas.extend(metadatas)
+            for vector_id in ids:
+                row = len(self._row_ids)
+                if self._sorted_rows == row and (row == 0 or vector_id > self._row_ids[row - 1]):
+                    self._sorted_rows += 1
+                else:
+                    self._id_rows[vector_id] = row
+                self._row_ids.append(vector_id)
+            self._next_id = max(self._next_id, max(ids, default=-1) + 1)
+            self._live_filter = None
+        if not self.index.is_trained and self.num_pending >= self.train_size:
+            self.train()
+
+    def _gather_raw(self, rows: np.ndarray, blocks: Optional[List[np.ndarray]] = None,
+                    offsets: Optional[List[int]] = None) -> np.ndarray:
+        """
+        Returns the full-precision vectors of the given rows.
+        """
+        blocks = self._raw_blocks if blocks is None else blocks
+        offsets = self._raw_offsets if offsets is None else offsets
+        if len(blocks) == 1:
+            return np.asarray(blocks[0][rows], dtype=np.float32)
+        block_of = np.searchsorted(offsets, rows, side="right") - 1
+        vectors = np.empty((len(rows), self.dimension), dtype=np.float32)
+        for block in np.unique(block_of).tolist():
+            selected = block_of == block
+            vectors[selected] = blocks[block][rows[selected] - offsets[block]]
+        return vectors
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Returns the size in bytes of the FAISS index (as serialized, close to its size in RAM) and
+        of the full-precision copies kept for re-scoring.
+        """
+        return {"index_bytes": int(faiss.serialize_index(self.index).nbytes),
+                "rescore_bytes": sum(int(block.nbytes) for block in self._raw_blocks)}
+
+    def _row_of(self, vector_id: int) -> Optional[int]:
+        """
+        Returns the row holding the live vector with the given id, or None.
+        """
+        row = self._id_rows.get(vector_id)
+        if row is None:
+            row = bisect_left(self._row_ids, vector_id, 0, self._sorted_rows)
+            if row == self._sorted_rows or self._row_ids[row] != vector_id:
+                return None
+        return None if row in self.deleted_ids else row
+
+    def get_metadata(self, vector_id: int) -> Optional[Dict]:
+        """
+        Returns the metadata of the vector with the given id, or None if there is no such vector.
+        """
+        row = self._row_of(vector_id)
+        return None if row is None else self.metadatas[row]
+
+    def id_mask(self, row_mask: np.ndarray) -> np.ndarray:
+        """
+        Converts a boolean mask over rows (e.g. from `MetadataStore.select`) into a boolean mask
+        indexed by vector id.
+        """
+        with self._write_lock:
+            row_ids = np.array(self._row_ids, dtype=np.int64)
+            mask = np.zeros(self._next_id, dtype=bool)
+        mask[row_ids[row_mask[:len(row_ids)]]] = True
+        return mask
+
+    def delete(self, ids: Iterable[int]):
+        """
+        Removes vectors from search results by tombstoning their rows.
+        The vectors stay in the FAISS index until `compact` rewrites it, but are skipped by
+        `search`, and their metadata is dropped.
+        :param ids: The ids returned by `add_vectors` for the vectors to remove.
+        """
+        with self._write_lock:
+            with self._rw_lock.write():
+                for vector_id in ids:
+                    row = self._row_of(vector_id)
+                    if row is not None:
+                        self.deleted_ids.add(row)
+                        self.metadatas[row] = None
+                        self._id_rows.pop(vector_id, None)
+                self._live_filter = None
+            self._maybe_compact()
 
-    def search(self, query_embedding: np.ndarray, k: int = 5) -> List[Dict]:
+    @property
+    def tombstone_ratio(self) -> float:
+        """
+        Fraction of rows that hold deleted vectors.
+        """
+        return len(self.deleted_ids) / len(self.metadatas) if len(self.metadatas) else 0.0
+
+    def _maybe_compact(self):
+        if self.compact_threshold is None or self.tombstone_ratio < self.compact_threshold:
+            return
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(target=self.compact, daemon=True)
+        self._compaction_thread.start()
+
+    def wait_for_compaction(self, timeout: Optional[float] = None):
+        """
+        Blocks until a background compaction started by `delete`/`upsert` has finished.
+        """
+        if self._compaction_thread is not None:
+            self._compaction_thread.join(timeout)
+
+    def compact(self):
+        """
+        Rewrites the index and the metadata store without the deleted vectors, reclaiming their
+        memory. Vector ids do not change. Searches keep using the old index until the rebuilt one
+        is swapped in; writes wait until compaction has finished.
+        Vectors are copied out of the existing index (for PQ indexes this is their decoded
+        approximation), so no embeddings need to be recomputed.
+        """
+        with self._write_lock:
+            if not self.deleted_ids:
+                return
+            if self._untrained_embeddings:
+                self.train()
+            self._ensure_writable()
+            start = time.perf_counter()
+
+            row_ids = np.array(self._row_ids, dtype=np.int64)
+            live_rows = np.flatnonzero(self.metadatas.live_mask())
+            live_rows = live_rows[np.argsort(row_ids[live_rows], kind="stable")]  # Sorted by id
+
+            # The clone keeps the trained state (centroids, codebooks); its vectors are dropped
+            index = faiss.clone_index(self.index)
+            index.reset()
+            ivf_index = faiss.try_extract_index_ivf(self.index)
+            if ivf_index is not None:
+                ivf_index.make_direct_map()  # Needed to reconstruct vectors by row
+            raw_vectors = self._gather_raw(live_rows) if self.rescore else None
+            for block_start in range(0, len(live_rows), COMPACTION_BLOCK_SIZE):
+                block = live_rows[block_start:block_start + COMPACTION_BLOCK_SIZE]
+                if raw_vectors is not None:  # Re-encode from the exact vectors rather than decoded codes
+                    index.add(raw_vectors[block_start:block_start + COMPACTION_BLOCK_SIZE])
+                else:
+                    index.add(self.index.reconstruct_batch(block))
+            metadatas = self.metadatas.subset(live_rows.tolist())
+
+            removed = len(self.metadatas) - len(live_rows)
+            with self._rw_lock.write():
+                self.index = index
+                self.metadatas = metadatas
+                self._row_ids = array("q", row_ids[live_rows].tobytes())
+                if raw_vectors is not None:
+                    self._raw_blocks, self._raw_offsets = [raw_vectors], [0, len(raw_vectors)]
+                self._sorted_rows = len(live_rows)
+                self._id_rows = {}
+                self.deleted_ids = set()
+                self._live_filter = None
+        print(f"Compacted index: removed {removed} deleted vectors in {time.perf_counter() - start:.2f}s.")
+
+    def _filter_selector(self, filters: Union[Dict[str, Any], np.ndarray]) -> Tuple[np.ndarray, faiss.IDSelector]:
+        """
+        Builds an ID selector admitting only live rows that match a filter expression, so FAISS
+        skips all other vectors during the search instead of results being filtered afterwards.
+        FAISS only keeps a raw pointer to the bitmap; the caller must hold on to the returned pair.
+        """
+        if isinstance(filters, np.ndarray):
+            # A mask computed earlier may still admit rows deleted since
+            live = self.metadatas.live_mask()
+            mask = np.zeros(len(live), dtype=bool)
+            mask[:len(filters)] = filters[:len(live)]
+            mask &= live
+        else:
+            mask = self.metadatas.select(filters)
+        bitmap = np.packbits(mask[:self.index.ntotal], bitorder="little")
+        return bitmap, faiss.IDSelectorBitmap(self.index.ntotal, faiss.swig_ptr(bitmap))
+
+    def _search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                       selector: Optional[faiss.IDSelector] = None) -> Optional[faiss.SearchParameters]:
+        """
+        Builds FAISS search parameters: the nprobe/efSearch settings of approximate indexes and an
+        ID selector that excludes tombstoned ids (unless a filter selector is given). Returns None if
+        the defaults apply.
+        """
+        nprobe = nprobe or self.nprobe
+        ef_search = ef_search or self.ef_search
+        if selector is None and self.deleted_ids:
+            if self._live_filter is None:
+                live = self.metadatas.live_mask()[:self.index.ntotal]
+                bitmap = np.packbits(live, bitorder="little")
+                # FAISS only keeps raw pointers, so the bitmap is cached alongside the selector
+                self._live_filter = (bitmap, faiss.IDSelectorBitmap(self.index.ntotal, faiss.swig_ptr(bitmap)))
+            selector = self._live_filter[1]
+
+        if selector is None and not nprobe and not ef_search:
+            return None
+        # Approximate indexes reject plain SearchParameters, so they always get their own type
+        if isinstance(self.index, faiss.IndexIVF):
+            return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe or self.index.nprobe)
+        if isinstance(self.index, faiss.IndexHNSW):
+            return faiss.SearchParametersHNSW(sel=selector, efSearch=ef_search or self.index.hnsw.efSearch)
+        if selector is not None:
+            return faiss.SearchParameters(sel=selector)
+        return None
+
+    def search(self, query_embedding: np.ndarray, k: int = 5, nprobe: Optional[int] = None,
+               ef_search: Optional[int] = None, min_score: Optional[float] = None,
+               filters: Optional[Union[Dict[str, Any], np.ndarray]] = None) -> List[Dict]:
         """
         Searches the index with a query embedding and returns the top k most similar items.
         :param query_embedding: A numpy array representing the query embedding.
         :param k: The number of nearest neighbors to retrieve.
+        :param nprobe: Number of inverted lists visited by IVF indexes (overrides `self.nprobe`).
+        :param ef_search: Size of the HNSW candidate list (overrides `self.ef_search`).
+        :param min_score: Drops results whose score is below this threshold (see `search_batch`).
+        :param filters: Restricts the search to matching items (see `search_batch`).
         :return: A list of dictionaries, each containing the metadata of a retrieved item.
         """
         if query_embedding.shape[0] != self.dimension:
@@ -44,19 +529,290 @@ class VectorDB:
         if query_embedding.ndim == 1:
             query_embedding = query_embedding.reshape(1, -1)
 
-        distances, indices = self.index.search(query_embedding, k)
-        
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx == -1:  # FAISS returns -1 for padding if k > ntotal
-                continue
-            result = {
-                "metadata": self.metadatas[idx],
-                "distance": distances[0][i]
-            }
-            results.append(result)
+        return self.search_batch(query_embedding, k=k, nprobe=nprobe, ef_search=ef_search, min_score=min_score,
+                                 filters=filters)[0]
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 5, nprobe: Optional[int] = None,
+                     ef_search: Optional[int] = None, min_score: Optional[float] = None,
+                     filters: Optional[Union[Dict[str, Any], np.ndarray]] = None) -> List[List[Dict]]:
+        """
+        Searches the index with several query embeddings in a single FAISS call.
+        :param query_embeddings: A 2D numpy array with one query embedding per row.
+        :param k: The number of nearest neighbors to retrieve per query.
+        :param nprobe: Number of inverted lists visited by IVF indexes (overrides `self.nprobe`).
+        :param ef_search: Size of the HNSW candidate list (overrides `self.ef_search`).
+        :param min_score: Drops results whose score is below this threshold.
+        :param filters: A metadata filter expression, e.g. {"source": {"a.pdf"}, "page": {"min": 3}}
+                        (see `MetadataStore.select`), or the boolean row mask it returns. It is applied
+                        inside the FAISS search, so k results are returned whenever k items match.
+        :return: One list of results per query, in the same format as `search`. Each result has the
+                 vector "id", its "metadata", a "score" (higher is more similar: the cosine similarity
+                 or inner product, or the negated squared L2 distance for "l2") and a "distance"
+                 (lower is more similar: the squared L2 distance, 1 - cosine similarity, or the
+                 negated inner product).
+        """
+        if query_embeddings.ndim != 2 or query_embeddings.shape[1] != self.dimension:
+            raise ValueError(f"Query embedding dimension mismatch. Expected (n, {self.dimension}), got {query_embeddings.shape}")
+
+        if self._untrained_embeddings:
+            # Too few vectors were added to reach train_size; train on what is there
+            with self._write_lock:
+                if self._untrained_embeddings:
+                    self.train()
+
+        query_embeddings = self._prepare(query_embeddings)
+        # Writes wait until the search is done, so the index, metadata, row ids and live rows stay
+        # consistent with each other while it runs
+        with self._rw_lock.read():
+            index, metadatas, row_ids = self.index, self.metadatas, self._row_ids
+            id_filter = None
+            if filters is not None:
+                id_filter = self._filter_selector(filters)
+                if not id_filter[0].any():
+                    return [[] for _ in range(len(query_embeddings))]
+            params = self._search_params(nprobe, ef_search, id_filter[1] if id_filter else None)
+            if not self.rescore:
+                raw, indices = index.search(query_embeddings, k, params=params)
+            else:
+                raw, indices = index.search(query_embeddings, k * self.rescore_factor, params=params)
+                raw, indices = self._rescore(query_embeddings, indices, k, self._raw_blocks, self._raw_offsets)
+            if self.metric == "l2":
+                scores, distances = -raw, raw
+            else:
+                scores, distances = raw, (1 - raw if self.metric == "cosine" else -raw)
+
+            valid = indices != -1  # FAISS returns -1 for padding if k > ntotal
+            if min_score is not None:
+                valid &= scores >= min_score
+
+            results = []
+            for row_valid, row_indices, row_scores, row_distances in zip(valid, indices, scores, distances):
+                results.append([
+                    {"id": row_ids[idx], "metadata": metadatas[idx], "score": score, "distance": distance}
+                    for idx, score, distance in zip(row_indices[row_valid].tolist(), row_scores[row_valid].tolist(),
+                                                    row_distances[row_valid].tolist())
+                ])
         return results
 
+    def _rescore(self, query_embeddings: np.ndarray, indices: np.ndarray, k: int,
+                 raw_blocks: List[np.ndarray], raw_offsets: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recomputes the scores of the candidate rows from the full-precision vectors and keeps the
+        best k per query. Returns (scores, rows) in the layout of `index.search`.
+        """
+        valid = indices != -1
+        candidates = np.zeros(indices.shape + (self.dimension,), dtype=np.float32)
+        candidates[valid] = self._gather_raw(indices[valid], raw_blocks, raw_offsets)
+        if self.metric == "l2":
+            exact = ((candidates - query_embeddings[:, None, :]) ** 2).sum(axis=2)
+            exact[~valid] = np.inf
+            order = np.argsort(exact, axis=1, kind="stable")[:, :k]
+        else:
+            exact = np.einsum("qkd,qd->qk", candidates, query_embeddings)
+            exact[~valid] = -np.inf
+            order = np.argsort(-exact, axis=1, kind="stable")[:, :k]
+        indices = np.take_along_axis(np.where(valid, indices, -1), order, axis=1)
+        return np.take_along_axis(exact, order, axis=1).astype(np.float32), indices
+
+    def save(self, path: str):
+        """
+        Writes the FAISS index and the metadata store to a directory so they can be reopened
+        with `VectorDB.load` instead of re-ingesting the corpus.
+        Files are written to a temporary name first and then moved into place, so processes
+        that currently have the old files memory-mapped keep a consistent view.
+        :param path: The directory to write the index to. Created if it does not exist.
+        """
+        with self._write_lock:
+            if self._untrained_embeddings:
+                self.train()
+            os.makedirs(path, exist_ok=True)
+            index_path = os.path.join(path, INDEX_FILENAME)
+            header_path = os.path.join(path, HEADER_FILENAME)
+            ids_path = os.path.join(path, IDS_FILENAME)
+
+            faiss.write_index(self.index, index_path + ".tmp")
+            with open(header_path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump({"dimension": self.dimension, "count": len(self.metadatas), "index_spec": self.index_spec,
+                           "metric": self.metric, "next_id": self._next_id, "storage": self.storage,
+                           "rescore": self.rescore, "rescore_factor": self.rescore_factor,
+                           "train_size": self.train_size, "compact_threshold": self.compact_threshold}, f)
+            with open(ids_path + ".tmp", "wb") as f:
+                np.save(f, np.array(self._row_ids, dtype=np.int64))
+            self.metadatas.save(os.path.join(path, METADATA_DIRNAME))
+            vectors_path = os.path.join(path, VECTORS_FILENAME)
+            if self.rescore:
+                # Streamed block by block so the full-precision vectors are never copied as a whole
+                vectors = np.lib.format.open_memmap(vectors_path + ".tmp", mode="w+", dtype=np.float32,
+                                                    shape=(self._raw_offsets[-1], self.dimension))
+                for block, offset in zip(self._raw_blocks, self._raw_offsets):
+                    vectors[offset:offset + len(block)] = block
+                vectors.flush()
+                del vectors
+
+            os.replace(index_path + ".tmp", index_path)
+            if self.rescore:
+                os.replace(vectors_path + ".tmp", vectors_path)
+            os.replace(ids_path + ".tmp", ids_path)
+            os.replace(header_path + ".tmp", header_path)
+        print(f"Saved {self.index.ntotal} vectors to '{path}'.")
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True) -> "VectorDB":
+        """
+        Reopens a vector database previously written with `save`.
+        :param path: The directory the index was saved to.
+        :param mmap: If True, the FAISS index (IO_FLAG_MMAP_IFC for flat codes, IO_FLAG_MMAP for
+                     inverted lists) and the metadata store are memory-mapped
+                     rather than read into RAM, so cold start is fast and several worker processes
+                     share the same pages.
+        :return: A VectorDB instance backed by the saved index.
+        """
+        index_path = os.path.join(path, INDEX_FILENAME)
+        header_path = os.path.join(path, HEADER_FILENAME)
+        if not os.path.isfile(index_path) or not os.path.isfile(header_path):
+            raise FileNotFoundError(f"No saved vector database found in '{path}'.")
+
+        with open(header_path, "r", encoding="utf-8") as f:
+            header = json.load(f)
+        io_flags = 0
+        if mmap and "IVF" in header.get("index_spec", "Flat"):
+            io_flags = faiss.IO_FLAG_MMAP  # Maps the inverted lists
+        elif mmap:
+            # IO_FLAG_MMAP still copies the codes of flat indexes (Flat, SQ, PQ and HNSW storage) into RAM
+            io_flags = faiss.IO_FLAG_MMAP_IFC
+        index = faiss.read_index(index_path, io_flags)
+        metadatas = MetadataStore.load(os.path.join(path, METADATA_DIRNAME), mmap=mmap)
+
+        if index.d != header["dimension"] or index.ntotal != len(metadatas):
+            raise ValueError(f"Saved vector database in '{path}' is inconsistent: "
+                             f"{index.ntotal} vectors but {len(metadatas)} metadata entries.")
+
+        vector_db = cls(dimension=header["dimension"], index_spec=header.get("index_spec", "Flat"),
+                        metric=header.get("metric", "l2"), storage=header.get("storage", "float32"),
+                        rescore=header.get("rescore", False), rescore_factor=header.get("rescore_factor", 4),
+                        train_size=header.get("train_size"), compact_threshold=header.get("compact_threshold"))
+        vector_db.index = index
+        vector_db._mmap_path = index_path if mmap else None
+        vector_db.metadatas = metadatas
+        vector_db.deleted_ids = metadatas.deleted_ids()
+
+        ids_path = os.path.join(path, IDS_FILENAME)
+        # Indexes saved before vector ids were stored used row positions as ids
+        row_ids = np.load(ids_path) if os.path.isfile(ids_path) else np.arange(index.ntotal, dtype=np.int64)
+        unsorted = np.flatnonzero(np.diff(row_ids) <= 0)
+        vector_db._sorted_rows = int(unsorted[0]) + 1 if len(unsorted) else len(row_ids)
+        vector_db._row_ids = array("q", row_ids.astype(np.int64).tobytes())
+        vector_db._id_rows = {int(row_ids[row]): row for row in range(vector_db._sorted_rows, len(row_ids))
+                              if row not in vector_db.deleted_ids}
+        vector_db._next_id = header.get("next_id", int(row_ids.max()) + 1 if len(row_ids) else 0)
+        if vector_db.rescore:
+            vectors = np.load(os.path.join(path, VECTORS_FILENAME), mmap_mode="r" if mmap else None)
+            vector_db._raw_blocks, vector_db._raw_offsets = [vectors], [0, len(vectors)]
+        print(f"Loaded {index.ntotal} vectors from '{path}'.")
+        return vector_db
+
+def recall_report(embeddings: np.ndarray, queries: np.ndarray, index_specs: List[str], k: int = 10,
+                  nprobe_values: Iterable[int] = (1, 8, 32, 128),
+                  ef_search_values: Iterable[int] = (16, 64, 256), metric: str = "l2") -> List[Dict]:
+    """
+    Measures recall and latency of index configurations against the exact Flat index, to pick
+    an approximate configuration that meets a latency target for a given corpus.
+    :param embeddings: The corpus vectors (also used to train indexes that need it).
+    :param queries: Query vectors; single-query latency is measured for each.
+    :param index_specs: FAISS index factory strings to evaluate, e.g. ["IVF1024,Flat", "HNSW32"].
+    :param k: Number of neighbours used for recall@k.
+    :param nprobe_values: nprobe settings evaluated for IVF indexes.
+    :param ef_search_values: efSearch settings evaluated for HNSW indexes.
+    :param metric: The similarity metric of the indexes ("l2", "cosine" or "ip").
+    :return: One dictionary per (index_spec, setting) with recall@k and mean/p99 latency in ms.
+    """
+    exact_db = VectorDB(embeddings.shape[1], metric=metric)
+    embeddings = exact_db._prepare(embeddings)
+    queries = exact_db._prepare(queries)
+    exact_index = exact_db.index
+    exact_index.add(embeddings)
+    _, ground_truth = exact_index.search(queries, k)
+
+    report = []
+    for index_spec in index_specs:
+        vector_db = VectorDB(embeddings.shape[1], index_spec=index_spec, metric=metric)
+        vector_db.train(embeddings if not vector_db.index.is_trained else None)
+        vector_db.index.add(embeddings)
+
+        if isinstance(vector_db.index, faiss.IndexIVF):
+            settings = [{"nprobe": nprobe} for nprobe in nprobe_values]
+        elif isinstance(vector_db.index, faiss.IndexHNSW):
+            settings = [{"ef_search": ef_search} for ef_search in ef_search_values]
+        else:
+            settings = [{}]
+
+        for setting in settings:
+            params = vector_db._search_params(**setting)
+            latencies = []
+            hits = 0
+            for i in range(len(queries)):
+                start = time.perf_counter()
+                _, indices = vector_db.index.search(queries[i:i + 1], k, params=params)
+                latencies.append((time.perf_counter() - start) * 1000)
+                hits += len(np.intersect1d(indices[0], ground_truth[i]))
+            report.append({
+                "index_spec": index_spec,
+                **setting,
+                f"recall@{k}": hits / (k * len(queries)),
+                "mean_latency_ms": float(np.mean(latencies)),
+                "p99_latency_ms": float(np.percentile(latencies, 99)),
+            })
+    return report
+
+def quantization_report(embeddings: np.ndarray, queries: np.ndarray, k: int = 10,
+                        storages: Iterable[str] = ("float32", "float16", "sq8"), index_spec: str = "Flat",
+                        metric: str = "l2", rescore_factor: int = 4) -> List[Dict]:
+    """
+    Measures the memory saved and the recall lost by each storage mode, with and without exact
+    re-scoring, against an exact float32 search, to pick a storage mode for a given corpus.
+    :param embeddings: The corpus vectors (also used to train quantizers that need it).
+    :param queries: Query vectors.
+    :param k: Number of neighbours used for recall@k.
+    :param storages: Storage modes to evaluate (see `VectorDB`).
+    :param index_spec: The index structure to quantize, e.g. "Flat" or "HNSW32".
+    :param metric: The similarity metric ("l2", "cosine" or "ip").
+    :param rescore_factor: Candidates fetched per result when re-scoring.
+    :return: One dictionary per (storage, rescore) with index size, memory saved relative to
+             the first storage mode (float32 by default), recall@k, recall lost relative to the exact search and mean latency in ms.
+    """
+    exact_db = VectorDB(embeddings.shape[1], metric=metric)
+    exact_db.index.add(exact_db._prepare(embeddings))
+    _, ground_truth = exact_db.index.search(exact_db._prepare(queries), k)
+    baseline_bytes = None
+
+    report = []
+    for storage in storages:
+        for rescore in ((False,) if storage == "float32" else (False, True)):
+            vector_db = VectorDB(embeddings.shape[1], index_spec=index_spec, metric=metric, storage=storage,
+                                 rescore=rescore, rescore_factor=rescore_factor, train_size=len(embeddings))
+            vector_db.add_vectors(embeddings, [{} for _ in range(len(embeddings))])
+            vector_db.train()
+            index_bytes = vector_db.memory_usage()["index_bytes"]
+            if baseline_bytes is None:
+                baseline_bytes = index_bytes
+            start = time.perf_counter()
+            results = vector_db.search_batch(queries, k=k)
+            latency = (time.perf_counter() - start) * 1000 / len(queries)
+            hits = sum(len(np.intersect1d([result["id"] for result in query_results], ground_truth[i]))
+                       for i, query_results in enumerate(results))
+            recall = hits / (k * len(queries))
+            report.append({
+                "storage": storage,
+                "rescore": rescore,
+                "index_bytes": index_bytes,
+                "bytes_per_vector": index_bytes / len(embeddings),
+                "memory_saved": 1 - index_bytes / baseline_bytes,
+                f"recall@{k}": recall,
+                "recall_lost": 1 - recall,
+                "mean_latency_ms": latency,
+            })
+    return report
+
 if __name__ == "__main__":
     # Example usage:
     test_dir = "test_documents_for_vector_db"
@@ -0,0 +1,281 @@
+import asyncio
+import json
+import queue
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+import httpx
+
+# Statuses worth retrying: Ollama answers 503 while a model is loading and 429/5xx under load
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class OllamaError(httpx.HTTPError):
+    """
+    An error reported by Ollama in the body of a streamed response (e.g. the model ran out of memory).
+    """
+
+class OllamaClient:
+    def __init__(self, api_url: str = "http://localhost:11434/api/generate", timeout: float = 120.0,
+                 connect_timeout: float = 5.0, max_concurrency: int = 32, max_keepalive: int = 20,
+                 max_retries: int = 2, backoff_seconds: float = 0.5,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Shared client for the Ollama HTTP API. Requests go through a pooled httpx.AsyncClient
+        that keeps connections alive between calls, with a timeout on every request, a cap on
+        the requests in flight and retries with exponential backoff on connection errors,
+        timeouts and overloaded-server responses.
+        Async code (FastAPI) awaits `agenerate` / `alist_models` or iterates `astream_generate`;
+        sync code (Flask) calls `generate` / `list_models` / `stream_generate`, which run on a
+        background event loop so every thread shares one connection pool.
+        :param api_url: The /api/generate endpoint, as in the OLLAMA_API_URL setting.
+        :param timeout: Seconds to wait for a response (read/write/pool). Generation can be slow
+                        on CPU, so this is generous; override it per request if needed.
+        :param connect_timeout: Seconds to wait for a connection to Ollama.
+        :param max_concurrency: Maximum requests in flight per event loop; further requests wait.
+        :param max_keepalive: Idle connections kept open for reuse.
+        :param max_retries: Retries after the first attempt. 0 disables retrying.
+        :param backoff_seconds: Delay before the first retry, doubled for each further one.
+        :param transport: Optional httpx transport (e.g. httpx.MockTransport in tests).
+        """
+        self.api_url = api_url
+        self.tags_url = api_url.replace("/api/generate", "/api/tags")
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_keepalive)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.transport = transport
+        # An httpx.AsyncClient and its semaphore are bound to the event loop they were created in
+        self._clients: Dict[asyncio.AbstractEventLoop, httpx.AsyncClient] = {}
+        self._semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def _backoff(self, attempt: int) -> float:
+        return self.backoff_seconds * 2 ** (attempt - 1)
+
+    def _client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, transport=self.transport)
+            self._clients[loop] = client
+            self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+        return client
+
+    async def _request(self, method: str, url: str, timeout: Optional[float] = None, **kwargs: Any) -> httpx.Response:
+        """
+        Sends a request with the concurrency limit and retries applied, and returns the response.
+        Raises httpx.HTTPStatusError for error statuses and httpx.TransportError (e.g.
+        httpx.ConnectError, httpx.TimeoutException) once the retries are exhausted.
+        """
+        client = self._client()
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=self.timeout.connect)
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphores[asyncio.get_running_loop()]:
+                    response = await client.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    response.raise_for_status()
+                    return response
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            attempt += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def agenerate(self, prompt: str, model: str, timeout: Optional[float] = None,
+                        options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Generates a completion for the prompt and returns its text.
+        :param prompt: The full prompt.
+        :param model: The Ollama model to use.
+        :param timeout: Overrides the response timeout for this request.
+        :param options: Optional Ollama model options (e.g. {"temperature": 0.2}).
+        """
+        payload: Dict[str, Any] = {"model": model, "prompt": prompt, "stream": False}
+        if options:
+            payload["options"] = options
+        response = await self._request("POST", self.api_url, json=payload, timeout=timeout)
+        return response.json().get("response", "").strip()
+
+    async def astream_generate(self, prompt: str, model: str, timeout: Optional[float] = None,
+                               options: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        Generates a completion and yields its text piece by piece as Ollama produces it (its
+        NDJSON stream), so the first tokens arrive after the prompt is processed rather than
+        after the whole completion. Failed attempts are retried only until the first piece
+        arrives. The connection stays open, counted against the concurrency limit, while the
+        caller iterates; closing the iterator early aborts the generation.
+        Arguments are the same as for `agenerate`.
+        """
+        payload: Dict[str, Any] = {"model": model, "prompt": prompt, "stream": True}
+        if options:
+            payload["options"] = options
+        client = self._client()
+        kwargs: Dict[str, Any] = {"json": payload}
+        if timeout is not None:
+            kwargs["timeout"] = httpx.Timeout(timeout, connect=self.timeout.connect)
+        attempt = 0
+        started = False
+        while True:
+            try:
+                async with self._semaphores[asyncio.get_running_loop()]:
+                    async with client.stream("POST", self.api_url, **kwargs) as response:
+                        if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                            if response.is_error:
+                                await response.aread()
+                                response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if not line.strip():
+                                    continue
+                                chunk = json.loads(line)
+                                if "error" in chunk:
+                                    raise OllamaError(f"Ollama error: {chunk['error']}")
+                                if chunk.get("response"):
+                                    started = True
+                                    yield chunk["response"]
+                                if chunk.get("done"):
+                                    break
+                            return
+            except httpx.TransportError:
+                if started or attempt >= self.max_retries:
+                    raise
+            attempt += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def alist_models(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Returns the names of the models available in Ollama.
+        """
+        return [m['name'] for m in await self.alist_model_details(timeout=timeout)]
+
+    async def alist_model_details(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the models available in Ollama as listed by /api/tags: name, size in bytes,
+        modified_at and "details" (family, parameter_size, quantization_level, ...).
+        """
+        response = await self._request("GET", self.tags_url, timeout=timeout)
+        return response.json().get('models', [])
+
+    def _background_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Returns the event loop the sync methods run on, starting its thread on first use.
+        """
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    self._thread = threading.Thread(target=loop.run_forever, name="ollama-client", daemon=True)
+                    self._thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def _run(self, coroutine):
+        """
+        Runs a coroutine on the client's background event loop and waits for its result.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._background_loop()).result()
+
+    def _iterate(self, iterator: AsyncIterator[str]) -> Iterator[str]:
+        """
+        Iterates an async iterator on the background event loop, handing its items over to the
+        calling thread as they arrive.
+        """
+        items: "queue.Queue" = queue.Queue()
+        end = object()
+
+        async def pump():
+            try:
+                async for item in iterator:
+                    items.put((item, None))
+                items.put((end, None))
+            except Exception as e:
+                items.put((end, e))
+            finally:
+                await iterator.aclose()
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._background_loop())
+        try:
+            while True:
+                item, error = items.get()
+                if error is not None:
+                    raise error
+                if item is end:
+                    return
+                yield item
+        finally:
+            future.cancel()  # The caller stopped early: abort the request
+
+    def generate(self, prompt: str, model: str, timeout: Optional[float] = None,
+                 options: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Blocking version of `agenerate`, for sync code such as Flask views.
+        Must not be called from a running event loop; await `agenerate` there instead.
+        """
+        return self._run(self.agenerate(prompt, model, timeout=timeout, options=options))
+
+    def stream_generate(self, prompt: str, model: str, timeout: Optional[float] = None,
+                        options: Optional[Dict[str, Any]] = None) -> Iterator[str]:
+        """
+        Blocking version of `astream_generate`: a generator yielding the completion piece by piece.
+        """
+        return self._iterate(self.astream_generate(prompt, model, timeout=timeout, options=options))
+
+    def list_models(self, timeout: Optional[float] = None) -> List[str]:
+        """
+        Blocking version of `alist_models`.
+        """
+        return self._run(self.alist_models(timeout=timeout))
+
+    def list_model_details(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Blocking version of `alist_model_details`.
+        """
+        return self._run(self.alist_model_details(timeout=timeout))
+
+    async def aclose(self):
+        """
+        Closes the connection pool of the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.pop(loop, None)
+        self._semaphores.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        """
+        Closes the connection pool used by the sync methods and stops the background loop.
+        """
+        if self._loop is None:
+            return
+        loop, self._loop = self._loop, None
+        asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        loop.close()
+
+if __name__ == "__main__":
+    # Example usage (requires Ollama running locally with the 'llama2' model):
+    client = OllamaClient()
+    try:
+        print(client.list_models())
+        print(client.generate("Write a one-line greeting.", model="llama2"))
+        for piece in client.stream_generate("Count from one to five.", model="llama2"):
+            print(piece, end="", flush=True)
+        print()
+
+        async def main():
+            prompts = ["Name a color.", "Name an animal.", "Name a fruit."]
+            print(await asyncio.gather(*(client.agenerate(prompt, model="llama2") for prompt in prompts)))
+            await client.aclose()
+
+        asyncio.run(main())
+    except httpx.HTTPError as e:
+        print(f"Ollama request failed: {e}")
+    finally:
+        client.close()
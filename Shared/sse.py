@@ -0,0 +1,19 @@
+import json
+from typing import Any, Dict
+
+# Headers for Server-Sent Events responses: no caching, and no buffering by reverse proxies (nginx)
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    """
+    Formats one Server-Sent Event. The data is sent as JSON, so newlines in generated text
+    cannot break the framing.
+    :param event: The event name (e.g. "token", "done", "error").
+    :param data: The JSON-serializable payload.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+if __name__ == "__main__":
+    # Example usage:
+    print(sse_event("token", {"token": "Hello"}), end="")
+    print(sse_event("done", {"response": "Hello, world!\nBye."}), end="")
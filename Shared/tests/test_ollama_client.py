@@ -0,0 +1,141 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+# Add the project root to the sys.path to allow importing the shared modules
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Shared.ollama_client import OllamaClient, OllamaError
+
+API_URL = "http://ollama.test/api/generate"
+
+class TestOllamaClient(unittest.TestCase):
+    def make_client(self, handler, **kwargs):
+        kwargs.setdefault("backoff_seconds", 0)
+        client = OllamaClient(API_URL, transport=httpx.MockTransport(handler), **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_generate(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            return httpx.Response(200, json={"response": "  Hello!  "})
+
+        client = self.make_client(handler)
+        self.assertEqual(client.generate("Say hi", model="llama2", options={"temperature": 0}), "Hello!")
+        self.assertEqual(str(requests[0].url), API_URL)
+        self.assertEqual(json.loads(requests[0].content),
+                         {"model": "llama2", "prompt": "Say hi", "stream": False, "options": {"temperature": 0}})
+
+    def test_list_models(self):
+        def handler(request):
+            self.assertEqual(request.url.path, "/api/tags")
+            return httpx.Response(200, json={"models": [{"name": "llama2"}, {"name": "qwen"}]})
+
+        self.assertEqual(self.make_client(handler).list_models(), ["llama2", "qwen"])
+
+    def test_retries_overloaded_server(self):
+        statuses = [503, 503, 200]
+
+        def handler(request):
+            status = statuses.pop(0)
+            return httpx.Response(status, json={"response": "ok"} if status == 200 else {"error": "loading"})
+
+        self.assertEqual(self.make_client(handler, max_retries=2).generate("p", model="m"), "ok")
+        self.assertEqual(statuses, [])
+
+    def test_gives_up_after_retries(self):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            raise httpx.ConnectError("Connection refused", request=request)
+
+        with self.assertRaises(httpx.ConnectError):
+            self.make_client(handler, max_retries=2).generate("p", model="m")
+        self.assertEqual(len(attempts), 3)
+
+    def test_client_errors_are_not_retried(self):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            return httpx.Response(404, json={"error": "model not found"})
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            self.make_client(handler).generate("p", model="missing")
+        self.assertEqual(len(attempts), 1)
+
+    def test_concurrency_limit(self):
+        in_flight = []
+        peak = []
+
+        async def handler(request):
+            in_flight.append(request)
+            peak.append(len(in_flight))
+            await asyncio.sleep(0.01)
+            in_flight.remove(request)
+            return httpx.Response(200, json={"response": "ok"})
+
+        client = self.make_client(handler, max_concurrency=3)
+
+        async def main():
+            results = await asyncio.gather(*(client.agenerate(f"p{i}", model="m") for i in range(10)))
+            await client.aclose()
+            return results
+
+        self.assertEqual(asyncio.run(main()), ["ok"] * 10)
+        self.assertEqual(max(peak), 3)
+
+    def test_stream_generate(self):
+        def handler(request):
+            self.assertTrue(json.loads(request.content)["stream"])
+            lines = [{"response": "Hel", "done": False}, {"response": "lo", "done": False},
+                     {"response": "", "done": True}]
+            return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines) + "\n")
+
+        self.assertEqual(list(self.make_client(handler).stream_generate("p", model="m")), ["Hel", "lo"])
+
+    def test_stream_retries_before_first_token(self):
+        statuses = [503, 200]
+
+        def handler(request):
+            status = statuses.pop(0)
+            return httpx.Response(status, content=json.dumps({"response": "ok", "done": True}) + "\n")
+
+        self.assertEqual(list(self.make_client(handler).stream_generate("p", model="m")), ["ok"])
+        self.assertEqual(statuses, [])
+
+    def test_stream_error_line(self):
+        def handler(request):
+            return httpx.Response(200, content=json.dumps({"response": "par"}) + "\n" +
+                                  json.dumps({"error": "out of memory"}) + "\n")
+
+        pieces = []
+        with self.assertRaises(OllamaError):
+            for piece in self.make_client(handler).stream_generate("p", model="m"):
+                pieces.append(piece)
+        self.assertEqual(pieces, ["par"])
+
+    def test_stream_closed_early(self):
+        def handler(request):
+            if not json.loads(request.content)["stream"]:
+                return httpx.Response(200, json={"response": "ok"})
+            lines = [{"response": f"t{i}"} for i in range(100)] + [{"done": True}]
+            return httpx.Response(200, content="\n".join(json.dumps(line) for line in lines))
+
+        client = self.make_client(handler, max_concurrency=1)
+        stream = client.stream_generate("p", model="m")
+        self.assertEqual(next(stream), "t0")
+        stream.close()
+        # The aborted stream released its concurrency slot
+        self.assertEqual(client.generate("p", model="m"), "ok")
+
+if __name__ == '__main__':
+    unittest.main()